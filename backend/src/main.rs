@@ -1,8 +1,30 @@
 // backend/src/main.rs
+//
+// Usage:
+//   hardware_discovery                  print all interfaces as pretty JSON and exit
+//   hardware_discovery --daemon         serve line-delimited JSON on stdin/stdout
+//   hardware_discovery --socket <path>  serve line-delimited JSON on a Unix socket
+//
+// In daemon/socket mode every request is one compact JSON object per line:
+//   {"cmd": "list"}                  -> {"type": "interfaces", "interfaces": [...]}
+//   {"cmd": "get", "name": "eth0"}   -> {"type": "interface", "interface": {...} | null}
+//   {"cmd": "ping"}                  -> {"type": "pong"}
+// and change events are pushed to every client as they are detected:
+//   {"type": "event", "event": "link_up" | "link_down" | "addr_changed" | "added" | "removed",
+//    "interface": {...}}
 use pnet::datalink;
-use serde::Serialize;
+use serde::{Deserialize, Serialize};
+use serde_json::{json, Value};
+use std::collections::HashMap;
+use std::env;
+use std::fs;
+use std::io::{self, BufRead, BufReader, Write};
+use std::os::unix::net::UnixListener;
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::Duration;
 
-#[derive(Serialize)]
+#[derive(Serialize, Clone, PartialEq)]
 struct Interface {
     name: String,
     mac: Option<String>,
@@ -10,14 +32,161 @@ struct Interface {
     status: String,
 }
 
-fn main() {
-    let interfaces: Vec<Interface> = datalink::interfaces().into_iter().map(|iface| Interface {
+#[derive(Deserialize)]
+struct Request {
+    cmd: String,
+    #[serde(default)]
+    name: Option<String>,
+}
+
+type Client = Arc<Mutex<Box<dyn Write + Send>>>;
+type Clients = Arc<Mutex<Vec<Client>>>;
+
+fn discover() -> Vec<Interface> {
+    datalink::interfaces().into_iter().map(|iface| Interface {
         name: iface.name.clone(),
         mac: iface.mac.map(|m| m.to_string()),
         ips: iface.ips.iter().map(|ip| ip.to_string()).collect(),
         status: if iface.is_up() { "UP".into() } else { "DOWN".into() },
-    }).collect();
+    }).collect()
+}
+
+// Look up one interface by name. A name with no /sys/class/net entry is
+// answered without enumerating anything, but a hit still goes through
+// datalink::interfaces(): getifaddrs has no per-link query, so it is O(links).
+fn find(name: &str) -> Option<Interface> {
+    if name.is_empty() || name.contains('/') || name == "." || name == ".." {
+        return None;
+    }
+    let sysfs = "/sys/class/net";
+    if fs::metadata(sysfs).is_ok() && fs::metadata(format!("{}/{}", sysfs, name)).is_err() {
+        return None;
+    }
+    discover().into_iter().find(|i| i.name == name)
+}
+
+fn send(client: &Client, message: &Value) -> io::Result<()> {
+    let mut line = message.to_string();
+    line.push('\n');
+    let mut writer = client.lock().unwrap();
+    writer.write_all(line.as_bytes())?;
+    writer.flush()
+}
+
+fn handle_request(line: &str) -> Value {
+    match serde_json::from_str::<Request>(line) {
+        Ok(request) => match request.cmd.as_str() {
+            "list" => json!({"type": "interfaces", "interfaces": discover()}),
+            "get" => {
+                let name = request.name.unwrap_or_default();
+                json!({"type": "interface", "interface": find(&name)})
+            }
+            "ping" => json!({"type": "pong"}),
+            other => json!({"type": "error", "message": format!("unknown command: {}", other)}),
+        },
+        Err(e) => json!({"type": "error", "message": format!("invalid request: {}", e)}),
+    }
+}
+
+// Answer requests from one client until it disconnects
+fn serve<R: BufRead>(reader: R, client: Client, clients: &Clients) {
+    clients.lock().unwrap().push(client.clone());
+
+    for line in reader.lines() {
+        let line = match line {
+            Ok(line) => line,
+            Err(_) => break,
+        };
+        if line.trim().is_empty() {
+            continue;
+        }
+        if send(&client, &handle_request(&line)).is_err() {
+            break;
+        }
+    }
+
+    clients.lock().unwrap().retain(|c| !Arc::ptr_eq(c, &client));
+}
+
+fn change_events(previous: &HashMap<String, Interface>, current: &[Interface]) -> Vec<Value> {
+    let mut events = Vec::new();
 
-    let json_output = serde_json::to_string_pretty(&interfaces).unwrap();
-    println!("{}", json_output);
-}
\ No newline at end of file
+    for iface in current {
+        let event = match previous.get(&iface.name) {
+            None => "added",
+            Some(old) if old.status != iface.status => {
+                if iface.status == "UP" { "link_up" } else { "link_down" }
+            }
+            Some(old) if old != iface => "addr_changed",
+            Some(_) => continue,
+        };
+        events.push(json!({"type": "event", "event": event, "interface": iface}));
+    }
+
+    for (name, old) in previous {
+        if !current.iter().any(|i| &i.name == name) {
+            events.push(json!({"type": "event", "event": "removed", "interface": old}));
+        }
+    }
+
+    events
+}
+
+// Poll the interface list and push change events to every connected client
+fn watch(clients: Clients, interval: Duration) {
+    let mut previous: HashMap<String, Interface> =
+        discover().into_iter().map(|i| (i.name.clone(), i)).collect();
+
+    loop {
+        thread::sleep(interval);
+        let current = discover();
+
+        let events = change_events(&previous, &current);
+        if !events.is_empty() {
+            let mut clients = clients.lock().unwrap();
+            for event in &events {
+                clients.retain(|client| send(client, event).is_ok());
+            }
+        }
+
+        previous = current.into_iter().map(|i| (i.name.clone(), i)).collect();
+    }
+}
+
+fn main() {
+    let args: Vec<String> = env::args().collect();
+    let option = |flag: &str| args.iter().position(|a| a == flag).and_then(|i| args.get(i + 1));
+
+    let interval = Duration::from_millis(
+        option("--interval-ms").and_then(|v| v.parse().ok()).unwrap_or(1000)
+    );
+    let clients: Clients = Arc::new(Mutex::new(Vec::new()));
+
+    if let Some(path) = option("--socket") {
+        let _ = fs::remove_file(path);
+        let listener = UnixListener::bind(path).expect("failed to bind socket");
+
+        let watch_clients = clients.clone();
+        thread::spawn(move || watch(watch_clients, interval));
+
+        for stream in listener.incoming().flatten() {
+            let writer = match stream.try_clone() {
+                Ok(writer) => writer,
+                Err(_) => continue,
+            };
+            let client: Client = Arc::new(Mutex::new(Box::new(writer)));
+            let clients = clients.clone();
+            thread::spawn(move || serve(BufReader::new(stream), client, &clients));
+        }
+    } else if args.iter().any(|a| a == "--daemon") {
+        let watch_clients = clients.clone();
+        thread::spawn(move || watch(watch_clients, interval));
+
+        // Exits when the parent closes stdin
+        let client: Client = Arc::new(Mutex::new(Box::new(io::stdout())));
+        serve(io::stdin().lock(), client, &clients);
+    } else {
+        let json_output = serde_json::to_string_pretty(&discover()).unwrap();
+        println!("{}", json_output);
+    }
+}
@@ -1,39 +1,48 @@
 # app.py
-from flask import Flask, jsonify, render_template
+from flask import Flask, Response, jsonify, render_template
 from dash_app import init_dash
 from interface_manager import interface_manager
-import subprocess
-import json
-from sqlalchemy import create_engine, Column, String, Integer, Boolean
-from sqlalchemy.orm import declarative_base, sessionmaker
+from dhcp_manager import dhcp_manager
+from dns_manager import configured_upstreams, dns_manager
+from dns_prober import dns_prober
+from discovery import DiscoveryError
+from data_provider import get_hardware_snapshot
+from metrics import metrics_sampler
+from traffic import traffic_collector
+from lease_watcher import lease_watcher
+from dns_stats import dns_stats
+from database import init_app, init_db
+from http_utils import conditional_jsonify
+from events import snapshot_publisher
 
-DATABASE_URL = 'sqlite:///alpine.db'
+def create_app():
+    app = Flask(__name__)
+    init_db()
+    init_app(app)
+    init_dash(app)
 
-Base = declarative_base()
+    # Sample CPU/RAM/disk in the background so /hardware never blocks
+    metrics_sampler.start()
 
-class NetworkInterface(Base):
-    __tablename__ = 'network_interfaces'
+    # Per-interface traffic rates for the Traffic Monitor page
+    traffic_collector.start()
 
-    id = Column(Integer, primary_key=True)
-    name = Column(String, unique=True, nullable=False)
-    label = Column(String, nullable=False, default='LAN')
-    is_wan = Column(Boolean, default=False)
-    dhcp_enabled = Column(Boolean, default=True)
-    static_ip = Column(String)
-    static_netmask = Column(String, default='255.255.255.0')
-    static_gateway = Column(String)
-    dns_servers = Column(String)
+    # Follow dnsmasq's leases file for the active leases view
+    lease_watcher.start()
 
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-Base.metadata.create_all(engine)
+    # Read dnsmasq's cache counters for the DNS hit rate
+    dns_stats.start()
 
-def create_app():
-    app = Flask(__name__)
-    init_dash(app)
+    # Time the upstream DNS servers, and reorder them if configured to
+    dns_prober.start(configured_upstreams)
+
+    # Push interface and metrics changes to /events subscribers
+    snapshot_publisher.start(get_hardware_snapshot)
 
-    # Register the interface_manager blueprint
+    # Register the interface_manager, dhcp_manager and dns_manager blueprints
     app.register_blueprint(interface_manager)
+    app.register_blueprint(dhcp_manager)
+    app.register_blueprint(dns_manager)
 
     @app.route('/')
     def root():
@@ -41,37 +50,21 @@ def create_app():
 
     @app.route('/hardware')
     def hardware():
-        session = Session()
-
-        # Run Rust hardware discovery
-        result = subprocess.run(
-            ["../backend/target/debug/hardware_discovery"],
-            capture_output=True,
-            text=True
-        )
-
-        if result.returncode != 0:
+        try:
+            snapshot = get_hardware_snapshot()
+        except DiscoveryError:
             return jsonify({"error": "Hardware discovery failed"}), 500
 
-        interfaces = json.loads(result.stdout)
-
-        # Assign labels from DB or insert default if not existing
-        for iface in interfaces:
-            db_iface = session.query(NetworkInterface).filter_by(name=iface['name']).first()
-            if not db_iface:
-                # Insert interface into DB with default label
-                db_iface = NetworkInterface(name=iface['name'])
-                session.add(db_iface)
-                session.commit()
-            iface['label'] = db_iface.label  # Assign label to the output
+        return conditional_jsonify(snapshot)
 
-        # Additional hardware information (CPU, RAM, Disk)
-        hardware_info = get_additional_hardware_info()
-
-        return jsonify({
-            "interfaces": interfaces,
-            "hardware_info": hardware_info
-        })
+    @app.route('/events')
+    def events():
+        """Server-Sent Events stream of /hardware changes"""
+        return Response(
+            snapshot_publisher.stream(),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
     @app.route('/setup')
     def setup():
@@ -79,28 +72,6 @@ def create_app():
 
     return app
 
-def get_additional_hardware_info():
-    import psutil
-    return {
-        "cpu": {
-            "cores": psutil.cpu_count(),
-            "usage_percent": psutil.cpu_percent(interval=1),
-            "architecture": subprocess.getoutput("uname -m")
-        },
-        "memory": {
-            "total": psutil.virtual_memory().total,
-            "used": psutil.virtual_memory().used,
-            "available": psutil.virtual_memory().available,
-            "percent": psutil.virtual_memory().percent
-        },
-        "disk": {
-            "total": psutil.disk_usage('/').total,
-            "used": psutil.disk_usage('/').used,
-            "free": psutil.disk_usage('/').free,
-            "percent": psutil.disk_usage('/').percent
-        }
-    }
-
 if __name__ == '__main__':
     app = create_app()
     app.run(debug=True)
\ No newline at end of file
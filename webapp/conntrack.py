@@ -0,0 +1,168 @@
+# conntrack.py
+
+import heapq
+import os
+import re
+import threading
+import time
+
+PROC_CONNTRACK = '/proc/net/nf_conntrack'
+
+# Seconds an aggregate stays valid before the table is scanned again
+CONNTRACK_TTL = float(os.environ.get('CONNTRACK_TTL', '10'))
+
+# Entries kept in each top-K list
+CONNTRACK_TOP_K = int(os.environ.get('CONNTRACK_TOP_K', '20'))
+
+# "ipv4 2 tcp 6 431999 ESTABLISHED src=... dst=... sport=... dport=... "
+ENTRY_RE = re.compile(
+    r'^\S+\s+\d+\s+(\S+)\s+\d+\s+\d+\s+(?:[A-Z_]+\s+)?'
+    r'src=(\S+) dst=(\S+)(?: sport=\d+ dport=(\d+))?'
+)
+# One "packets=N bytes=N" pair per direction when accounting is enabled
+COUNTERS_RE = re.compile(r'packets=(\d+) bytes=(\d+)')
+
+PROTOCOLS = ('all', 'tcp', 'udp')
+
+
+class TopK:
+    """Approximate heavy hitters in bounded memory
+
+    A count-min sketch (with conservative update, which keeps the
+    overestimate small) estimates bytes and packets for every key seen.
+    Only the current top k candidates are kept by name, so memory does not
+    grow with the number of distinct keys.
+    """
+
+    def __init__(self, k, width=8192, depth=4):
+        self.k = k
+        self.width = width
+        self.depth = depth
+        self._bytes = [[0] * width for _ in range(depth)]
+        self._packets = [[0] * width for _ in range(depth)]
+        self._candidates = {}
+        self._min_key = None
+
+    def slots(self, key):
+        """Sketch slots for a key; reusable across TopKs of the same size"""
+        return [hash((row, key)) % self.width for row in range(self.depth)]
+
+    @staticmethod
+    def _update(rows, slots, value):
+        """Conservative update: raise each counter only as far as needed"""
+        estimate = min(rows[row][slot] for row, slot in enumerate(slots)) + value
+        for row, slot in enumerate(slots):
+            if rows[row][slot] < estimate:
+                rows[row][slot] = estimate
+        return estimate
+
+    def add(self, key, bytes_, packets, slots=None):
+        slots = slots or self.slots(key)
+        estimate = self._update(self._bytes, slots, bytes_)
+        self._update(self._packets, slots, packets)
+
+        candidates = self._candidates
+        if key in candidates:
+            candidates[key] = estimate
+            if key == self._min_key:
+                self._min_key = min(candidates, key=candidates.get)
+        elif len(candidates) < self.k:
+            candidates[key] = estimate
+            if self._min_key is None or estimate < candidates[self._min_key]:
+                self._min_key = key
+        elif estimate > candidates[self._min_key]:
+            del candidates[self._min_key]
+            candidates[key] = estimate
+            self._min_key = min(candidates, key=candidates.get)
+
+    def _packets_estimate(self, key):
+        return min(self._packets[row][slot] for row, slot in enumerate(self.slots(key)))
+
+    def top(self):
+        """Return [(key, bytes, packets)] sorted by bytes, largest first"""
+        ranked = sorted(self._candidates.items(), key=lambda item: item[1], reverse=True)
+        return [(key, bytes_, self._packets_estimate(key)) for key, bytes_ in ranked]
+
+
+def aggregate(path=PROC_CONNTRACK, k=CONNTRACK_TOP_K):
+    """Stream the conntrack table once into top-K flows and clients
+
+    Each conntrack entry is one flow; the k largest are kept in a bounded
+    min-heap. Clients (source addresses, which on the WAN side can be
+    anything) go through a TopK sketch. Byte/packet counters cover both
+    directions. Returns {protocol filter: {'flows': [...], 'clients': [...]}}
+    for each of PROTOCOLS.
+    """
+    flows = {protocol: [] for protocol in PROTOCOLS}
+    clients = {protocol: TopK(k) for protocol in PROTOCOLS}
+    sequence = 0
+
+    try:
+        with open(path) as f:
+            for line in f:
+                match = ENTRY_RE.match(line)
+                if not match:
+                    continue
+                protocol, src, dst, dport = match.groups()
+
+                bytes_ = packets = 0
+                for packet_count, byte_count in COUNTERS_RE.findall(line, match.end()):
+                    packets += int(packet_count)
+                    bytes_ += int(byte_count)
+
+                # The sequence number breaks ties without comparing flows
+                sequence += 1
+                flow = (bytes_, sequence, packets, protocol, src, dst, dport)
+                slots = clients['all'].slots(src)
+                for name in ('all', protocol):
+                    heap = flows.get(name)
+                    if heap is None:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, flow)
+                    elif bytes_ > heap[0][0]:
+                        heapq.heapreplace(heap, flow)
+                    clients[name].add(src, bytes_, packets, slots)
+    except OSError as e:
+        # nf_conntrack is not loaded, unreadable without root, or went away
+        # mid-read; report nothing rather than break the dashboard card
+        if not isinstance(e, FileNotFoundError):
+            print(f"Error reading {path}: {e}")
+        flows = {protocol: [] for protocol in PROTOCOLS}
+        clients = {protocol: TopK(k) for protocol in PROTOCOLS}
+
+    return {
+        protocol: {
+            'flows': [
+                {'src_ip': src, 'dst_ip': dst, 'protocol': proto.upper(),
+                 'dst_port': int(dport) if dport else None, 'bytes': bytes_, 'packets': packets}
+                for bytes_, _, packets, proto, src, dst, dport in sorted(flows[protocol], reverse=True)
+            ],
+            'clients': [
+                {'ip': src, 'bytes': bytes_, 'packets': packets}
+                for src, bytes_, packets in clients[protocol].top()
+            ]
+        }
+        for protocol in PROTOCOLS
+    }
+
+
+class ConntrackStats:
+    """Cached conntrack aggregate shared by all dashboard sessions"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result = None
+        self._expires = 0.0
+
+    def get(self, protocol='all'):
+        # Only one scan runs at a time; other callers wait and reuse it
+        with self._lock:
+            if self._result is None or time.monotonic() >= self._expires:
+                self._result = aggregate()
+                self._expires = time.monotonic() + self.ttl
+            return self._result.get(protocol, self._result['all'])
+
+
+conntrack_stats = ConntrackStats(CONNTRACK_TTL)
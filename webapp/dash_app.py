@@ -1,11 +1,33 @@
 # webapp/dash_app.py
-from dash import Dash, html, dcc, Input, Output, callback_context, State
+from dash import Dash, html, dcc, Input, Output, Patch, callback_context, State, no_update
 import plotly.express as px
 import plotly.graph_objects as go
-import requests
 import time
+from conntrack import conntrack_stats
+from data_provider import get_hardware_snapshot
+from database import Session
+from dns_settings import (MAX_CACHE_SIZE, MAX_MIN_CACHE_TTL, DnsSettingsError,
+                          load_settings, settings_dict, update_settings)
+from dns_stats import dns_stats
+from interface_manager import apply_configuration
+from jobs import job_runner
+from http_utils import payload_etag
+from lease_watcher import lease_watcher
+from static_leases import lease_rows
+from traffic import traffic_collector
 import pandas as pd
 
+# Leases listed on the DHCP page; the full lists are at /dhcp/static-leases
+# and /dhcp/leases
+STATIC_LEASES_SHOWN = 100
+ACTIVE_LEASES_SHOWN = 50
+
+# Dashboard pages, in navigation order
+PAGES = ('overview', 'interfaces', 'firewall', 'dhcp', 'dns', 'traffic', 'settings')
+
+# Intervals of DNS cache history drawn on the DNS page
+DNS_STATS_POINTS = 240
+
 def init_dash(flask_app):
     dash_app = Dash(
         server=flask_app,
@@ -14,120 +36,33 @@ def init_dash(flask_app):
             'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.1.1/css/all.min.css',
             '/static/css/dashboard.css'
         ],
+        # Live updates pushed from the /events stream
+        external_scripts=['/static/js/dashboard_events.js'],
         suppress_callback_exceptions=True  # Important for multi-page apps
     )
 
-    # Define the layout with navigation sidebar and content area
-    dash_app.layout = html.Div([
-        # Store the current page
-        dcc.Store(id='current-page', data='overview'),
-        
-        # Store the latest data
-        dcc.Store(id='hardware-data-store', data={}),
-        
-        # Automatic refresh interval (every 30 seconds)
-        dcc.Interval(
-            id='refresh-interval',
-            interval=30 * 1000,  # in milliseconds
-            n_intervals=0
-        ),
-        
-        # Main layout with sidebar and content
-        html.Div([
-            # Sidebar
-            html.Div([
-                html.Div([
-                    html.H2([html.I(className="fas fa-server mr-2"), " Alpine Router"]),
-                ], className='sidebar-header'),
-                
-                html.Div([
-                    html.Div([
-                        html.Button([
-                            html.I(className="fas fa-tachometer-alt mr-2"),
-                            "Overview"
-                        ], id='nav-overview', className='nav-link active', n_clicks=0),
-                        
-                        html.Button([
-                            html.I(className="fas fa-network-wired mr-2"),
-                            "Network Interfaces"
-                        ], id='nav-interfaces', className='nav-link', n_clicks=0),
-                        
-                        html.Button([
-                            html.I(className="fas fa-shield-alt mr-2"),
-                            "Firewall Rules"
-                        ], id='nav-firewall', className='nav-link', n_clicks=0),
-                        
-                        html.Button([
-                            html.I(className="fas fa-server mr-2"),
-                            "DHCP Server"
-                        ], id='nav-dhcp', className='nav-link', n_clicks=0),
-                        
-                        html.Button([
-                            html.I(className="fas fa-globe mr-2"),
-                            "DNS Settings"
-                        ], id='nav-dns', className='nav-link', n_clicks=0),
-                        
-                        html.Button([
-                            html.I(className="fas fa-chart-line mr-2"),
-                            "Traffic Monitor"
-                        ], id='nav-traffic', className='nav-link', n_clicks=0),
-                        
-                        html.Hr(),
-                        
-                        html.Button([
-                            html.I(className="fas fa-cog mr-2"),
-                            "Settings"
-                        ], id='nav-settings', className='nav-link', n_clicks=0),
-                        
-                        html.A([
-                            html.I(className="fas fa-sliders-h mr-2"),
-                            "Setup Wizard"
-                        ], href='/setup', className='nav-link')
-                    ], className='nav-links')
-                ], className='sidebar-content'),
-                
-                html.Div([
-                    html.P("Alpine Router v0.1.0"),
-                ], className='sidebar-footer')
-            ], className='sidebar'),
-            
-            # Main content area
-            html.Div([
-                # Header with refresh button
-                html.Div([
-                    html.Div(id='page-title', className='page-title'),
-                    html.Div([
-                        html.Button([
-                            html.I(className="fas fa-sync-alt mr-2"),
-                            "Refresh"
-                        ], id='refresh-btn', n_clicks=0, className='refresh-button'),
-                        html.Div(id='last-update-time', className='last-update-time')
-                    ], className='header-controls')
-                ], className='content-header'),
-                
-                # Dynamic content area - changes based on navigation
-                html.Div(id='page-content', className='content-body')
-            ], className='main-content')
-        ], className='dashboard-container')
-    ])
-    
     # Callback to update data store
     @dash_app.callback(
         [Output('hardware-data-store', 'data'),
+         Output('hardware-etag', 'data'),
          Output('last-update-time', 'children')],
         [Input('refresh-btn', 'n_clicks'),
-         Input('refresh-interval', 'n_intervals')]
+         Input('refresh-interval', 'n_intervals')],
+        [State('hardware-etag', 'data')]
     )
-    def update_data_store(n_clicks, n_intervals):
+    def update_data_store(n_clicks, n_intervals, etag):
         current_time = time.strftime('%H:%M:%S')
         try:
-            result = requests.get('http://localhost:5000/hardware')
-            if result.status_code == 200:
-                return result.json(), f'Last updated: {current_time}'
-            else:
-                return {}, f'Update failed at {current_time}'
+            # Same data as /hardware, fetched in-process
+            snapshot = get_hardware_snapshot()
         except Exception as e:
-            return {}, f'Error: {str(e)}'
+            return {}, None, f'Error: {str(e)}'
+
+        new_etag = payload_etag(snapshot)
+        if new_etag == etag:
+            # Nothing changed; leave the store (and the page) alone
+            return no_update, no_update, f'Last updated: {current_time}'
+        return snapshot, new_etag, f'Last updated: {current_time}'
     
     # Simplified callback to switch pages
     @dash_app.callback(
@@ -205,146 +140,157 @@ def init_dash(flask_app):
         }
         return titles.get(current_page, 'Dashboard')
     
-    # Callback to render the correct page content
+    # Callback to show the selected page and hide the others
     @dash_app.callback(
-        Output('page-content', 'children'),
-        [Input('current-page', 'data'),
-         Input('hardware-data-store', 'data')]
+        [Output(f'page-{page}', 'className') for page in PAGES],
+        Input('current-page', 'data')
     )
-    def render_page_content(current_page, data):
-        if not data:
-            data = {}  # Provide a default empty dict to avoid errors
-            
-        if current_page == 'overview':
-            return render_overview_page(data)
-        elif current_page == 'interfaces':
-            return render_interfaces_page(data)
-        elif current_page == 'firewall':
-            return render_firewall_page(data)
-        elif current_page == 'dhcp':
-            return render_dhcp_page(data)
-        elif current_page == 'dns':
-            return render_dns_page(data)
-        elif current_page == 'traffic':
-            return render_traffic_page(data)
-        elif current_page == 'settings':
-            return render_settings_page(data)
-        else:
-            return render_overview_page(data)  # Default to overview if page not found
-    
+    def show_page(current_page):
+        if current_page not in PAGES:
+            current_page = 'overview'  # Default to overview if page not found
+        return ['page' if page == current_page else 'page hidden' for page in PAGES]
+
+    def only_changed(value, previous):
+        """no_update if a component already shows value"""
+        return no_update if value == previous else value
+
+    def patch_children(rows, previous, build):
+        """Update a list of children, one per row, sending only what changed
+
+        rows are lists of the values each child shows and previous the rows
+        rendered last (kept in a Store). Returns (children, rows): the full
+        list when the number of children changed, otherwise a Patch that
+        replaces only the children whose row changed.
+        """
+        if rows == previous:
+            return no_update, no_update
+        if previous is None or len(rows) != len(previous):
+            return [build(row) for row in rows], rows
+        patch = Patch()
+        for i, (row, old) in enumerate(zip(rows, previous)):
+            if row != old:
+                patch[i] = build(row)
+        return patch, rows
+
+    def refresh_rows(values, previous_etag, build):
+        """Rebuild table rows only if the values they show changed
+
+        Returns (children, etag) for the rows' tbody and etag Store.
+        """
+        etag = payload_etag(values)
+        if etag == previous_etag:
+            return no_update, no_update
+        return build(values), etag
+
     # ===== PAGE RENDERING FUNCTIONS =====
     
-    def render_overview_page(data):
-        # Simple overview page when no data is available
-        if not data or not data.get('interfaces') or not data.get('hardware_info'):
-            return html.Div([
-                html.Div("No system data available. Please refresh the page.", className="alert alert-warning")
-            ])
-        
-        interfaces = data.get('interfaces', [])
-        hardware_info = data.get('hardware_info', {})
-        
-        # Count up/down interfaces
-        up_interfaces = sum(1 for iface in interfaces if iface.get('status') == 'UP')
-        total_interfaces = len(interfaces)
-        
+    # Overview status cards: (id, icon, title)
+    OVERVIEW_CARDS = (
+        ('network', 'fa-network-wired', 'Network Status'),
+        ('cpu', 'fa-microchip', 'CPU'),
+        ('memory', 'fa-memory', 'Memory'),
+        ('disk', 'fa-hdd', 'Storage'),
+    )
+    OVERVIEW_FIELDS = [f'overview-{card}-{part}' for card, _, _ in OVERVIEW_CARDS for part in ('value', 'detail')]
+
+    def build_overview_page():
+        """Overview page; update_overview fills in the values"""
         # System cards
         system_cards = html.Div([
-            # Network Status Card
-            html.Div([
-                html.Div([
-                    html.I(className="fas fa-network-wired"),
-                ], className="card-icon"),
-                html.Div([
-                    html.H3("Network Status"),
-                    html.Div([
-                        html.Span(f"{up_interfaces}/{total_interfaces}"),
-                        html.Span(" interfaces up")
-                    ], className="card-value")
-                ], className="card-content")
-            ], className="status-card"),
-            
-            # CPU Status Card
             html.Div([
                 html.Div([
-                    html.I(className="fas fa-microchip"),
+                    html.I(className=f"fas {icon}"),
                 ], className="card-icon"),
                 html.Div([
-                    html.H3("CPU"),
-                    html.Div(f"{hardware_info.get('cpu', {}).get('usage_percent', 0)}%", className="card-value"),
-                    html.Div(f"Cores: {hardware_info.get('cpu', {}).get('cores', 'N/A')}", className="card-detail")
+                    html.H3(title),
+                    html.Div(id=f"overview-{card}-value", className="card-value"),
+                    html.Div(id=f"overview-{card}-detail", className="card-detail")
                 ], className="card-content")
-            ], className="status-card"),
-            
-            # Memory Status Card
-            html.Div([
-                html.Div([
-                    html.I(className="fas fa-memory"),
-                ], className="card-icon"),
-                html.Div([
-                    html.H3("Memory"),
-                    html.Div(f"{hardware_info.get('memory', {}).get('percent', 0)}%", className="card-value"),
-                    html.Div([
-                        f"Used: {hardware_info.get('memory', {}).get('used', 0) // (1024**2)} MB / ",
-                        f"{hardware_info.get('memory', {}).get('total', 0) // (1024**2)} MB"
-                    ], className="card-detail")
-                ], className="card-content")
-            ], className="status-card"),
-            
-            # Storage Status Card
-            html.Div([
-                html.Div([
-                    html.I(className="fas fa-hdd"),
-                ], className="card-icon"),
-                html.Div([
-                    html.H3("Storage"),
-                    html.Div(f"{hardware_info.get('disk', {}).get('percent', 0)}%", className="card-value"),
-                    html.Div([
-                        f"Free: {hardware_info.get('disk', {}).get('free', 0) // (1024**3)} GB / ",
-                        f"{hardware_info.get('disk', {}).get('total', 0) // (1024**3)} GB"
-                    ], className="card-detail")
-                ], className="card-content")
-            ], className="status-card"),
+            ], className="status-card") for card, icon, title in OVERVIEW_CARDS
         ], className="status-cards-grid")
-        
+
         # Network interfaces
         network_interfaces = html.Div([
             html.Div([
                 html.H3("Network Interfaces"),
-                html.Div([
-                    html.Div([
-                        html.Div([
-                            html.H4(iface['name'], className='interface-name'),
-                            html.Span(iface['status'], className=f"status-badge {'status-up' if iface['status'] == 'UP' else 'status-down'}")
-                        ], className='interface-header'),
-                        html.Div([
-                            html.Div(f"Type: {iface['label']}"),
-                            html.Div(f"MAC: {iface['mac']}"),
-                            html.Div(f"IPs: {', '.join(iface['ips']) if iface['ips'] else 'None'}")
-                        ], className='interface-details')
-                    ], className='interface-card') for iface in interfaces
-                ], className='interfaces-grid')
+                html.Div(id='overview-interfaces', className='interfaces-grid')
             ], className="card interfaces-card")
         ])
-        
+
         return html.Div([
-            system_cards,
-            network_interfaces
+            # Simple overview page when no data is available
+            html.Div("No system data available. Please refresh the page.",
+                     id='overview-no-data', className="alert alert-warning"),
+            html.Div([system_cards, network_interfaces], id='overview-body', className='hidden'),
+            dcc.Store(id='overview-interfaces-rows', data=None)
         ])
 
-    def render_interfaces_page(data):
-        """Render the network interfaces configuration page"""
-        if not data or not data.get('interfaces'):
-            return html.Div([
-                html.Div("No interface data available. Please refresh the page.", className="alert alert-warning")
-            ])
-
+    def overview_values(data):
+        """Text of every overview card, in OVERVIEW_FIELDS order"""
         interfaces = data.get('interfaces', [])
+        hardware_info = data.get('hardware_info', {})
+        cpu = hardware_info.get('cpu', {})
+        memory = hardware_info.get('memory', {})
+        disk = hardware_info.get('disk', {})
 
-        # Organize interfaces by type
-        wan_interfaces = [iface for iface in interfaces if iface.get('is_wan')]
-        lan_interfaces = [iface for iface in interfaces if not iface.get('is_wan')]
+        # Count up/down interfaces
+        up_interfaces = sum(1 for iface in interfaces if iface.get('status') == 'UP')
+
+        return [
+            f"{up_interfaces}/{len(interfaces)} interfaces up",
+            None,
+            f"{cpu.get('usage_percent', 0)}%",
+            f"Cores: {cpu.get('cores', 'N/A')}",
+            f"{memory.get('percent', 0)}%",
+            f"Used: {memory.get('used', 0) // (1024**2)} MB / {memory.get('total', 0) // (1024**2)} MB",
+            f"{disk.get('percent', 0)}%",
+            f"Free: {disk.get('free', 0) // (1024**3)} GB / {disk.get('total', 0) // (1024**3)} GB",
+        ]
+
+    def overview_interface_card(row):
+        name, status, label, mac, ips = row
+        return html.Div([
+            html.Div([
+                html.H4(name, className='interface-name'),
+                html.Span(status, className=f"status-badge {'status-up' if status == 'UP' else 'status-down'}")
+            ], className='interface-header'),
+            html.Div([
+                html.Div(f"Type: {label}"),
+                html.Div(f"MAC: {mac}"),
+                html.Div(f"IPs: {', '.join(ips) if ips else 'None'}")
+            ], className='interface-details')
+        ], className='interface-card')
+
+    # Callback to update only the overview values that changed
+    @dash_app.callback(
+        [Output('overview-no-data', 'className'),
+         Output('overview-body', 'className')]
+        + [Output(field, 'children') for field in OVERVIEW_FIELDS]
+        + [Output('overview-interfaces', 'children'),
+           Output('overview-interfaces-rows', 'data')],
+        Input('hardware-data-store', 'data'),
+        [State(field, 'children') for field in OVERVIEW_FIELDS]
+        + [State('overview-interfaces-rows', 'data')],
+        prevent_initial_call=True
+    )
+    def update_overview(data, *state):
+        shown, previous_rows = state[:-1], state[-1]
+        if not data or not data.get('interfaces') or not data.get('hardware_info'):
+            return ['alert alert-warning', 'hidden'] + [no_update] * (len(OVERVIEW_FIELDS) + 2)
+
+        rows = [
+            [iface['name'], iface['status'], iface['label'], iface['mac'], iface['ips']]
+            for iface in data['interfaces']
+        ]
+        children, rows = patch_children(rows, previous_rows, overview_interface_card)
+        return (
+            ['alert alert-warning hidden', '']
+            + [only_changed(value, previous) for value, previous in zip(overview_values(data), shown)]
+            + [children, rows]
+        )
 
+    def build_interfaces_page():
+        """Network interfaces page; update_interface_cards fills in the cards"""
         return html.Div([
             # Interface management header
             html.Div([
@@ -353,142 +299,249 @@ def init_dash(flask_app):
                     html.P("View and configure your network interfaces")
                 ], className="module-header"),
 
-                # WAN Interfaces section
-                html.Div([
-                    html.H4([
-                        html.I(className="fas fa-globe mr-2"),
-                        "WAN Interfaces"
-                    ], className="section-title"),
-                    html.P("Internet-facing connections", className="section-description"),
+                html.Div("No interface data available. Please refresh the page.",
+                         id="interfaces-no-data", className="alert alert-warning"),
 
-                    html.Div([
-                        html.Div([
-                            # Interface header
-                            html.Div([
-                                html.Div([
-                                    html.I(className="fas fa-network-wired mr-2"),
-                                    iface['name']
-                                ], className="interface-config-name"),
-                                html.Div([
-                                    html.Span(iface['status'], className=f"status-badge {'status-up' if iface['status'] == 'UP' else 'status-down'}")
-                                ])
-                            ], className="interface-config-header"),
-
-                            # Interface details
-                            html.Div([
-                                html.Div([
-                                    html.Div("MAC Address", className="detail-label"),
-                                    html.Div(iface['mac'] or "N/A", className="detail-value")
-                                ], className="detail-row"),
-
-                                html.Div([
-                                    html.Div("IP Configuration", className="detail-label"),
-                                    html.Div("DHCP" if iface.get('dhcp_enabled', True) else "Static", className="detail-value")
-                                ], className="detail-row"),
-
-                                html.Div([
-                                    html.Div("IP Address", className="detail-label"),
-                                    html.Div(', '.join(iface['ips']) if iface['ips'] else "None assigned", className="detail-value")
-                                ], className="detail-row"),
-
-                                html.Div([
-                                    html.Div("DNS Servers", className="detail-label"),
-                                    html.Div(iface.get('dns_servers', "Not configured"), className="detail-value")
-                                ], className="detail-row") if iface.get('is_wan') else None,
-                            ], className="interface-config-details"),
-
-                            # Interface actions
-                            html.Div([
-                                html.Button([
-                                    html.I(className="fas fa-edit mr-2"),
-                                    "Edit"
-                                ], id=f"edit-interface-{iface['name']}", className="btn btn-primary mr-2"),
-
-                                html.Button([
-                                    html.I(className=f"fas {'fa-toggle-on' if iface['status'] == 'UP' else 'fa-toggle-off'} mr-2"),
-                                    "Toggle"
-                                ], id=f"toggle-interface-{iface['name']}", className="btn btn-secondary")
-                            ], className="interface-config-actions")
-                        ], className="interface-config-card") for iface in wan_interfaces
-                    ], className="interface-config-grid"),
-
-                    # Show message if no WAN interfaces
-                    html.Div("No WAN interfaces configured. Please use the Setup Wizard to configure a WAN interface.",
-                             className="alert alert-warning") if not wan_interfaces else None,
-                ], className="interface-section"),
-
-                # LAN Interfaces section
                 html.Div([
-                    html.H4([
-                        html.I(className="fas fa-network-wired mr-2"),
-                        "LAN Interfaces"
-                    ], className="section-title"),
-                    html.P("Local network connections", className="section-description"),
+                    # WAN Interfaces section
+                    html.Div([
+                        html.H4([
+                            html.I(className="fas fa-globe mr-2"),
+                            "WAN Interfaces"
+                        ], className="section-title"),
+                        html.P("Internet-facing connections", className="section-description"),
+
+                        html.Div(id="wan-interfaces", className="interface-config-grid"),
 
+                        # Shown if there are no WAN interfaces
+                        html.Div("No WAN interfaces configured. Please use the Setup Wizard to configure a WAN interface.",
+                                 id="wan-interfaces-empty", className="alert alert-warning hidden"),
+                    ], className="interface-section"),
+
+                    # LAN Interfaces section
                     html.Div([
-                        html.Div([
-                            # Interface header
-                            html.Div([
-                                html.Div([
-                                    html.I(className="fas fa-network-wired mr-2"),
-                                    iface['name']
-                                ], className="interface-config-name"),
-                                html.Div([
-                                    html.Span(iface['status'], className=f"status-badge {'status-up' if iface['status'] == 'UP' else 'status-down'}")
-                                ])
-                            ], className="interface-config-header"),
-
-                            # Interface details
-                            html.Div([
-                                html.Div([
-                                    html.Div("MAC Address", className="detail-label"),
-                                    html.Div(iface['mac'] or "N/A", className="detail-value")
-                                ], className="detail-row"),
-
-                                html.Div([
-                                    html.Div("IP Address", className="detail-label"),
-                                    html.Div(', '.join(iface['ips']) if iface['ips'] else "None assigned", className="detail-value")
-                                ], className="detail-row"),
-
-                                html.Div([
-                                    html.Div("DHCP Server", className="detail-label"),
-                                    html.Div("Enabled" if iface.get('dhcp_enabled', True) else "Disabled", className="detail-value")
-                                ], className="detail-row"),
-                            ], className="interface-config-details"),
-
-                            # Interface actions
-                            html.Div([
-                                html.Button([
-                                    html.I(className="fas fa-edit mr-2"),
-                                    "Edit"
-                                ], id=f"edit-interface-{iface['name']}", className="btn btn-primary mr-2"),
-
-                                html.Button([
-                                    html.I(className=f"fas {'fa-toggle-on' if iface['status'] == 'UP' else 'fa-toggle-off'} mr-2"),
-                                    "Toggle"
-                                ], id=f"toggle-interface-{iface['name']}", className="btn btn-secondary")
-                            ], className="interface-config-actions")
-                        ], className="interface-config-card") for iface in lan_interfaces
-                    ], className="interface-config-grid"),
-
-                    # Show message if no LAN interfaces
-                    html.Div("No LAN interfaces configured. Please use the Setup Wizard to configure at least one LAN interface.",
-                             className="alert alert-warning") if not lan_interfaces else None,
-                ], className="interface-section"),
+                        html.H4([
+                            html.I(className="fas fa-network-wired mr-2"),
+                            "LAN Interfaces"
+                        ], className="section-title"),
+                        html.P("Local network connections", className="section-description"),
+
+                        html.Div(id="lan-interfaces", className="interface-config-grid"),
+
+                        # Shown if there are no LAN interfaces
+                        html.Div("No LAN interfaces configured. Please use the Setup Wizard to configure at least one LAN interface.",
+                                 id="lan-interfaces-empty", className="alert alert-warning hidden"),
+                    ], className="interface-section"),
+                ], id="interfaces-body", className="hidden"),
+
+                dcc.Store(id="wan-interfaces-rows", data=None),
+                dcc.Store(id="lan-interfaces-rows", data=None)
             ], className="card")
         ])
 
-    def render_dhcp_page(data):
-        """Render the DHCP server configuration page"""
+    def interface_config_card(row):
+        """Configuration card of a WAN or LAN interface"""
+        name, is_wan, status, mac, ips, dhcp_enabled, dns_servers = row
+        if is_wan:
+            details = [
+                ("IP Configuration", "DHCP" if dhcp_enabled else "Static"),
+                ("IP Address", ', '.join(ips) if ips else "None assigned"),
+                ("DNS Servers", dns_servers or "Not configured"),
+            ]
+        else:
+            details = [
+                ("IP Address", ', '.join(ips) if ips else "None assigned"),
+                ("DHCP Server", "Enabled" if dhcp_enabled else "Disabled"),
+            ]
+
+        return html.Div([
+            # Interface header
+            html.Div([
+                html.Div([
+                    html.I(className="fas fa-network-wired mr-2"),
+                    name
+                ], className="interface-config-name"),
+                html.Div([
+                    html.Span(status, className=f"status-badge {'status-up' if status == 'UP' else 'status-down'}")
+                ])
+            ], className="interface-config-header"),
+
+            # Interface details
+            html.Div([
+                html.Div([
+                    html.Div("MAC Address", className="detail-label"),
+                    html.Div(mac or "N/A", className="detail-value")
+                ], className="detail-row")
+            ] + [
+                html.Div([
+                    html.Div(label, className="detail-label"),
+                    html.Div(value, className="detail-value")
+                ], className="detail-row") for label, value in details
+            ], className="interface-config-details"),
+
+            # Interface actions
+            html.Div([
+                html.Button([
+                    html.I(className="fas fa-edit mr-2"),
+                    "Edit"
+                ], id=f"edit-interface-{name}", className="btn btn-primary mr-2"),
+
+                html.Button([
+                    html.I(className=f"fas {'fa-toggle-on' if status == 'UP' else 'fa-toggle-off'} mr-2"),
+                    "Toggle"
+                ], id=f"toggle-interface-{name}", className="btn btn-secondary")
+            ], className="interface-config-actions")
+        ], className="interface-config-card")
+
+    # Callback to update only the interface cards that changed
+    @dash_app.callback(
+        [Output('interfaces-no-data', 'className'),
+         Output('interfaces-body', 'className'),
+         Output('wan-interfaces', 'children'),
+         Output('wan-interfaces-rows', 'data'),
+         Output('wan-interfaces-empty', 'className'),
+         Output('lan-interfaces', 'children'),
+         Output('lan-interfaces-rows', 'data'),
+         Output('lan-interfaces-empty', 'className')],
+        Input('hardware-data-store', 'data'),
+        [State('wan-interfaces-rows', 'data'),
+         State('lan-interfaces-rows', 'data')],
+        prevent_initial_call=True
+    )
+    def update_interface_cards(data, previous_wan, previous_lan):
         if not data or not data.get('interfaces'):
-            return html.Div([
-                html.Div("No interface data available. Please refresh the page.", className="alert alert-warning")
-            ])
+            return ['alert alert-warning', 'hidden'] + [no_update] * 6
 
-        interfaces = data.get('interfaces', [])
+        rows = [
+            [iface['name'], bool(iface.get('is_wan')), iface['status'], iface['mac'], iface['ips'],
+             iface.get('dhcp_enabled', True), iface.get('dns_servers')]
+            for iface in data['interfaces']
+        ]
+        # Organize interfaces by type
+        wan_rows = [row for row in rows if row[1]]
+        lan_rows = [row for row in rows if not row[1]]
+
+        # Show a warning in place of a section without interfaces
+        wan_empty = 'alert alert-warning hidden' if wan_rows else 'alert alert-warning'
+        lan_empty = 'alert alert-warning hidden' if lan_rows else 'alert alert-warning'
+
+        wan_children, wan_rows = patch_children(wan_rows, previous_wan, interface_config_card)
+        lan_children, lan_rows = patch_children(lan_rows, previous_lan, interface_config_card)
+        return [
+            'alert alert-warning hidden', '',
+            wan_children, wan_rows, wan_empty,
+            lan_children, lan_rows, lan_empty
+        ]
+
+    def static_lease_values():
+        """Shown values of the stored static leases, capped at STATIC_LEASES_SHOWN"""
+        leases = lease_rows(Session())
+        return {
+            'rows': [[hostname or '-', mac, ip] for mac, ip, hostname in leases[:STATIC_LEASES_SHOWN]],
+            'total': len(leases)
+        }
+
+    def build_static_lease_rows(values):
+        """Table rows for the static leases"""
+        if not values['rows']:
+            return [html.Tr([html.Td("No static leases", colSpan=4)])]
+
+        rows = [
+            html.Tr([
+                html.Td(hostname),
+                html.Td(mac),
+                html.Td(ip),
+                html.Td([
+                    html.Button([
+                        html.I(className="fas fa-edit")
+                    ], id=f"edit-lease-{i}", className="btn btn-sm btn-primary mr-2"),
+                    html.Button([
+                        html.I(className="fas fa-trash")
+                    ], id=f"delete-lease-{i}", className="btn btn-sm btn-danger")
+                ])
+            ]) for i, (hostname, mac, ip) in enumerate(values['rows'])
+        ]
+        if values['total'] > len(values['rows']):
+            rows.append(html.Tr([
+                html.Td(f"... and {values['total'] - len(values['rows'])} more (see /dhcp/static-leases)", colSpan=4)
+            ]))
+        return rows
+
+    def active_lease_values():
+        """Shown values of the first page of active leases"""
+        result = lease_watcher.query(per_page=ACTIVE_LEASES_SHOWN)
+        now = time.time()
+        rows = []
+        for lease in result['leases']:
+            if lease['expires'] is None:
+                expires = "Never"
+            else:
+                remaining = max(0, lease['expires'] - now)
+                expires = f"{int(remaining // 3600)} hours" if remaining >= 3600 else f"{int(remaining // 60)} minutes"
+            rows.append([lease['hostname'] or '-', lease['mac'], lease['ip'], expires])
+        return {'rows': rows, 'total': result['total']}
+
+    def build_active_lease_rows(values):
+        """Table rows for the active leases"""
+        if not values['rows']:
+            return [html.Tr([html.Td("No active leases", colSpan=4)])]
+
+        rows = [html.Tr([html.Td(value) for value in row]) for row in values['rows']]
+        if values['total'] > len(values['rows']):
+            rows.append(html.Tr([
+                html.Td(f"... and {values['total'] - len(values['rows'])} more (see /dhcp/leases)", colSpan=4)
+            ]))
+        return rows
+
+    # Callback to reload the static leases table when the DHCP page is shown
+    @dash_app.callback(
+        [Output('static-leases-body', 'children'),
+         Output('static-leases-etag', 'data')],
+        Input('current-page', 'data'),
+        State('static-leases-etag', 'data')
+    )
+    def update_static_leases(current_page, etag):
+        if current_page != 'dhcp':
+            return no_update, no_update
+        return refresh_rows(static_lease_values(), etag, build_static_lease_rows)
+
+    # Callback to reload the active leases table
+    @dash_app.callback(
+        [Output('active-leases-body', 'children'),
+         Output('active-leases-etag', 'data')],
+        [Input('refresh-dhcp-leases', 'n_clicks'),
+         Input('current-page', 'data')],
+        State('active-leases-etag', 'data')
+    )
+    def update_active_leases(n_clicks, current_page, etag):
+        if current_page != 'dhcp':
+            return no_update, no_update
+        return refresh_rows(active_lease_values(), etag, build_active_lease_rows)
+
+    # Callback to keep the DHCP interface choices in line with the LANs,
+    # leaving the selection alone while it is still valid
+    @dash_app.callback(
+        [Output('dhcp-interface', 'options'),
+         Output('dhcp-interface', 'value'),
+         Output('dhcp-interface', 'disabled')],
+        Input('hardware-data-store', 'data'),
+        [State('dhcp-interface', 'options'),
+         State('dhcp-interface', 'value')],
+        prevent_initial_call=True
+    )
+    def update_dhcp_interfaces(data, options, value):
+        if not data or not data.get('interfaces'):
+            return no_update, no_update, no_update
 
         # Get LAN interfaces (only these can run DHCP server)
-        lan_interfaces = [iface for iface in interfaces if not iface.get('is_wan')]
+        names = [iface['name'] for iface in data['interfaces'] if not iface.get('is_wan')]
+        new_options = [{'label': name, 'value': name} for name in names]
+        if value not in names:
+            value = names[0] if names else None
+        return only_changed(new_options, options), value, not names
+
+    def build_dhcp_page():
+        """DHCP server configuration page; callbacks fill in the tables"""
 
         # Sample DHCP configuration (would come from API/database in real implementation)
         dhcp_config = {
@@ -496,11 +549,7 @@ def init_dash(flask_app):
             'start_ip': '192.168.1.100',
             'end_ip': '192.168.1.200',
             'lease_time': 24,  # hours
-            'domain': 'lan.local',
-            'static_leases': [
-                {'mac': '00:11:22:33:44:55', 'ip': '192.168.1.10', 'hostname': 'desktop-pc'},
-                {'mac': 'aa:bb:cc:dd:ee:ff', 'ip': '192.168.1.20', 'hostname': 'printer'}
-            ]
+            'domain': 'lan.local'
         }
 
         return html.Div([
@@ -531,14 +580,12 @@ def init_dash(flask_app):
                             html.Label("Interface", htmlFor="dhcp-interface"),
                             dcc.Dropdown(
                                 id="dhcp-interface",
-                                options=[
-                                    {'label': iface['name'], 'value': iface['name']} for iface in lan_interfaces
-                                ],
-                                value=lan_interfaces[0]['name'] if lan_interfaces else None,
+                                options=[],
+                                value=None,
                                 placeholder="Select LAN interface",
                                 clearable=False,
                                 className="form-control",
-                                disabled=len(lan_interfaces) == 0
+                                disabled=True
                             )
                         ], className="form-group col-md-6"),
                     ], className="form-row"),
@@ -624,21 +671,7 @@ def init_dash(flask_app):
                                     html.Th("Actions")
                                 ])
                             ]),
-                            html.Tbody([
-                                html.Tr([
-                                    html.Td(lease['hostname']),
-                                    html.Td(lease['mac']),
-                                    html.Td(lease['ip']),
-                                    html.Td([
-                                        html.Button([
-                                            html.I(className="fas fa-edit")
-                                        ], id=f"edit-lease-{i}", className="btn btn-sm btn-primary mr-2"),
-                                        html.Button([
-                                            html.I(className="fas fa-trash")
-                                        ], id=f"delete-lease-{i}", className="btn btn-sm btn-danger")
-                                    ])
-                                ]) for i, lease in enumerate(dhcp_config['static_leases'])
-                            ])
+                            html.Tbody(id="static-leases-body")
                         ], className="data-table")
                     ], className="table-container")
                 ], className="module-content")
@@ -667,29 +700,18 @@ def init_dash(flask_app):
                                     html.Th("Expires")
                                 ])
                             ]),
-                            html.Tbody([
-                                # Example active leases - would be populated from backend
-                                html.Tr([
-                                    html.Td("laptop-1"),
-                                    html.Td("11:22:33:44:55:66"),
-                                    html.Td("192.168.1.101"),
-                                    html.Td("23 hours")
-                                ]),
-                                html.Tr([
-                                    html.Td("smartphone"),
-                                    html.Td("aa:bb:cc:11:22:33"),
-                                    html.Td("192.168.1.102"),
-                                    html.Td("22 hours")
-                                ]),
-                            ])
+                            html.Tbody(id="active-leases-body")
                         ], className="data-table")
                     ], className="table-container")
                 ], className="module-content")
             ], className="card"),
+
+            dcc.Store(id="static-leases-etag", data=None),
+            dcc.Store(id="active-leases-etag", data=None)
         ])
 
-    def render_firewall_page(data):
-        """Render the firewall rules management page"""
+    def build_firewall_page():
+        """Firewall rules management page"""
 
         # Sample firewall rules (hardcoded for now)
         firewall_rules = [
@@ -954,8 +976,8 @@ def init_dash(flask_app):
         ])
 
 
-    def render_dns_page(data):
-        """Render the DNS settings page"""
+    def build_dns_page():
+        """DNS settings page; callbacks load the cache settings and statistics"""
 
         # Sample DNS settings (hardcoded for now)
         dns_settings = {
@@ -1050,6 +1072,109 @@ def init_dash(flask_app):
                 ], className="dns-settings-form")
             ], className="card"),
 
+            # DNS cache settings card
+            html.Div([
+                html.Div([
+                    html.H3("DNS Cache"),
+                    html.Div([
+                        html.Button([
+                            html.I(className="fas fa-save mr-2"),
+                            "Save and Apply"
+                        ], id="save-dns-cache", className="btn btn-primary")
+                    ], className="module-actions")
+                ], className="module-header"),
+
+                html.Div([
+                    html.Div([
+                        html.Div([
+                            html.Label("Cache Size (entries)", htmlFor="dns-cache-size"),
+                            dcc.Input(
+                                id="dns-cache-size",
+                                type="number",
+                                min=0,
+                                max=MAX_CACHE_SIZE,
+                                className="form-control"
+                            )
+                        ], className="form-group col-md-4"),
+
+                        html.Div([
+                            html.Label("Minimum TTL (seconds)", htmlFor="dns-min-ttl"),
+                            dcc.Input(
+                                id="dns-min-ttl",
+                                type="number",
+                                min=0,
+                                max=MAX_MIN_CACHE_TTL,
+                                placeholder="0 keeps upstream TTLs",
+                                className="form-control"
+                            )
+                        ], className="form-group col-md-4"),
+
+                        html.Div([
+                            html.Label("Maximum TTL (seconds)", htmlFor="dns-max-ttl"),
+                            dcc.Input(
+                                id="dns-max-ttl",
+                                type="number",
+                                min=0,
+                                placeholder="0 keeps upstream TTLs",
+                                className="form-control"
+                            )
+                        ], className="form-group col-md-4")
+                    ], className="form-row"),
+
+                    html.Div([
+                        html.Div([
+                            html.Label("Upstream Servers", htmlFor="dns-upstream-policy"),
+                            dcc.Dropdown(
+                                id="dns-upstream-policy",
+                                options=[
+                                    {'label': 'Fastest responding', 'value': 'default'},
+                                    {'label': 'In order (strict-order)', 'value': 'strict-order'},
+                                    {'label': 'All at once (all-servers)', 'value': 'all-servers'}
+                                ],
+                                value='default',
+                                clearable=False
+                            )
+                        ], className="form-group col-md-6"),
+
+                        html.Div([
+                            dcc.Checklist(
+                                id="dns-negative-cache",
+                                options=[{'label': 'Cache negative replies (NXDOMAIN)', 'value': 'NEGCACHE'}],
+                                value=['NEGCACHE'],
+                                labelStyle={'display': 'block', 'marginTop': '30px'}
+                            )
+                        ], className="form-group col-md-6")
+                    ], className="form-row"),
+
+                    html.Div(id="dns-cache-status")
+                ], className="dns-settings-form")
+            ], className="card"),
+
+            # DNS cache hit rate card
+            html.Div([
+                html.Div([
+                    html.H3("Cache Hit Rate"),
+                    html.Div([
+                        html.Button([
+                            html.I(className="fas fa-sync-alt mr-2"),
+                            "Refresh"
+                        ], id="refresh-dns-stats", className="btn btn-secondary")
+                    ], className="module-actions")
+                ], className="module-header"),
+
+                html.Div([
+                    html.Div(id="dns-stats-summary"),
+                    html.Div([
+                        dcc.Graph(
+                            id="dns-hit-rate-graph",
+                            figure=build_dns_hit_rate_figure(),
+                            config={'displayModeBar': False}
+                        )
+                    ], className="chart-container"),
+                    dcc.Store(id="dns-stats-etag", data=None)
+                ], className="module-content")
+            ], className="card"),
+
             # DNS domain blocking card
             html.Div([
                 html.Div([
@@ -1128,71 +1253,140 @@ def init_dash(flask_app):
             ], className="card")
         ])
 
-    def render_traffic_page(data):
-        """Render the traffic monitor page"""
+    def build_dns_stats_summary(current):
+        """Current dnsmasq cache counters as a line of text"""
+        if current is None:
+            return html.P("DNS cache statistics are not available yet")
+
+        rate = current['hit_rate']
+        return html.P(
+            f"Hit rate {rate:.1%} since dnsmasq started" if rate is not None else "No queries answered yet",
+            title=(f"{current['hits']} hits, {current['misses']} misses, "
+                   f"{current['insertions']} insertions, {current['evictions']} evictions, "
+                   f"cache size {current['cache_size']}")
+        )
 
-        # Sample traffic data (hardcoded for now)
-        traffic_data = {
-            'interfaces': [
-                {'name': 'eth0', 'rx_bytes': 1024000, 'tx_bytes': 512000, 'rx_packets': 1500, 'tx_packets': 1200},
-                {'name': 'eth1', 'rx_bytes': 2048000, 'tx_bytes': 1024000, 'rx_packets': 3000, 'tx_packets': 2500}
+    def build_dns_hit_rate_figure():
+        """Empty line chart of the cache hit rate and evictions per interval"""
+        return go.Figure(
+            data=[
+                go.Scatter(
+                    name='Hit rate (%)',
+                    x=[],
+                    y=[],
+                    mode='lines',
+                    line=dict(color='#3498db')
+                ),
+                go.Bar(
+                    name='Evictions',
+                    x=[],
+                    y=[],
+                    marker_color='#e74c3c',
+                    yaxis='y2',
+                    opacity=0.5
+                )
             ],
-            'top_connections': [
-                {'src_ip': '192.168.1.10', 'dst_ip': '203.0.113.1', 'protocol': 'TCP', 'dst_port': 443, 'bytes': 1024000},
-                {'src_ip': '192.168.1.15', 'dst_ip': '198.51.100.1', 'protocol': 'UDP', 'dst_port': 53, 'bytes': 51200},
-                {'src_ip': '192.168.1.20', 'dst_ip': '198.51.100.5', 'protocol': 'TCP', 'dst_port': 80, 'bytes': 512000}
-            ]
-        }
+            layout=go.Layout(
+                title='DNS Cache Hit Rate',
+                yaxis=dict(title='Hit rate (%)', range=[0, 100]),
+                yaxis2=dict(title='Evictions', overlaying='y', side='right', rangemode='tozero'),
+                margin=dict(l=40, r=40, t=80, b=40)
+            )
+        )
+
+    def patch_figure_data(x, series):
+        """Patch replacing the x and y values of a figure's traces"""
+        patch = Patch()
+        for i, y in enumerate(series):
+            patch['data'][i]['x'] = x
+            patch['data'][i]['y'] = y
+        return patch
+
+    # Callback to redraw the DNS cache statistics when they changed
+    @dash_app.callback(
+        [Output('dns-stats-summary', 'children'),
+         Output('dns-hit-rate-graph', 'figure'),
+         Output('dns-stats-etag', 'data')],
+        [Input('refresh-dns-stats', 'n_clicks'),
+         Input('current-page', 'data')],
+        State('dns-stats-etag', 'data')
+    )
+    def update_dns_stats(n_clicks, current_page, etag):
+        if current_page != 'dns':
+            return no_update, no_update, no_update
+
+        current = dns_stats.latest()
+        history = dns_stats.history(DNS_STATS_POINTS)
+        new_etag = payload_etag([current, history['timestamps'][-1:]])
+        if new_etag == etag:
+            return no_update, no_update, no_update
+
+        times = pd.to_datetime(history['timestamps'], unit='s').strftime('%Y-%m-%d %H:%M:%S').tolist()
+        hit_rates = [rate * 100 if rate is not None else None for rate in history['hit_rate']]
+        return (build_dns_stats_summary(current),
+                patch_figure_data(times, [hit_rates, history['evictions']]),
+                new_etag)
+
+    # Callback to load the stored DNS cache settings into the form, once
+    @dash_app.callback(
+        [Output('dns-cache-size', 'value'),
+         Output('dns-min-ttl', 'value'),
+         Output('dns-max-ttl', 'value'),
+         Output('dns-upstream-policy', 'value'),
+         Output('dns-negative-cache', 'value')],
+        Input('current-page', 'data'),
+        State('dns-cache-size', 'value')
+    )
+    def load_dns_cache(current_page, cache_size):
+        if current_page != 'dns' or cache_size is not None:
+            return [no_update] * 5
+
+        cache = settings_dict(load_settings(Session()))
+        return (cache['cache_size'], cache['min_cache_ttl'], cache['max_cache_ttl'],
+                cache['upstream_policy'], ['NEGCACHE'] if cache['negative_cache'] else [])
+
+    # Callback to store the DNS cache settings and apply them
+    @dash_app.callback(
+        Output('dns-cache-status', 'children'),
+        Input('save-dns-cache', 'n_clicks'),
+        [State('dns-cache-size', 'value'),
+         State('dns-min-ttl', 'value'),
+         State('dns-max-ttl', 'value'),
+         State('dns-upstream-policy', 'value'),
+         State('dns-negative-cache', 'value')],
+        prevent_initial_call=True
+    )
+    def save_dns_cache(n_clicks, cache_size, min_ttl, max_ttl, policy, negative_cache):
+        session = Session()
+        try:
+            update_settings(session, {
+                'cache_size': cache_size,
+                'min_cache_ttl': min_ttl or 0,
+                'max_cache_ttl': max_ttl or 0,
+                'upstream_policy': policy,
+                'negative_cache': 'NEGCACHE' in (negative_cache or [])
+            })
+        except DnsSettingsError as e:
+            session.rollback()
+            return html.Div(str(e), className="alert alert-warning")
+
+        job_runner.submit('apply-config', apply_configuration)
+        return html.Div("Settings saved; applying configuration", className="alert")
+
+    def build_traffic_page():
+        """Traffic monitor page; callbacks fill in the graphs and connections"""
 
         # Create a traffic graph
         traffic_graph = dcc.Graph(
-            figure=go.Figure(
-                data=[
-                    go.Bar(
-                        name='Received (RX)',
-                        x=[iface['name'] for iface in traffic_data['interfaces']],
-                        y=[iface['rx_bytes'] / (1024*1024) for iface in traffic_data['interfaces']],
-                        marker_color='#3498db'
-                    ),
-                    go.Bar(
-                        name='Transmitted (TX)',
-                        x=[iface['name'] for iface in traffic_data['interfaces']],
-                        y=[iface['tx_bytes'] / (1024*1024) for iface in traffic_data['interfaces']],
-                        marker_color='#2ecc71'
-                    )
-                ],
-                layout=go.Layout(
-                    title='Network Traffic by Interface (MB)',
-                    barmode='group',
-                    margin=dict(l=40, r=40, t=80, b=40)
-                )
-            ),
+            id='traffic-graph',
+            figure=build_traffic_figure('Network Traffic by Interface (MB)'),
             config={'displayModeBar': False}
         )
 
         # Create a packets graph
         packets_graph = dcc.Graph(
-            figure=go.Figure(
-                data=[
-                    go.Bar(
-                        name='Received (RX)',
-                        x=[iface['name'] for iface in traffic_data['interfaces']],
-                        y=[iface['rx_packets'] for iface in traffic_data['interfaces']],
-                        marker_color='#3498db'
-                    ),
-                    go.Bar(
-                        name='Transmitted (TX)',
-                        x=[iface['name'] for iface in traffic_data['interfaces']],
-                        y=[iface['tx_packets'] for iface in traffic_data['interfaces']],
-                        marker_color='#2ecc71'
-                    )
-                ],
-                layout=go.Layout(
-                    title='Network Packets by Interface',
-                    barmode='group',
-                    margin=dict(l=40, r=40, t=80, b=40)
-                )
-            ),
+            id='packets-graph',
+            figure=build_traffic_figure('Network Packets by Interface'),
             config={'displayModeBar': False}
         )
 
@@ -1264,29 +1458,220 @@ def init_dash(flask_app):
                                     html.Th("Actions")
                                 ])
                             ]),
-                            html.Tbody([
-                                html.Tr([
-                                    html.Td(conn['src_ip']),
-                                    html.Td(conn['dst_ip']),
-                                    html.Td(conn['protocol']),
-                                    html.Td(conn['dst_port']),
-                                    html.Td(f"{conn['bytes'] / 1024:.2f} KB"),
-                                    html.Td([
-                                        html.Button([
-                                            html.I(className="fas fa-ban")
-                                        ], id=f"block-conn-{i}", className="btn btn-sm btn-danger", title="Block this connection")
-                                    ])
-                                ]) for i, conn in enumerate(traffic_data['top_connections'])
-                            ])
+                            html.Tbody(id="top-connections-body")
                         ], className="data-table")
                     ], className="table-container")
                 ], className="module-content")
-            ], className="card")
+            ], className="card"),
+
+            dcc.Store(id="traffic-etag", data=None),
+            dcc.Store(id="top-connections-etag", data=None)
         ])
 
-    def render_settings_page(data):
+    def connection_values(protocol):
+        """Shown values of the largest conntrack flows of a protocol"""
+        return [
+            [conn['src_ip'], conn['dst_ip'], conn['protocol'],
+             conn['dst_port'] if conn['dst_port'] is not None else '-',
+             f"{conn['bytes'] / 1024:.2f} KB"]
+            for conn in conntrack_stats.get(protocol)['flows']
+        ]
+
+    def build_connection_rows(values):
+        """Table rows for the largest conntrack flows"""
+        if not values:
+            return [html.Tr([html.Td("No connections tracked", colSpan=6)])]
+
+        return [
+            html.Tr([html.Td(value) for value in row] + [
+                html.Td([
+                    html.Button([
+                        html.I(className="fas fa-ban")
+                    ], id=f"block-conn-{i}", className="btn btn-sm btn-danger", title="Block this connection")
+                ])
+            ]) for i, row in enumerate(values)
+        ]
+
+    def build_traffic_figure(title):
+        """Empty grouped bar chart of received and transmitted per interface"""
+        return go.Figure(
+            data=[
+                go.Bar(
+                    name='Received (RX)',
+                    x=[],
+                    y=[],
+                    marker_color='#3498db'
+                ),
+                go.Bar(
+                    name='Transmitted (TX)',
+                    x=[],
+                    y=[],
+                    marker_color='#2ecc71'
+                )
+            ],
+            layout=go.Layout(
+                title=title,
+                barmode='group',
+                margin=dict(l=40, r=40, t=80, b=40)
+            )
+        )
+
+    # Callback to update the traffic graphs' data for the selected timeframe
+    @dash_app.callback(
+        [Output('traffic-graph', 'figure'),
+         Output('packets-graph', 'figure'),
+         Output('traffic-etag', 'data')],
+        [Input('traffic-timeframe', 'value'),
+         Input('refresh-traffic', 'n_clicks'),
+         Input('current-page', 'data')],
+        State('traffic-etag', 'data')
+    )
+    def update_traffic_graphs(timeframe, n_clicks, current_page, etag):
+        if current_page != 'traffic':
+            return no_update, no_update, no_update
+
+        totals = traffic_collector.totals(timeframe or '1h')
+        names = [name for name in totals if name != 'lo']
+        bytes_series = [[totals[name][counter] / (1024*1024) for name in names]
+                        for counter in ('rx_bytes', 'tx_bytes')]
+        packets_series = [[totals[name][counter] for name in names]
+                          for counter in ('rx_packets', 'tx_packets')]
+
+        new_etag = payload_etag([names, bytes_series, packets_series])
+        if new_etag == etag:
+            return no_update, no_update, no_update
+        return patch_figure_data(names, bytes_series), patch_figure_data(names, packets_series), new_etag
+
+    # Callback to refill the top connections table for the selected protocol
+    @dash_app.callback(
+        [Output('top-connections-body', 'children'),
+         Output('top-connections-etag', 'data')],
+        [Input('top-connections-filter', 'value'),
+         Input('refresh-traffic', 'n_clicks'),
+         Input('current-page', 'data')],
+        State('top-connections-etag', 'data')
+    )
+    def update_top_connections(protocol, n_clicks, current_page, etag):
+        if current_page != 'traffic':
+            return no_update, no_update
+        return refresh_rows(connection_values(protocol or 'all'), etag, build_connection_rows)
+
+    def build_settings_page():
         return html.Div([
             html.Div("System Settings page coming soon...", className="card")
         ])
-    
+
+    page_builders = {
+        'overview': build_overview_page,
+        'interfaces': build_interfaces_page,
+        'firewall': build_firewall_page,
+        'dhcp': build_dhcp_page,
+        'dns': build_dns_page,
+        'traffic': build_traffic_page,
+        'settings': build_settings_page
+    }
+
+    # Define the layout with navigation sidebar and content area
+    dash_app.layout = html.Div([
+        # Store the current page
+        dcc.Store(id='current-page', data='overview'),
+        
+        # Store the latest data
+        dcc.Store(id='hardware-data-store', data={}),
+        
+        # ETag of the latest data, for conditional refreshes
+        dcc.Store(id='hardware-etag', data=None),
+        
+        # Fallback refresh interval (every 5 minutes); changes normally
+        # arrive within a second through the /events push stream
+        dcc.Interval(
+            id='refresh-interval',
+            interval=5 * 60 * 1000,  # in milliseconds
+            n_intervals=0
+        ),
+        
+        # Main layout with sidebar and content
+        html.Div([
+            # Sidebar
+            html.Div([
+                html.Div([
+                    html.H2([html.I(className="fas fa-server mr-2"), " Alpine Router"]),
+                ], className='sidebar-header'),
+                
+                html.Div([
+                    html.Div([
+                        html.Button([
+                            html.I(className="fas fa-tachometer-alt mr-2"),
+                            "Overview"
+                        ], id='nav-overview', className='nav-link active', n_clicks=0),
+                        
+                        html.Button([
+                            html.I(className="fas fa-network-wired mr-2"),
+                            "Network Interfaces"
+                        ], id='nav-interfaces', className='nav-link', n_clicks=0),
+                        
+                        html.Button([
+                            html.I(className="fas fa-shield-alt mr-2"),
+                            "Firewall Rules"
+                        ], id='nav-firewall', className='nav-link', n_clicks=0),
+                        
+                        html.Button([
+                            html.I(className="fas fa-server mr-2"),
+                            "DHCP Server"
+                        ], id='nav-dhcp', className='nav-link', n_clicks=0),
+                        
+                        html.Button([
+                            html.I(className="fas fa-globe mr-2"),
+                            "DNS Settings"
+                        ], id='nav-dns', className='nav-link', n_clicks=0),
+                        
+                        html.Button([
+                            html.I(className="fas fa-chart-line mr-2"),
+                            "Traffic Monitor"
+                        ], id='nav-traffic', className='nav-link', n_clicks=0),
+                        
+                        html.Hr(),
+                        
+                        html.Button([
+                            html.I(className="fas fa-cog mr-2"),
+                            "Settings"
+                        ], id='nav-settings', className='nav-link', n_clicks=0),
+                        
+                        html.A([
+                            html.I(className="fas fa-sliders-h mr-2"),
+                            "Setup Wizard"
+                        ], href='/setup', className='nav-link')
+                    ], className='nav-links')
+                ], className='sidebar-content'),
+                
+                html.Div([
+                    html.P("Alpine Router v0.1.0"),
+                ], className='sidebar-footer')
+            ], className='sidebar'),
+            
+            # Main content area
+            html.Div([
+                # Header with refresh button
+                html.Div([
+                    html.Div(id='page-title', className='page-title'),
+                    html.Div([
+                        html.Button([
+                            html.I(className="fas fa-sync-alt mr-2"),
+                            "Refresh"
+                        ], id='refresh-btn', n_clicks=0, className='refresh-button'),
+                        html.Div(id='last-update-time', className='last-update-time')
+                    ], className='header-controls')
+                ], className='content-header'),
+                
+                # Every page, built once; navigating only changes which one
+                # is visible, so refreshes never rebuild them or wipe input
+                html.Div([
+                    html.Div(page_builders[page](), id=f'page-{page}',
+                             className='page' if page == 'overview' else 'page hidden')
+                    for page in PAGES
+                ], id='page-content', className='content-body')
+            ], className='main-content')
+        ], className='dashboard-container')
+    ])
+
     return dash_app
\ No newline at end of file
@@ -0,0 +1,29 @@
+# data_provider.py
+
+from database import Session
+from interface_cache import interface_cache
+from interface_manager import load_interface_config
+from metrics import get_additional_hardware_info
+
+
+def get_hardware_snapshot():
+    """Interfaces (with their DB labels) and CPU/RAM/disk info
+
+    Same structure as the /hardware route, which is a thin wrapper around
+    this, so Dash callbacks can call it in-process. Raises DiscoveryError
+    if interfaces cannot be discovered.
+    """
+    session = Session()
+
+    # Current interfaces from the shared snapshot cache
+    interfaces = interface_cache.get_all()
+
+    # Assign labels from DB or insert default if not existing
+    db_ifaces = load_interface_config(session, [iface['name'] for iface in interfaces])
+    for iface in interfaces:
+        iface['label'] = db_ifaces[iface['name']].label  # Assign label to the output
+
+    return {
+        "interfaces": interfaces,
+        "hardware_info": get_additional_hardware_info()
+    }
@@ -0,0 +1,85 @@
+# database.py
+
+from sqlalchemy import create_engine, event, Column, String, Integer, Boolean
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+DATABASE_URL = 'sqlite:///alpine.db'
+
+Base = declarative_base()
+
+class NetworkInterface(Base):
+    __tablename__ = 'network_interfaces'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    label = Column(String, nullable=False, default='LAN')
+    is_wan = Column(Boolean, default=False)
+    dhcp_enabled = Column(Boolean, default=True)
+    static_ip = Column(String)
+    static_netmask = Column(String, default='255.255.255.0')
+    static_gateway = Column(String)
+    dns_servers = Column(String)
+
+class DhcpStaticLease(Base):
+    __tablename__ = 'dhcp_static_leases'
+
+    id = Column(Integer, primary_key=True)
+    mac = Column(String, nullable=False, unique=True, index=True)
+    ip = Column(String, nullable=False)
+    # The address as an integer, for ordering and range queries
+    ip_int = Column(Integer, nullable=False, unique=True, index=True)
+    hostname = Column(String)
+
+class DnsSettings(Base):
+    __tablename__ = 'dns_settings'
+
+    # A single row holds the settings of the DNS forwarder
+    id = Column(Integer, primary_key=True)
+    cache_size = Column(Integer, nullable=False, default=1000)
+    negative_cache = Column(Boolean, nullable=False, default=True)
+    # 0 leaves the TTLs sent by the upstream servers unchanged
+    min_cache_ttl = Column(Integer, nullable=False, default=0)
+    max_cache_ttl = Column(Integer, nullable=False, default=0)
+    # 'default', 'strict-order' or 'all-servers'
+    upstream_policy = Column(String, nullable=False, default='default')
+
+# Pooled connections shared by all serving threads; each connection may be
+# handed to a different thread than the one that opened it
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=QueuePool,
+    pool_size=5,
+    max_overflow=10,
+    connect_args={'check_same_thread': False, 'timeout': 15}
+)
+
+@event.listens_for(engine, 'connect')
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Tune every new SQLite connection
+
+    WAL lets dashboard reads proceed while the setup wizard writes, and
+    synchronous=NORMAL is durable in WAL mode with far fewer fsyncs.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+# Request-scoped sessions: Session() returns the session for the current
+# thread, and init_app() closes it when the request ends. Objects are not
+# expired on commit so reading them afterwards costs no extra queries.
+Session = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
+def init_db():
+    """Create any missing tables"""
+    Base.metadata.create_all(engine)
+
+def init_app(app):
+    """Close the request's session when the app context is torn down"""
+    @app.teardown_appcontext
+    def remove_session(exception=None):
+        Session.remove()
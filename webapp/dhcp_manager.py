@@ -0,0 +1,100 @@
+# dhcp_manager.py
+
+from flask import Blueprint, jsonify, request
+
+import dnsmasq
+from database import Session, DhcpStaticLease
+from http_utils import conditional_jsonify
+from lease_watcher import lease_watcher
+from static_leases import LeaseImportError, import_leases, lease_rows, normalize_mac, parse_csv
+from system import CommandError
+
+dhcp_manager = Blueprint('dhcp_manager', __name__, url_prefix='/dhcp')
+
+def _publish_hosts(session):
+    """Push the stored leases to dnsmasq; returns a warning on failure"""
+    try:
+        dnsmasq.apply_hosts(lease_rows(session))
+    except (OSError, CommandError) as e:
+        print(f"Error updating DHCP hosts: {e}")
+        return "Leases were saved but could not be applied to dnsmasq"
+    return None
+
+@dhcp_manager.route('/static-leases')
+def list_static_leases():
+    """Get all static DHCP leases, ordered by IP address"""
+    session = Session()
+    return conditional_jsonify([
+        {'mac': mac, 'ip': ip, 'hostname': hostname}
+        for mac, ip, hostname in lease_rows(session)
+    ])
+
+@dhcp_manager.route('/static-leases/import', methods=['POST'])
+def import_static_leases():
+    """Bulk import static leases from CSV or JSON
+
+    CSV bodies (text/csv) have mac,ip[,hostname] rows with an optional
+    header. JSON bodies are a list of {mac, ip, hostname} objects or
+    {"leases": [...]}. The import is validated as a whole and stored in one
+    transaction; ?replace=1 replaces all existing leases.
+    """
+    session = Session()
+    replace = request.args.get('replace', '').lower() in ('1', 'true', 'yes')
+
+    if request.mimetype == 'text/csv':
+        rows = parse_csv(request.get_data(as_text=True))
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get('leases') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            return jsonify({"error": "Expected a CSV body or a JSON list of leases"}), 400
+
+    try:
+        count = import_leases(session, rows, replace=replace)
+    except LeaseImportError as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+
+    response = {"status": "success", "imported": count}
+    warning = _publish_hosts(session)
+    if warning:
+        response["warning"] = warning
+    return jsonify(response)
+
+@dhcp_manager.route('/static-leases/<mac>', methods=['DELETE'])
+def delete_static_lease(mac):
+    """Delete the static lease of a MAC address"""
+    session = Session()
+    lease = session.query(DhcpStaticLease).filter_by(mac=normalize_mac(mac)).first()
+    if not lease:
+        return jsonify({"error": f"No static lease for {mac}"}), 404
+
+    session.delete(lease)
+    session.commit()
+
+    response = {"status": "success", "message": f"Static lease for {lease.mac} deleted"}
+    warning = _publish_hosts(session)
+    if warning:
+        response["warning"] = warning
+    return jsonify(response)
+
+@dhcp_manager.route('/leases')
+def list_active_leases():
+    """Get active DHCP leases, paginated and optionally filtered
+
+    Query parameters: mac, ip and hostname (exact, all that are given must
+    match), q (substring), page and per_page.
+    """
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+    except ValueError:
+        return jsonify({"error": "page and per_page must be integers"}), 400
+
+    return conditional_jsonify(lease_watcher.query(
+        mac=request.args.get('mac'),
+        ip=request.args.get('ip'),
+        hostname=request.args.get('hostname'),
+        search=request.args.get('q'),
+        page=page,
+        per_page=per_page
+    ))
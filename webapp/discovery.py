@@ -0,0 +1,303 @@
+# discovery.py
+
+import errno
+import json
+import os
+import queue
+import socket
+import struct
+import subprocess
+import threading
+
+SYSFS_NET = '/sys/class/net'
+
+# Optional fallback to the Rust hardware_discovery binary, used only when
+# sysfs/netlink are not available (e.g. when developing on a non-Linux box).
+# It is started once in --daemon mode and kept running.
+BACKEND_BINARY = os.environ.get(
+    'HARDWARE_DISCOVERY_BIN',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend/target/release/hardware_discovery'))
+)
+
+# rtnetlink constants (linux/netlink.h, linux/rtnetlink.h, linux/if_addr.h)
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFF_UP = 0x1
+SOL_NETLINK = 270
+NETLINK_GET_STRICT_CHK = 12
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+NLMSG_HDR = struct.Struct('=LHHLL')
+IFADDRMSG = struct.Struct('=BBBBI')
+RTATTR = struct.Struct('=HH')
+
+
+class DiscoveryError(RuntimeError):
+    """Raised when interfaces cannot be discovered"""
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def _read_sysfs(name, attr):
+    try:
+        with open(os.path.join(SYSFS_NET, name, attr)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _parse_attrs(data, offset, end):
+    """Yield (type, payload) for each rtattr in data[offset:end]"""
+    while offset + RTATTR.size <= end:
+        length, attr_type = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        yield attr_type, data[offset + RTATTR.size:offset + length]
+        offset += _align(length)
+
+
+def _dump_addresses(ifindex=0):
+    """Dump interface addresses over rtnetlink, keyed by ifindex
+
+    With an ifindex only that interface's addresses are returned; strict
+    checking lets the kernel do the filtering instead of sending every
+    address on the box. Addresses are formatted as "<ip>/<prefixlen>",
+    matching the IpNetwork strings produced by the Rust backend.
+    """
+    addresses = {}
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        if ifindex:
+            try:
+                sock.setsockopt(SOL_NETLINK, NETLINK_GET_STRICT_CHK, 1)
+            except OSError:
+                # Older kernels; we still filter below
+                pass
+        sock.bind((0, 0))
+        payload = IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, ifindex)
+        sock.send(NLMSG_HDR.pack(NLMSG_HDR.size + len(payload), RTM_GETADDR,
+                                 NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + payload)
+
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + NLMSG_HDR.size <= len(data):
+                msg_len, msg_type, _, _, _ = NLMSG_HDR.unpack_from(data, offset)
+                if msg_len < NLMSG_HDR.size:
+                    return addresses
+                if msg_type == NLMSG_DONE:
+                    return addresses
+                if msg_type == NLMSG_ERROR:
+                    raise DiscoveryError("Netlink address dump failed")
+
+                if msg_type == RTM_NEWADDR:
+                    body = offset + NLMSG_HDR.size
+                    family, prefixlen, _, _, index = IFADDRMSG.unpack_from(data, body)
+                    attrs = dict(_parse_attrs(data, body + IFADDRMSG.size, offset + msg_len))
+                    # IFA_LOCAL is the interface's own address on point-to-point links
+                    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+                    wanted = not ifindex or index == ifindex
+                    if wanted and raw and family in (socket.AF_INET, socket.AF_INET6):
+                        ip = socket.inet_ntop(family, raw)
+                        addresses.setdefault(index, []).append(f"{ip}/{prefixlen}")
+
+                offset += _align(msg_len)
+
+
+def _interface_entry(name, addresses):
+    """Return (ifindex, name/mac/ips/status dict) for one interface from sysfs"""
+    ifindex = _read_sysfs(name, 'ifindex')
+    flags = _read_sysfs(name, 'flags')
+    if ifindex is None or flags is None:
+        return None
+
+    ifindex = int(ifindex)
+    return ifindex, {
+        'name': name,
+        'mac': _read_sysfs(name, 'address') or None,
+        'ips': addresses.get(ifindex, []),
+        'status': 'UP' if int(flags, 16) & IFF_UP else 'DOWN'
+    }
+
+
+class BackendClient:
+    """Persistent connection to `hardware_discovery --daemon`
+
+    Requests and responses are line-delimited JSON over the daemon's
+    stdin/stdout. Change events pushed by the daemon are passed on to the
+    registered listeners.
+    """
+
+    def __init__(self, binary, timeout=5):
+        self.binary = binary
+        self.timeout = timeout
+        self._process = None
+        self._responses = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _ensure_started(self):
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._process = subprocess.Popen(
+            [self.binary, '--daemon'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read, args=(self._process, self._responses),
+                         name='hardware-discovery-reader', daemon=True).start()
+
+    def _read(self, process, responses):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                # A request waiting on this line times out and restarts the daemon
+                print(f"Ignoring malformed hardware discovery output: {line.strip()[:200]!r}")
+                continue
+            if message.get('type') == 'event':
+                for callback in list(self._listeners):
+                    callback()
+            else:
+                responses.put(message)
+        # The daemon exited; wake up any waiting request
+        responses.put(None)
+
+    def _stop(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process = None
+
+    def request(self, message):
+        """Send one request and wait for its response"""
+        with self._lock:
+            try:
+                self._ensure_started()
+                self._process.stdin.write(json.dumps(message) + '\n')
+                self._process.stdin.flush()
+                response = self._responses.get(timeout=self.timeout)
+            except (OSError, queue.Empty) as e:
+                self._stop()
+                raise DiscoveryError(f"Hardware discovery failed: {e}")
+
+            if response is None:
+                self._stop()
+                raise DiscoveryError("Hardware discovery daemon exited")
+            if response.get('type') == 'error':
+                raise DiscoveryError(f"Hardware discovery failed: {response.get('message')}")
+            return response
+
+
+backend_client = BackendClient(BACKEND_BINARY)
+
+
+def _discover_via_backend():
+    """Fallback: ask the hardware_discovery daemon for all interfaces"""
+    return backend_client.request({'cmd': 'list'})['interfaces']
+
+
+def discover_interfaces():
+    """Return all network interfaces as a list of name/mac/ips/status dicts"""
+    if not os.path.isdir(SYSFS_NET):
+        return _discover_via_backend()
+
+    try:
+        addresses = _dump_addresses()
+    except OSError:
+        return _discover_via_backend()
+
+    entries = [_interface_entry(name, addresses) for name in os.listdir(SYSFS_NET)]
+
+    # Keep the kernel's ordering, like datalink::interfaces() does
+    return [iface for _, iface in sorted(entry for entry in entries if entry)]
+
+
+def discover_interface(name):
+    """Return the name/mac/ips/status dict for one interface, or None
+
+    Only the named link is queried (sysfs attributes plus a netlink
+    address dump filtered to its ifindex), so the cost does not grow with
+    the number of links on the box.
+    """
+    if not name or '/' in name or name in ('.', '..'):
+        return None
+
+    if not os.path.isdir(SYSFS_NET):
+        return backend_client.request({'cmd': 'get', 'name': name})['interface']
+
+    ifindex = _read_sysfs(name, 'ifindex')
+    if ifindex is None:
+        return None
+
+    try:
+        addresses = _dump_addresses(int(ifindex))
+    except OSError:
+        return backend_client.request({'cmd': 'get', 'name': name})['interface']
+
+    entry = _interface_entry(name, addresses)
+    return entry[1] if entry else None
+
+
+class NetlinkMonitor:
+    """Background listener for rtnetlink link and address notifications
+
+    Every registered callback is invoked (from the monitor thread) whenever
+    the kernel reports a link coming up/down or an address being added or
+    removed.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def start(self):
+        """Start the monitor thread; returns False if netlink is unavailable"""
+        with self._lock:
+            if self._thread is not None:
+                return True
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+                sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+            except (OSError, AttributeError):
+                return False
+            self._thread = threading.Thread(target=self._run, args=(sock,),
+                                            name='netlink-monitor', daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, sock):
+        while True:
+            try:
+                sock.recv(65536)
+            except OSError as e:
+                # A receive buffer overrun means events were lost, which
+                # listeners should treat as a change anyway
+                if e.errno != errno.ENOBUFS:
+                    return
+            for callback in list(self._callbacks):
+                callback()
+
+
+netlink_monitor = NetlinkMonitor()
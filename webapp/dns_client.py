@@ -0,0 +1,137 @@
+# dns_client.py
+
+import collections
+import os
+import select
+import socket
+import struct
+import time
+
+TYPE_A = 1
+TYPE_TXT = 16
+CLASS_IN = 1
+CLASS_CHAOS = 3
+
+HEADER = struct.Struct('!HHHHHH')
+QUESTION = struct.Struct('!HH')
+ANSWER = struct.Struct('!HHIH')
+
+# Recursion desired
+FLAG_RD = 0x0100
+
+Response = collections.namedtuple('Response', 'id rcode answers elapsed')
+Answer = collections.namedtuple('Answer', 'name type qclass ttl data')
+
+
+class DnsError(RuntimeError):
+    """Raised when a DNS query fails or its reply cannot be parsed"""
+
+
+def build_query(query_id, name, qtype=TYPE_A, qclass=CLASS_IN):
+    """Return the wire form of a single-question query"""
+    labels = [label.encode('idna') for label in name.rstrip('.').split('.') if label]
+    qname = b''.join(struct.pack('B', len(label)) + label for label in labels) + b'\0'
+    return HEADER.pack(query_id, FLAG_RD, 1, 0, 0, 0) + qname + QUESTION.pack(qtype, qclass)
+
+
+def _read_name(data, offset):
+    """Return (name, offset after it), following compression pointers"""
+    labels = []
+    end = None
+    for _ in range(128):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            return '.'.join(labels), end if end is not None else offset
+        labels.append(data[offset:offset + length].decode('ascii', 'replace'))
+        offset += length
+    raise DnsError("Name compression loop")
+
+
+def parse_response(data, elapsed=0.0):
+    """Parse a reply into a Response; answer data is left as raw bytes"""
+    try:
+        query_id, flags, qdcount, ancount, _, _ = HEADER.unpack_from(data, 0)
+        offset = HEADER.size
+        for _ in range(qdcount):
+            _, offset = _read_name(data, offset)
+            offset += QUESTION.size
+
+        answers = []
+        for _ in range(ancount):
+            name, offset = _read_name(data, offset)
+            rtype, rclass, ttl, length = ANSWER.unpack_from(data, offset)
+            offset += ANSWER.size
+            answers.append(Answer(name, rtype, rclass, ttl, data[offset:offset + length]))
+            offset += length
+    except (IndexError, struct.error) as e:
+        raise DnsError(f"Malformed DNS reply: {e}") from e
+    return Response(query_id, flags & 0x000F, answers, elapsed)
+
+
+def txt_strings(data):
+    """Split TXT record data into its strings"""
+    strings = []
+    offset = 0
+    while offset < len(data):
+        length = data[offset]
+        strings.append(data[offset + 1:offset + 1 + length].decode('utf-8', 'replace'))
+        offset += 1 + length
+    return strings
+
+
+def query_many(server, questions, port=53, timeout=2.0):
+    """Send several (name, qtype, qclass) queries at once over one socket
+
+    Returns {question: Response} for the questions answered within timeout;
+    each Response's elapsed is its own round trip in seconds. Raises
+    DnsError if the server cannot be reached at all.
+    """
+    family = socket.AF_INET6 if ':' in server else socket.AF_INET
+    base_id = int.from_bytes(os.urandom(2), 'big')
+    pending = {}
+    results = {}
+
+    with socket.socket(family, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.connect((server, port))
+            for i, question in enumerate(questions):
+                query_id = (base_id + i) & 0xFFFF
+                pending[query_id] = (question, time.monotonic())
+                sock.send(build_query(query_id, *question))
+        except OSError as e:
+            raise DnsError(f"Cannot query {server}: {e}") from e
+
+        deadline = time.monotonic() + timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+                break
+            try:
+                data = sock.recv(4096)
+            except OSError as e:
+                # Usually ICMP port unreachable: nothing listens there
+                raise DnsError(f"Cannot query {server}: {e}") from e
+            received = time.monotonic()
+            if len(data) < HEADER.size:
+                continue
+            query_id = HEADER.unpack_from(data, 0)[0]
+            if query_id not in pending:
+                continue
+            question, sent = pending.pop(query_id)
+            results[question] = parse_response(data, received - sent)
+    return results
+
+
+def query(server, name, qtype=TYPE_A, qclass=CLASS_IN, port=53, timeout=2.0):
+    """Send one query and return its Response; raises DnsError on timeout"""
+    question = (name, qtype, qclass)
+    response = query_many(server, [question], port, timeout).get(question)
+    if response is None:
+        raise DnsError(f"No reply from {server} within {timeout}s")
+    return response
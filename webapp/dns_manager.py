@@ -0,0 +1,94 @@
+# dns_manager.py
+
+from flask import Blueprint, jsonify, request, url_for
+
+from database import Session, NetworkInterface
+from dns_prober import dns_prober
+from dns_settings import DnsSettingsError, load_settings, settings_dict, update_settings
+from dns_stats import dns_stats
+from http_utils import conditional_jsonify
+from interface_manager import apply_configuration
+from jobs import job_runner
+from network_config import resolv_conf_servers, upstream_servers
+
+dns_manager = Blueprint('dns_manager', __name__, url_prefix='/dns')
+
+# Largest number of intervals /dns/stats will return
+MAX_STATS_POINTS = 2880
+
+def configured_upstreams():
+    """Return the upstream DNS servers the router is configured to use
+
+    These are the WAN's servers, or the ones DHCP wrote to resolv.conf.
+    Called from the prober's thread, outside any request.
+    """
+    try:
+        servers = upstream_servers(Session().query(NetworkInterface).all())
+    finally:
+        Session.remove()
+    return resolv_conf_servers() if servers is None else servers
+
+@dns_manager.route('/settings')
+def get_dns_settings():
+    """Get the DNS cache and upstream settings"""
+    session = Session()
+    return conditional_jsonify(settings_dict(load_settings(session)))
+
+@dns_manager.route('/settings', methods=['PUT'])
+def put_dns_settings():
+    """Update the DNS settings and queue an apply of the configuration
+
+    Accepts any subset of cache_size, negative_cache, min_cache_ttl,
+    max_cache_ttl and upstream_policy. Returns 202 with the apply job.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+
+    session = Session()
+    try:
+        settings = update_settings(session, data)
+    except DnsSettingsError as e:
+        session.rollback()
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+
+    job = job_runner.submit('apply-config', apply_configuration)
+    status_url = url_for('interface_manager.job_status', job_id=job.id)
+    return jsonify({
+        "status": job.status,
+        "settings": settings,
+        "job_id": job.id,
+        "status_url": status_url,
+        "events_url": url_for('interface_manager.job_events', job_id=job.id)
+    }), 202, {'Location': status_url}
+
+@dns_manager.route('/stats')
+def get_dns_stats():
+    """Get dnsmasq's cache counters and the hit rate per interval
+
+    ?points limits the history to the most recent intervals.
+    """
+    try:
+        points = int(request.args.get('points', 120))
+    except ValueError:
+        return jsonify({"error": "points must be an integer"}), 400
+
+    return conditional_jsonify({
+        "interval": dns_stats.interval,
+        "current": dns_stats.latest(),
+        "history": dns_stats.history(max(1, min(points, MAX_STATS_POINTS)))
+    })
+
+@dns_manager.route('/upstreams')
+def get_upstreams():
+    """Get latency percentiles and failure rates of the upstream servers
+
+    Also lists the servers in the order dnsmasq is given them.
+    """
+    return jsonify(dns_prober.report())
+
+@dns_manager.route('/upstreams/probe', methods=['POST'])
+def probe_upstreams():
+    """Run a probe round now and return the updated report"""
+    dns_prober.probe_round(configured_upstreams())
+    return jsonify(dns_prober.report())
@@ -0,0 +1,275 @@
+# dns_prober.py
+
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+
+import dnsmasq
+from dns_client import CLASS_IN, TYPE_A, DnsError, query_many
+from system import CommandError
+
+# Seconds between probe rounds, and how long to wait for each reply
+DNS_PROBE_INTERVAL = float(os.environ.get('DNS_PROBE_INTERVAL', '60'))
+DNS_PROBE_TIMEOUT = float(os.environ.get('DNS_PROBE_TIMEOUT', '2'))
+
+# Names looked up on every upstream each round
+DNS_PROBE_NAMES = [
+    name.strip()
+    for name in os.environ.get('DNS_PROBE_NAMES', 'example.com,wikipedia.org,github.com').split(',')
+    if name.strip()
+]
+
+# Probes kept per server (two hours at the defaults)
+DNS_PROBE_WINDOW = int(os.environ.get('DNS_PROBE_WINDOW', '360'))
+
+# What to do with the measurements: 'off' only reports them, 'reorder'
+# puts the fastest healthy server first, 'prune' also drops failing and
+# much slower servers from dnsmasq's list
+DNS_UPSTREAM_SELECTION = os.environ.get('DNS_UPSTREAM_SELECTION', 'off')
+SELECTION_MODES = ('off', 'reorder', 'prune')
+
+# Probes a server needs before the selection acts on it
+MIN_SAMPLES = 20
+# Servers failing more often than this are ranked last, or pruned
+MAX_FAILURE_RATE = 0.2
+# Pruning drops servers whose median is this many times the best one's
+PRUNE_LATENCY_FACTOR = 4.0
+# A new leader must have a median below this share of the current one's,
+# so near-equal servers do not swap places every round
+SWITCH_MARGIN = 0.8
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+# A reply with NOERROR or NXDOMAIN means the server did its job
+GOOD_RCODES = (0, 3)
+
+
+def parse_server(server):
+    """Split dnsmasq's "address#port" server syntax into (address, port)"""
+    address, _, port = server.partition('#')
+    return address, int(port) if port else 53
+
+
+class ServerStats:
+    """Outcomes of a server's most recent probes"""
+
+    def __init__(self, window):
+        # Latency in seconds, or None for a timeout or error
+        self.latencies = collections.deque(maxlen=window)
+        self.outcomes = collections.deque(maxlen=window)
+
+    def record(self, outcome, latency=None):
+        self.outcomes.append(outcome)
+        self.latencies.append(latency)
+
+    def summary(self):
+        samples = len(self.outcomes)
+        ok = np.array([latency for latency in self.latencies if latency is not None]) * 1000
+        summary = {
+            'samples': samples,
+            'timeout_rate': round(self.outcomes.count('timeout') / samples, 4) if samples else None,
+            'error_rate': round(self.outcomes.count('error') / samples, 4) if samples else None,
+            'p50_ms': None,
+            'p95_ms': None,
+            'p99_ms': None,
+            'histogram': [],
+        }
+        if len(ok):
+            p50, p95, p99 = np.percentile(ok, (50, 95, 99))
+            counts, _ = np.histogram(ok, bins=(0,) + HISTOGRAM_BOUNDS_MS + (np.inf,))
+            summary.update(
+                p50_ms=round(float(p50), 2),
+                p95_ms=round(float(p95), 2),
+                p99_ms=round(float(p99), 2),
+                histogram=[
+                    {'le_ms': bound, 'count': int(count)}
+                    for bound, count in zip(HISTOGRAM_BOUNDS_MS + (None,), counts)
+                ],
+            )
+        return summary
+
+
+class DnsProber:
+    """Measures the upstream DNS servers with timed queries
+
+    Every round each server gets one query per probe name, sent together
+    over one socket. The last DNS_PROBE_WINDOW outcomes per server give
+    its latency percentiles, histogram and timeout and error rates. With
+    selection enabled, the ranking is pushed to dnsmasq's servers file
+    whenever the leader changes. dnsmasq re-reads the file on SIGHUP,
+    which also clears its cache, so the ranking is not rewritten for
+    lesser changes.
+    """
+
+    def __init__(self, interval, timeout, names, window, mode):
+        if mode not in SELECTION_MODES:
+            print(f"Unknown DNS_UPSTREAM_SELECTION {mode!r}; not selecting upstreams")
+            mode = 'off'
+        self.interval = interval
+        self.timeout = timeout
+        self.names = names
+        self.window = window
+        self.mode = mode
+        self._stats = {}
+        self._configured = []
+        self._leader = None
+        self._last_round = None
+        self._get_servers = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, get_servers):
+        """Start probing; get_servers() returns the configured upstreams"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._get_servers = get_servers
+            self._thread = threading.Thread(target=self._run, name='dns-prober', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.probe_round()
+            except Exception as e:
+                print(f"DNS probe round failed: {e}")
+            time.sleep(self.interval)
+
+    def probe(self, server):
+        """Time one query per probe name against a server
+
+        Returns [(outcome, latency)] with outcome 'ok', 'timeout' or 'error'.
+        """
+        address, port = parse_server(server)
+        questions = [(name, TYPE_A, CLASS_IN) for name in self.names]
+        try:
+            replies = query_many(address, questions, port, self.timeout)
+        except DnsError:
+            # Unreachable or refused outright
+            return [('error', None)] * len(questions)
+
+        results = []
+        for question in questions:
+            reply = replies.get(question)
+            if reply is None:
+                results.append(('timeout', None))
+            elif reply.rcode in GOOD_RCODES:
+                results.append(('ok', reply.elapsed))
+            else:
+                results.append(('error', None))
+        return results
+
+    def probe_round(self, servers=None):
+        """Probe every server once and apply the selection if its leader changed
+
+        servers defaults to the configured upstreams. Servers no longer
+        configured are forgotten.
+        """
+        if servers is None:
+            servers = self._get_servers() if self._get_servers else []
+        servers = list(servers)
+
+        # Probe all servers at once so a slow one does not delay the rest
+        results = {}
+        threads = [
+            threading.Thread(target=lambda server=server: results.__setitem__(server, self.probe(server)))
+            for server in servers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with self._lock:
+            self._configured = servers
+            self._stats = {server: self._stats.get(server) or ServerStats(self.window) for server in servers}
+            for server, outcomes in results.items():
+                for outcome, latency in outcomes:
+                    self._stats[server].record(outcome, latency)
+            self._last_round = time.time()
+
+        if self.mode == 'off' or not servers:
+            return
+        selected, leader = self._rank(servers)
+        with self._lock:
+            # Rewriting the servers file means a SIGHUP, which clears
+            # dnsmasq's cache, so only a new leader is worth one
+            changed = leader is not None and leader != self._leader
+            if changed:
+                self._leader = leader
+        if changed:
+            try:
+                dnsmasq.apply_servers(selected)
+            except (OSError, CommandError) as e:
+                print(f"Error updating DNS upstreams: {e}")
+
+    def select(self, servers):
+        """Return servers reordered (and pruned) by their measurements
+
+        Returns servers unchanged with selection off, or until every server
+        has MIN_SAMPLES probes. Healthy servers come first, fastest median
+        first; the current leader keeps its place unless a challenger is
+        clearly faster. Pruning never removes the last server, and removes
+        none if they are all failing.
+        """
+        return self._rank(servers)[0]
+
+    def _rank(self, servers):
+        """Return (selected servers, their leader), or (servers, None) if unranked"""
+        servers = list(servers)
+        if self.mode == 'off' or not servers:
+            return servers, None
+
+        with self._lock:
+            summaries = {
+                server: self._stats[server].summary() if server in self._stats else None
+                for server in servers
+            }
+            leader = self._leader
+        if any(summary is None or summary['samples'] < MIN_SAMPLES for summary in summaries.values()):
+            return servers, None
+
+        def failing(server):
+            summary = summaries[server]
+            return (summary['timeout_rate'] + summary['error_rate'] > MAX_FAILURE_RATE
+                    or summary['p50_ms'] is None)
+
+        def median(server):
+            return summaries[server]['p50_ms'] if summaries[server]['p50_ms'] is not None else float('inf')
+
+        ranked = sorted(servers, key=lambda server: (failing(server), median(server)))
+        if (leader in ranked and not failing(leader)
+                and median(ranked[0]) > median(leader) * SWITCH_MARGIN):
+            ranked.remove(leader)
+            ranked.insert(0, leader)
+
+        if self.mode == 'prune' and not failing(ranked[0]):
+            best = median(ranked[0])
+            ranked = [ranked[0]] + [
+                server for server in ranked[1:]
+                if not failing(server) and median(server) <= best * PRUNE_LATENCY_FACTOR
+            ]
+        return ranked, ranked[0]
+
+    def report(self):
+        """Per-server measurements, in configured order, and the selection"""
+        with self._lock:
+            servers = list(self._configured)
+            summaries = [dict(server=server, **self._stats[server].summary()) for server in servers]
+            last_round = self._last_round
+        return {
+            'mode': self.mode,
+            'interval': self.interval,
+            'names': self.names,
+            'last_round': last_round,
+            'servers': summaries,
+            'selected': self.select(servers),
+        }
+
+
+dns_prober = DnsProber(DNS_PROBE_INTERVAL, DNS_PROBE_TIMEOUT, DNS_PROBE_NAMES,
+                       DNS_PROBE_WINDOW, DNS_UPSTREAM_SELECTION)
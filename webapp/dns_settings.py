@@ -0,0 +1,86 @@
+# dns_settings.py
+
+from database import DnsSettings
+
+# How dnsmasq picks an upstream server: its own choice (it favours the
+# one that answered fastest recently), always the first one that works, or
+# all of them at once, taking the first reply
+UPSTREAM_POLICIES = ('default', 'strict-order', 'all-servers')
+
+# dnsmasq refuses larger minimum TTLs
+MAX_MIN_CACHE_TTL = 3600
+MAX_CACHE_SIZE = 10000
+
+FIELDS = ('cache_size', 'negative_cache', 'min_cache_ttl', 'max_cache_ttl', 'upstream_policy')
+
+
+class DnsSettingsError(ValueError):
+    """Raised when DNS settings are rejected; errors maps field -> message"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(f"{field}: {error}" for field, error in errors.items()))
+        self.errors = errors
+
+
+def load_settings(session):
+    """Return the DnsSettings row, creating it with defaults if missing"""
+    settings = session.get(DnsSettings, 1)
+    if settings is None:
+        settings = DnsSettings(id=1)
+        session.add(settings)
+        session.commit()
+    return settings
+
+
+def settings_dict(settings):
+    return {field: getattr(settings, field) for field in FIELDS}
+
+
+def _integer(value, low, high):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("must be an integer")
+    if not low <= value <= high:
+        raise ValueError(f"must be between {low} and {high}")
+    return value
+
+
+def validate(data, current):
+    """Merge a partial update into the current settings dict and check it"""
+    settings = dict(current)
+    errors = {}
+    for field in FIELDS:
+        if field not in data:
+            continue
+        value = data[field]
+        try:
+            if field == 'cache_size':
+                value = _integer(value, 0, MAX_CACHE_SIZE)
+            elif field == 'min_cache_ttl':
+                value = _integer(value, 0, MAX_MIN_CACHE_TTL)
+            elif field == 'max_cache_ttl':
+                value = _integer(value, 0, 2 ** 31 - 1)
+            elif field == 'negative_cache':
+                if not isinstance(value, bool):
+                    raise ValueError("must be true or false")
+            elif value not in UPSTREAM_POLICIES:
+                raise ValueError(f"must be one of {', '.join(UPSTREAM_POLICIES)}")
+        except ValueError as e:
+            errors[field] = str(e)
+            continue
+        settings[field] = value
+
+    if not errors and settings['max_cache_ttl'] and settings['min_cache_ttl'] > settings['max_cache_ttl']:
+        errors['min_cache_ttl'] = "must not exceed max_cache_ttl"
+    if errors:
+        raise DnsSettingsError(errors)
+    return settings
+
+
+def update_settings(session, data):
+    """Validate a partial update and store it; returns the new settings dict"""
+    settings = load_settings(session)
+    values = validate(data, settings_dict(settings))
+    for field, value in values.items():
+        setattr(settings, field, value)
+    session.commit()
+    return values
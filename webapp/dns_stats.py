@@ -0,0 +1,138 @@
+# dns_stats.py
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from dns_client import CLASS_CHAOS, TYPE_TXT, DnsError, query_many, txt_strings
+from tsdb import open_buffer
+
+# Seconds between reads of dnsmasq's cache counters
+DNS_STATS_INTERVAL = float(os.environ.get('DNS_STATS_INTERVAL', '30'))
+
+# Intervals kept (24 hours at the default interval)
+DNS_STATS_HISTORY = int(os.environ.get('DNS_STATS_HISTORY', '2880'))
+
+# Where dnsmasq listens; it answers the counter queries itself
+DNS_STATS_SERVER = os.environ.get('DNS_STATS_SERVER', '127.0.0.1')
+
+# dnsmasq's CHAOS TXT names for its cache counters, in column order
+COUNTERS = ('hits', 'misses', 'insertions', 'evictions')
+CACHE_SIZE_NAME = 'cachesize.bind'
+
+
+def hit_rate(hits, misses):
+    """Share of queries answered from the cache, or None without queries"""
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+class DnsStatsCollector:
+    """Reads dnsmasq's cache counters on a fixed tick
+
+    The counters come from dnsmasq's CHAOS TXT names (hits.bind and so on),
+    all queried at once over one socket. Each tick stores how much every
+    counter grew during the interval, so the hit rate of any interval is
+    a ratio of two stored values. A counter that went backwards means
+    dnsmasq restarted; it then counts from zero.
+    """
+
+    def __init__(self, server, interval, history, persistent=True):
+        self.server = server
+        self.interval = interval
+        self._questions = [(f'{name}.bind', TYPE_TXT, CLASS_CHAOS) for name in COUNTERS]
+        self._questions.append((CACHE_SIZE_NAME, TYPE_TXT, CLASS_CHAOS))
+        self._history_size = history
+        self._persistent = persistent
+        self._history = None
+        self._previous = None
+        self._latest = None
+        self._available = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self._persistent:
+                self._history = open_buffer('dns-cache', self._history_size, (len(COUNTERS),))
+            self._thread = threading.Thread(target=self._run, name='dns-stats', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.sample()
+            time.sleep(self.interval)
+
+    def read_counters(self):
+        """Return ({counter: value}, cache size) from dnsmasq"""
+        replies = query_many(self.server, self._questions, timeout=min(2.0, self.interval))
+        values = {}
+        for (name, _, _), reply in replies.items():
+            strings = [s for answer in reply.answers for s in txt_strings(answer.data)]
+            if reply.rcode == 0 and strings and strings[0].isdigit():
+                values[name.split('.')[0]] = int(strings[0])
+        if any(name not in values for name in COUNTERS):
+            raise DnsError(f"dnsmasq at {self.server} did not report its cache counters")
+        return {name: values[name] for name in COUNTERS}, values.get('cachesize')
+
+    def sample(self):
+        """Read the counters once and store the growth since the last read"""
+        try:
+            counters, cache_size = self.read_counters()
+        except DnsError as e:
+            with self._lock:
+                if self._available is not False:
+                    print(f"DNS cache statistics unavailable: {e}")
+                self._available = False
+                self._previous = None
+            return None
+
+        now = time.time()
+        with self._lock:
+            self._available = True
+            previous = self._previous
+            self._previous = counters
+            self._latest = {'timestamp': now, 'cache_size': cache_size, **counters,
+                            'hit_rate': hit_rate(counters['hits'], counters['misses'])}
+            if previous is None:
+                # First reading after a start or an outage: no interval yet
+                return self._latest
+
+            restarted = any(counters[name] < previous[name] for name in COUNTERS)
+            delta = [counters[name] - (0 if restarted else previous[name]) for name in COUNTERS]
+            if self._history is not None:
+                self._history.append(now, delta)
+        return self._latest
+
+    def latest(self):
+        """Return the last reading (counters since dnsmasq started), or None"""
+        with self._lock:
+            return self._latest
+
+    def history(self, n):
+        """Return per-interval counter growth and hit rate, oldest first
+
+        {'timestamps': [...], 'hits': [...], ..., 'hit_rate': [...]} with
+        None as the hit rate of intervals without queries.
+        """
+        with self._lock:
+            if self._history is None:
+                return {'timestamps': [], 'hit_rate': [], **{name: [] for name in COUNTERS}}
+            timestamps, values = self._history.latest(n)
+            timestamps, values = timestamps.copy(), values.astype(np.float64)
+
+        totals = values[:, 0] + values[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.round(values[:, 0] / totals, 4)
+        result = {'timestamps': timestamps.tolist()}
+        for i, name in enumerate(COUNTERS):
+            result[name] = values[:, i].astype(int).tolist()
+        result['hit_rate'] = [None if total == 0 else float(rate) for rate, total in zip(rates, totals)]
+        return result
+
+
+dns_stats = DnsStatsCollector(DNS_STATS_SERVER, DNS_STATS_INTERVAL, DNS_STATS_HISTORY)
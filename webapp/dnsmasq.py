@@ -0,0 +1,251 @@
+# dnsmasq.py
+
+import ipaddress
+import os
+import signal
+import threading
+
+from system import CommandError, run, write_file
+
+# The one configuration file we own. Changing anything in the directory
+# needs a restart.
+DNSMASQ_CONF_DIR = '/etc/dnsmasq.d'
+DNSMASQ_CONF = os.path.join(DNSMASQ_CONF_DIR, 'alpine-router.conf')
+
+# Static DHCP hosts, in a dhcp-hostsdir outside /etc/dnsmasq.d, where every
+# file is parsed as configuration. dnsmasq watches the directory with
+# inotify and picks up new entries by itself, but keeps removed or changed
+# ones until SIGHUP, which also clears its whole DNS cache. So only edits
+# that drop or change an entry cost clients their cached answers. The
+# temporary files write_file creates start with a dot, which dnsmasq skips.
+DHCP_HOSTS_DIR = '/etc/alpine-router/dhcp-hosts.d'
+DHCP_HOSTS_FILE = os.path.join(DHCP_HOSTS_DIR, 'static-leases')
+# Where the hosts were kept before dhcp-hostsdir; removed by an apply
+LEGACY_HOSTS_FILE = '/etc/alpine-router/dhcp-hosts'
+
+# Upstream DNS servers, which dnsmasq only re-reads on SIGHUP, so every
+# rewrite clears the DNS cache too
+DNS_SERVERS_FILE = '/etc/alpine-router/dns-servers'
+
+DNSMASQ_PIDFILE = '/run/dnsmasq.pid'
+
+DHCP_LEASE_TIME = '12h'
+
+# Hosts file edits within this many seconds of each other share one reload
+DNSMASQ_RELOAD_DELAY = float(os.environ.get('DNSMASQ_RELOAD_DELAY', '2'))
+
+HEADER = '# Generated by alpine-router; local changes will be overwritten\n'
+
+
+def dhcp_range(address):
+    """Return the (first, last) DHCP pool for a LAN's IPv4Interface, or None
+
+    The pool covers the same share of the subnet that .100-.200 covers of a
+    /24, clamped to the usable host addresses. If the router's own address
+    falls inside, the pool shrinks to the larger side of it. Subnets with
+    no usable address left return None.
+    """
+    network = address.network
+    size = network.num_addresses
+    if size < 4:
+        return None
+
+    base = int(network.network_address)
+    first_host = base + 1
+    last_host = base + size - 2
+    first = min(max(base + size * 100 // 256, first_host), last_host)
+    last = min(max(base + size * 200 // 256, first), last_host)
+
+    router = int(address.ip)
+    if first <= router <= last:
+        below = (first, router - 1)
+        above = (router + 1, last)
+        first, last = max(below, above, key=lambda pool: pool[1] - pool[0])
+        if first > last:
+            return None
+    return ipaddress.IPv4Address(first), ipaddress.IPv4Address(last)
+
+
+def render_dns(dns, servers=None):
+    """Return the DNS forwarder and cache options as a list of lines
+
+    dns is a settings dict (see dns_settings.FIELDS). servers lists the
+    upstream servers; None leaves dnsmasq reading them from resolv.conf,
+    where DHCP puts them; otherwise they are read from DNS_SERVERS_FILE
+    (see render_servers).
+    """
+    lines = []
+    if servers is not None:
+        lines += ["no-resolv", f"servers-file={DNS_SERVERS_FILE}"]
+    if dns['upstream_policy'] != 'default':
+        lines.append(dns['upstream_policy'])
+    lines.append(f"cache-size={dns['cache_size']}")
+    if not dns['negative_cache']:
+        lines.append("no-negcache")
+    if dns['min_cache_ttl']:
+        lines.append(f"min-cache-ttl={dns['min_cache_ttl']}")
+    if dns['max_cache_ttl']:
+        lines.append(f"max-cache-ttl={dns['max_cache_ttl']}")
+    return lines
+
+
+def render_config(lans, dns, servers=None):
+    """Return the dnsmasq configuration
+
+    lans is [(name, IPv4Interface, dhcp_enabled)]. DNS is served on every
+    LAN (and loopback), DHCP only on LANs that have it enabled. See
+    render_dns for dns and servers.
+    """
+    lines = render_dns(dns, servers)
+    dhcp = []
+    for name, address, dhcp_enabled in lans:
+        lines.append(f"interface={name}")
+        if not dhcp_enabled:
+            continue
+
+        pool = dhcp_range(address)
+        if pool is None:
+            print(f"Subnet of {name} is too small for a DHCP pool; skipping")
+            continue
+
+        dhcp += [
+            f"dhcp-range=set:{name},{pool[0]},{pool[1]},{address.netmask},{DHCP_LEASE_TIME}",
+            f"dhcp-option=tag:{name},option:router,{address.ip}",
+        ]
+
+    if not lans:
+        lines.append("interface=lo")
+    if dhcp:
+        lines += [f"dhcp-hostsdir={DHCP_HOSTS_DIR}", *dhcp]
+    return HEADER + '\n'.join(lines) + '\n'
+
+
+def render_hosts(leases=()):
+    """Return the hosts file for (mac, ip, hostname) static leases"""
+    return HEADER + ''.join(
+        f"{mac},{ip},{hostname}\n" if hostname else f"{mac},{ip}\n"
+        for mac, ip, hostname in leases
+    )
+
+
+def render_servers(servers):
+    """Return the servers-file for upstream servers, "ip" or "ip#port" each"""
+    return HEADER + ''.join(f"server={server}\n" for server in servers)
+
+
+def hosts_dropped(old, new):
+    """Whether replacing hosts file old with new drops or changes an entry
+
+    Added entries reach dnsmasq through inotify; anything else needs a
+    reload. old is None when there was no file.
+    """
+    def entries(text):
+        return {line for line in (text or '').splitlines() if line and not line.startswith('#')}
+    return bool(entries(old) - entries(new))
+
+
+def apply_hosts(leases):
+    """Rewrite the hosts file, reloading dnsmasq only if an entry went away
+
+    Does nothing until dnsmasq has been configured by an apply, which writes
+    the hosts file itself. New leases, imports included, are picked up
+    without a reload, so the DNS cache survives them. Deleted or changed
+    leases need one, deferred by DNSMASQ_RELOAD_DELAY so a burst of edits
+    clears the cache once. Returns whether the file changed.
+    """
+    if not os.path.exists(DNSMASQ_CONF):
+        return False
+    try:
+        with open(DHCP_HOSTS_FILE) as f:
+            old = f.read()
+    except FileNotFoundError:
+        old = None
+    content = render_hosts(leases)
+    if not write_file(DHCP_HOSTS_FILE, content):
+        return False
+    if hosts_dropped(old, content):
+        schedule_reload()
+    return True
+
+
+def apply_servers(servers):
+    """Rewrite the upstream servers file and reload dnsmasq if it changed
+
+    The reload clears dnsmasq's DNS cache.
+
+    Does nothing unless dnsmasq is configured to read its upstreams from
+    the file. Returns whether dnsmasq was reloaded.
+    """
+    if not os.path.exists(DNS_SERVERS_FILE):
+        return False
+    if not write_file(DNS_SERVERS_FILE, render_servers(servers)):
+        return False
+    reload()
+    return True
+
+
+_reload_lock = threading.Lock()
+_reload_timer = None
+
+
+def schedule_reload():
+    """Reload dnsmasq DNSMASQ_RELOAD_DELAY seconds from now
+
+    Calls made while a reload is pending join it.
+    """
+    global _reload_timer
+    with _reload_lock:
+        if _reload_timer is not None:
+            return
+        _reload_timer = threading.Timer(DNSMASQ_RELOAD_DELAY, _scheduled_reload)
+        _reload_timer.daemon = True
+        _reload_timer.start()
+
+
+def _scheduled_reload():
+    global _reload_timer
+    with _reload_lock:
+        _reload_timer = None
+    try:
+        reload()
+    except CommandError as e:
+        print(f"Error reloading dnsmasq: {e}")
+
+
+def running_pid():
+    """Return dnsmasq's pid from its pidfile, or None
+
+    A pidfile left behind by a crash or reboot can name an unrelated
+    process, so the pid only counts if /proc says it is dnsmasq.
+    """
+    try:
+        with open(DNSMASQ_PIDFILE) as f:
+            pid = int(f.read().strip())
+        with open(f'/proc/{pid}/comm') as f:
+            if f.read().strip() == 'dnsmasq':
+                return pid
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def reload():
+    """Send dnsmasq SIGHUP, which clears its entire DNS cache
+
+    On SIGHUP dnsmasq empties its cache and re-reads its hosts and servers
+    files, so callers only reload after a file really changed. Falls back
+    to a restart if dnsmasq is not running.
+    """
+    pid = running_pid()
+    if pid is not None:
+        try:
+            os.kill(pid, signal.SIGHUP)
+            return
+        except OSError:
+            pass
+    restart()
+
+
+def restart():
+    run(['rc-update', 'add', 'dnsmasq', 'default'])
+    run(['rc-service', 'dnsmasq', 'restart'])
@@ -0,0 +1,187 @@
+# events.py
+
+import json
+import queue
+import threading
+import time
+
+from database import Session
+from http_utils import payload_etag
+from interface_cache import interface_cache
+from metrics import metrics_sampler
+
+# Seconds to wait after a change before publishing, so bursts of netlink
+# events (e.g. a bridge coming up with all its ports) go out as one patch
+PUBLISH_DEBOUNCE = 0.2
+
+# Seconds between keepalive comments on idle streams
+KEEPALIVE_INTERVAL = 15
+
+
+def diff_snapshot(old, new):
+    """Return only the fields that changed between two /hardware snapshots
+
+    The patch has the shape
+        {"interfaces": {name: {changed fields}}, "removed": [names],
+         "hardware_info": {section: {changed fields}}}
+    with empty parts left out, or None if nothing changed.
+    """
+    patch = {}
+
+    old_ifaces = {iface['name']: iface for iface in old.get('interfaces', [])}
+    new_ifaces = {iface['name']: iface for iface in new.get('interfaces', [])}
+
+    changed = {}
+    for name, iface in new_ifaces.items():
+        previous = old_ifaces.get(name, {})
+        fields = {key: value for key, value in iface.items()
+                  if key not in previous or previous[key] != value}
+        if fields:
+            changed[name] = fields
+    if changed:
+        patch['interfaces'] = changed
+
+    removed = [name for name in old_ifaces if name not in new_ifaces]
+    if removed:
+        patch['removed'] = removed
+
+    hardware = {}
+    old_info = old.get('hardware_info', {})
+    for section, values in new.get('hardware_info', {}).items():
+        previous = old_info.get(section, {})
+        fields = {key: value for key, value in values.items()
+                  if key not in previous or previous[key] != value}
+        if fields:
+            hardware[section] = fields
+    if hardware:
+        patch['hardware_info'] = hardware
+
+    return patch or None
+
+
+class SnapshotPublisher:
+    """Pushes /hardware changes to subscribed event streams
+
+    The publisher thread sleeps until the interface cache is invalidated,
+    the metrics sampler ticks or notify() is called, and does nothing at all
+    while there are no subscribers.
+    """
+
+    def __init__(self):
+        self._loader = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._snapshot = None
+        self._etag = None
+        self._thread = None
+
+    def start(self, loader):
+        """Start publishing snapshots produced by loader()"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._loader = loader
+            interface_cache.add_listener(self.notify)
+            metrics_sampler.add_listener(lambda sample: self.notify())
+            self._thread = threading.Thread(target=self._run, name='snapshot-publisher', daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Signal that the snapshot may have changed"""
+        self._changed.set()
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=64)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers:
+                # Nobody is tracking changes any more, so the cached
+                # snapshot will go stale
+                self._snapshot = None
+
+    def _load(self):
+        # Runs outside any request, so clean up this thread's session
+        try:
+            return self._loader()
+        finally:
+            Session.remove()
+
+    def current(self):
+        """Return (snapshot, etag), loading a snapshot if none is cached"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._load()
+                self._etag = payload_etag(self._snapshot)
+            return self._snapshot, self._etag
+
+    def _run(self):
+        while True:
+            self._changed.wait()
+            time.sleep(PUBLISH_DEBOUNCE)
+            self._changed.clear()
+
+            with self._lock:
+                if not self._subscribers or self._snapshot is None:
+                    continue
+                previous = self._snapshot
+
+            try:
+                snapshot = self._load()
+            except Exception as e:
+                print(f"Error refreshing snapshot for event stream: {e}")
+                continue
+
+            patch = diff_snapshot(previous, snapshot)
+            if patch is None:
+                continue
+
+            etag = payload_etag(snapshot)
+            with self._lock:
+                self._snapshot = snapshot
+                self._etag = etag
+                subscribers = list(self._subscribers)
+
+            for subscriber in subscribers:
+                try:
+                    subscriber.put_nowait((patch, etag))
+                except queue.Full:
+                    # A stalled client; make it resync from a full snapshot
+                    with subscriber.mutex:
+                        subscriber.queue.clear()
+                    subscriber.put_nowait(None)
+
+    def stream(self):
+        """Generate Server-Sent Events: one full snapshot, then patches"""
+        subscriber = self.subscribe()
+        try:
+            snapshot, etag = self.current()
+            yield format_sse('snapshot', {'data': snapshot, 'etag': etag})
+
+            while True:
+                try:
+                    item = subscriber.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+
+                if item is None:
+                    snapshot, etag = self.current()
+                    yield format_sse('snapshot', {'data': snapshot, 'etag': etag})
+                else:
+                    patch, etag = item
+                    yield format_sse('patch', {'data': patch, 'etag': etag})
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+snapshot_publisher = SnapshotPublisher()
@@ -0,0 +1,548 @@
+# firewall.py
+
+import hashlib
+import ipaddress
+import json
+import os
+import time
+from collections import Counter
+
+from database import NetworkInterface
+from network_config import DEFAULT_LAN_ADDRESS, DEFAULT_LAN_NETMASK
+from system import CommandError, ensure_installed, run, write_file
+
+# Firewall implementation: 'iptables' or 'nftables'
+FIREWALL_BACKEND = os.environ.get('FIREWALL_BACKEND', 'iptables')
+
+# Where the loaded ruleset is saved for restoring at boot
+RULES_PATH = '/etc/iptables/rules.v4'
+NFT_RULES_PATH = '/etc/nftables.d/alpine-router.nft'
+SYSCTL_PATH = '/etc/sysctl.d/99-router.conf'
+IP_FORWARD_PATH = '/proc/sys/net/ipv4/ip_forward'
+
+# Services the router itself offers to LAN zones: (protocol, port or range)
+LAN_SERVICES = (
+    ('tcp', '22'),      # SSH
+    ('udp', '53'),      # DNS
+    ('tcp', '53'),
+    ('udp', '67:68'),   # DHCP
+    ('tcp', '80'),      # Web UI
+    ('tcp', '443'),
+    ('tcp', '5000'),    # Flask development server
+)
+
+
+class FirewallError(RuntimeError):
+    """Raised when the firewall cannot be compiled or loaded"""
+
+
+def lan_subnet(iface):
+    """Return the network (e.g. '192.168.1.0/24') a LAN interface serves"""
+    address = iface.static_ip or DEFAULT_LAN_ADDRESS
+    netmask = iface.static_netmask or DEFAULT_LAN_NETMASK
+    try:
+        return str(ipaddress.IPv4Interface(f'{address}/{netmask}').network)
+    except ValueError as e:
+        raise FirewallError(f"Invalid address for {iface.name}: {e}") from e
+
+
+def load_zones(session):
+    """Return (wan, [(lan, subnet)]) from the interface configuration"""
+    wan = session.query(NetworkInterface).filter_by(is_wan=True).first()
+    if not wan:
+        raise FirewallError("No WAN interface configured")
+
+    lans = session.query(NetworkInterface).filter_by(is_wan=False).order_by(NetworkInterface.name).all()
+    if not lans:
+        raise FirewallError("No LAN interfaces configured")
+
+    return wan.name, [(lan.name, lan_subnet(lan)) for lan in lans]
+
+
+def compile_iptables(wan, lans):
+    """Compile the zone model into iptables-restore input
+
+    Rules are written the way iptables-save prints them, so the output can
+    be compared directly with a saved or live ruleset.
+    """
+    filter_rules = [
+        '-A INPUT -i lo -j ACCEPT',
+        '-A INPUT -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT',
+    ]
+    for lan, _ in lans:
+        for protocol, port in LAN_SERVICES:
+            filter_rules.append(f'-A INPUT -i {lan} -p {protocol} -m {protocol} --dport {port} -j ACCEPT')
+    for lan, _ in lans:
+        filter_rules.append(f'-A FORWARD -i {lan} -o {wan} -j ACCEPT')
+    filter_rules.append(f'-A FORWARD -i {wan} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT')
+    filter_rules.append('-A OUTPUT -o lo -j ACCEPT')
+
+    nat_rules = [f'-A POSTROUTING -s {subnet} -o {wan} -j MASQUERADE' for _, subnet in lans]
+
+    lines = [
+        '*filter',
+        ':INPUT DROP [0:0]',
+        ':FORWARD DROP [0:0]',
+        ':OUTPUT ACCEPT [0:0]',
+        *filter_rules,
+        'COMMIT',
+        '*nat',
+        ':PREROUTING ACCEPT [0:0]',
+        ':INPUT ACCEPT [0:0]',
+        ':OUTPUT ACCEPT [0:0]',
+        ':POSTROUTING ACCEPT [0:0]',
+        *nat_rules,
+        'COMMIT',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def parse_ruleset(text):
+    """Parse iptables-save output into {table: {chain: (policy, [rules])}}
+
+    User-defined chains have the policy '-'. Counters and comments are
+    ignored.
+    """
+    ruleset = {}
+    table = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('*'):
+            table = ruleset.setdefault(line[1:], {})
+        elif line.startswith(':'):
+            chain, policy = line[1:].split()[:2]
+            table[chain] = (policy, [])
+        elif line.startswith('-A '):
+            chain = line.split(None, 2)[1]
+            table.setdefault(chain, ('-', []))[1].append(line)
+    return ruleset
+
+
+def diff_rulesets(live, desired):
+    """Return the per-chain changes that turn the live ruleset into desired
+
+    Only tables present in desired are compared. Each change is a dict
+    with table, chain, action ('create', 'update' or 'delete'), policy
+    (the new policy, or None if unchanged), added and removed rules, and
+    rewrite (whether the chain's rules have to be reloaded).
+    """
+    changes = []
+    for table, chains in desired.items():
+        live_chains = live.get(table, {})
+
+        for chain, (policy, rules) in chains.items():
+            if chain not in live_chains:
+                changes.append({'table': table, 'chain': chain, 'action': 'create', 'policy': policy,
+                                'added': rules, 'removed': [], 'rewrite': True})
+                continue
+
+            live_policy, live_rules = live_chains[chain]
+            if policy == live_policy and rules == live_rules:
+                continue
+            changes.append({
+                'table': table,
+                'chain': chain,
+                'action': 'update',
+                'policy': policy if policy != live_policy else None,
+                'added': list((Counter(rules) - Counter(live_rules)).elements()),
+                'removed': list((Counter(live_rules) - Counter(rules)).elements()),
+                # Also true when only the order changed
+                'rewrite': rules != live_rules,
+            })
+
+        for chain, (policy, live_rules) in live_chains.items():
+            if chain not in chains and policy == '-':
+                changes.append({'table': table, 'chain': chain, 'action': 'delete', 'policy': None,
+                                'added': [], 'removed': live_rules, 'rewrite': False})
+
+    return changes
+
+
+def compile_changes(changes, desired):
+    """Render changes as iptables-restore --noflush input
+
+    Only the listed chains are flushed and refilled; every other chain,
+    and the counters of its rules, is left alone. Each table is still
+    committed atomically.
+    """
+    lines = []
+    for table in desired:
+        table_changes = [change for change in changes if change['table'] == table]
+        if not table_changes:
+            continue
+
+        lines.append(f'*{table}')
+        for change in table_changes:
+            if change['action'] == 'create' or change['policy']:
+                policy = desired[table][change['chain']][0]
+                lines.append(f":{change['chain']} {policy} [0:0]")
+        for change in table_changes:
+            if change['action'] == 'delete' or (change['action'] == 'update' and change['rewrite']):
+                lines.append(f"-F {change['chain']}")
+        for change in table_changes:
+            if change['action'] == 'delete':
+                lines.append(f"-X {change['chain']}")
+        for change in table_changes:
+            if change['action'] != 'delete' and change['rewrite']:
+                lines.extend(desired[table][change['chain']][1])
+        lines.append('COMMIT')
+
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+# The nftables backend keeps all of its rules in one table. The chains
+# never change with the configuration: zones are dispatched through verdict
+# maps and services matched against sets, so each packet does a constant
+# number of hash/interval lookups however many LANs there are, and a
+# configuration change only adds or removes set elements.
+NFT_TABLE = 'alpine_router'
+
+# name -> (kind, declaration lines)
+NFT_SETS = {
+    'layout': ('set', ('type mark',)),
+    'wan_ifaces': ('set', ('type ifname',)),
+    'lan_subnets': ('set', ('type ipv4_addr', 'flags interval')),
+    'lan_services': ('set', ('type inet_proto . inet_service', 'flags interval')),
+    'input_zones': ('map', ('type ifname : verdict',)),
+    'forward_zones': ('map', ('type ifname . ifname : verdict',)),
+}
+
+NFT_CHAINS = {
+    'input': (
+        'type filter hook input priority filter; policy drop;',
+        'ct state established,related accept',
+        'iifname vmap @input_zones',
+    ),
+    'lan_input': (
+        'meta l4proto . th dport @lan_services accept',
+    ),
+    'forward': (
+        'type filter hook forward priority filter; policy drop;',
+        'iifname @wan_ifaces ct state established,related accept',
+        'iifname . oifname vmap @forward_zones',
+    ),
+    'output': (
+        'type filter hook output priority filter; policy accept;',
+    ),
+    'postrouting': (
+        'type nat hook postrouting priority srcnat; policy accept;',
+        'oifname @wan_ifaces ip saddr @lan_subnets masquerade',
+    ),
+}
+
+# Identifies the table layout above, so a live table built from an older
+# layout is replaced instead of patched. It is stored as the one element of
+# the layout set rather than as a table comment, which not every nft
+# version lists back in its JSON output.
+NFT_LAYOUT = int(hashlib.sha1(json.dumps([NFT_SETS, NFT_CHAINS]).encode()).hexdigest()[:8], 16)
+
+
+def collapse_subnets(subnets):
+    """Merge overlapping and adjacent subnets into the fewest prefixes
+
+    Accepts "a.b.c.d/n", a bare address or an "a-b" range, the forms nft
+    lists interval set elements in. Overlapping intervals cannot coexist
+    in an nft set, and collapsing both sides the same way lets the live
+    elements compare equal to the desired ones.
+    """
+    networks = []
+    for subnet in subnets:
+        first, _, last = subnet.partition('-')
+        if last:
+            networks.extend(ipaddress.summarize_address_range(
+                ipaddress.IPv4Address(first.strip()), ipaddress.IPv4Address(last.strip())))
+        else:
+            networks.append(ipaddress.IPv4Network(subnet.strip()))
+    return [str(network) for network in ipaddress.collapse_addresses(networks)]
+
+
+def nft_elements(wan, lans):
+    """Return {set or map name: [elements]} for the zone model"""
+    lan_names = [lan for lan, _ in lans]
+    return {
+        'layout': [str(NFT_LAYOUT)],
+        'wan_ifaces': [f'"{wan}"'],
+        'lan_subnets': collapse_subnets(subnet for _, subnet in lans),
+        'lan_services': [f"{protocol} . {port.replace(':', '-')}" for protocol, port in LAN_SERVICES],
+        'input_zones': ['"lo" : accept'] + [f'"{lan}" : jump lan_input' for lan in lan_names],
+        'forward_zones': [f'"{lan}" . "{wan}" : accept' for lan in lan_names],
+    }
+
+
+def compile_nftables(elements):
+    """Compile set elements into an nft -f script that replaces the table
+
+    Declaring and deleting the table first makes the script idempotent;
+    nft applies the whole file as one transaction.
+    """
+    lines = [
+        f'table inet {NFT_TABLE}',
+        f'delete table inet {NFT_TABLE}',
+        f'table inet {NFT_TABLE} {{',
+    ]
+    for name, (kind, declaration) in NFT_SETS.items():
+        lines.append(f'\t{kind} {name} {{')
+        lines.extend(f'\t\t{line}' for line in declaration)
+        if elements[name]:
+            lines.append(f"\t\telements = {{ {', '.join(elements[name])} }}")
+        lines.append('\t}')
+    for name, rules in NFT_CHAINS.items():
+        lines.append(f'\tchain {name} {{')
+        lines.extend(f'\t\t{rule}' for rule in rules)
+        lines.append('\t}')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def _nft_value(value, quote):
+    """Render a value from nft's JSON output in nft script syntax"""
+    if isinstance(value, dict):
+        if 'elem' in value:
+            return _nft_value(value['elem']['val'], quote)
+        if 'concat' in value:
+            return ' . '.join(_nft_value(part, quote) for part in value['concat'])
+        if 'prefix' in value:
+            return f"{value['prefix']['addr']}/{value['prefix']['len']}"
+        if 'range' in value:
+            return '-'.join(_nft_value(part, quote) for part in value['range'])
+        for verdict in ('jump', 'goto'):
+            if verdict in value:
+                return f"{verdict} {value[verdict]['target']}"
+        # accept, drop, return, continue
+        return next(iter(value))
+    if isinstance(value, str) and quote:
+        return f'"{value}"'
+    return str(value)
+
+
+def read_nft_elements():
+    """Return {name: [elements]} for the live table
+
+    Returns None if the table is missing or was built from a different
+    layout, in which case it has to be replaced as a whole.
+    """
+    try:
+        output = _run(['nft', '-j', 'list', 'table', 'inet', NFT_TABLE])
+    except FirewallError:
+        return None
+
+    elements = {}
+    for item in json.loads(output).get('nftables', []):
+        for kind in ('set', 'map'):
+            if kind not in item:
+                continue
+            definition = item[kind]
+            key_type = definition['type']
+            quote = 'ifname' in (key_type if isinstance(key_type, list) else [key_type])
+            rendered = []
+            for element in definition.get('elem', []):
+                if kind == 'map':
+                    key, verdict = element
+                    rendered.append(f'{_nft_value(key, quote)} : {_nft_value(verdict, quote)}')
+                else:
+                    rendered.append(_nft_value(element, quote))
+            elements[definition['name']] = rendered
+
+    if set(elements) != set(NFT_SETS) or elements['layout'] != [str(NFT_LAYOUT)]:
+        return None
+    elements['lan_subnets'] = collapse_subnets(elements['lan_subnets'])
+    return elements
+
+
+def diff_nft_elements(live, desired):
+    """Return the per-set element changes that turn live into desired"""
+    changes = []
+    for name, wanted in desired.items():
+        added = [element for element in wanted if element not in live[name]]
+        removed = [element for element in live[name] if element not in wanted]
+        if added or removed:
+            changes.append({'table': f'inet {NFT_TABLE}', 'set': name, 'action': 'update',
+                            'added': added, 'removed': removed})
+    return changes
+
+
+def compile_nft_changes(changes):
+    """Render element changes as one nft -f transaction"""
+    lines = []
+    # Deletes go first so a map key whose verdict changed can be re-added
+    for change in changes:
+        if change['removed']:
+            lines.append(f"delete element inet {NFT_TABLE} {change['set']} {{ {', '.join(change['removed'])} }}")
+    for change in changes:
+        if change['added']:
+            lines.append(f"add element inet {NFT_TABLE} {change['set']} {{ {', '.join(change['added'])} }}")
+    return '\n'.join(lines) + '\n'
+
+
+def _run(cmd, input=None):
+    try:
+        return run(cmd, input)
+    except CommandError as e:
+        raise FirewallError(str(e)) from e
+
+
+def _ensure_installed(binary, packages):
+    try:
+        ensure_installed(binary, packages)
+    except CommandError as e:
+        raise FirewallError(f"Could not install {binary}: {e}") from e
+
+
+def enable_forwarding():
+    write_file(SYSCTL_PATH, 'net.ipv4.ip_forward = 1\n')
+    with open(IP_FORWARD_PATH, 'w') as f:
+        f.write('1\n')
+
+
+# Loaded in place of the managed tables when switching to nftables, which
+# flushes them and deletes their user-defined chains
+IPTABLES_RESET = """*filter
+:INPUT ACCEPT [0:0]
+:FORWARD ACCEPT [0:0]
+:OUTPUT ACCEPT [0:0]
+COMMIT
+*nat
+:PREROUTING ACCEPT [0:0]
+:INPUT ACCEPT [0:0]
+:OUTPUT ACCEPT [0:0]
+:POSTROUTING ACCEPT [0:0]
+COMMIT
+"""
+
+
+def _clear_iptables(dry_run):
+    """Reset the tables the iptables backend manages; returns the changes
+
+    Only tables that are loaded are compared, so a host that never used
+    the iptables backend needs no changes.
+    """
+    try:
+        live = parse_ruleset(_run(['iptables-save']))
+    except FirewallError:
+        # iptables is not installed, so there is nothing to clear
+        live = {}
+    reset = {table: chains for table, chains in parse_ruleset(IPTABLES_RESET).items() if table in live}
+    changes = diff_rulesets(live, reset)
+    if not dry_run:
+        if changes:
+            _run(['iptables-restore'], IPTABLES_RESET)
+        _remove_saved(RULES_PATH)
+    return changes
+
+
+def _clear_nftables(dry_run):
+    """Delete the table the nftables backend manages; returns the changes"""
+    try:
+        _run(['nft', 'list', 'table', 'inet', NFT_TABLE])
+        changes = [{'table': f'inet {NFT_TABLE}', 'set': None, 'action': 'delete',
+                    'added': [], 'removed': []}]
+    except FirewallError:
+        # No such table, or nft is not installed
+        changes = []
+    if not dry_run:
+        if changes:
+            _run(['nft', 'delete', 'table', 'inet', NFT_TABLE])
+        _remove_saved(NFT_RULES_PATH)
+    return changes
+
+
+def _remove_saved(path):
+    """Remove a saved ruleset so it is not restored at boot"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        raise FirewallError(f"Could not remove {path}: {e}") from e
+
+
+def _apply_iptables(wan, lans, dry_run):
+    """Diff the compiled ruleset against iptables-save and load the changes
+
+    Only chains that differ are flushed and refilled, through a single
+    iptables-restore --noflush call that commits each table atomically.
+    """
+    ruleset = compile_iptables(wan, lans)
+    desired = parse_ruleset(ruleset)
+
+    if not dry_run:
+        _ensure_installed('iptables-restore', ('iptables', 'ip6tables'))
+
+    try:
+        live = parse_ruleset(_run(['iptables-save']))
+    except FirewallError:
+        if not dry_run:
+            raise
+        # iptables is not installed yet, so every chain would be created
+        live = {}
+    changes = diff_rulesets(live, desired)
+    if changes and not dry_run:
+        _run(['iptables-restore', '--noflush'], compile_changes(changes, desired))
+    return ruleset, RULES_PATH, changes
+
+
+def _apply_nftables(wan, lans, dry_run):
+    """Patch the set elements of the nftables table, or replace the table
+
+    Either way the update is a single nft -f transaction.
+    """
+    elements = nft_elements(wan, lans)
+    ruleset = compile_nftables(elements)
+
+    if not dry_run:
+        _ensure_installed('nft', ('nftables',))
+
+    live = read_nft_elements()
+    if live is None:
+        changes = [{'table': f'inet {NFT_TABLE}', 'set': None, 'action': 'create',
+                    'added': [], 'removed': []}]
+        if not dry_run:
+            _run(['nft', '-f', '-'], ruleset)
+    else:
+        changes = diff_nft_elements(live, elements)
+        if changes and not dry_run:
+            _run(['nft', '-f', '-'], compile_nft_changes(changes))
+    return ruleset, NFT_RULES_PATH, changes
+
+
+def apply_firewall(session, dry_run=False):
+    """Bring the live firewall in line with the database
+
+    The desired ruleset is compiled from the database for FIREWALL_BACKEND
+    and compared with the live one; only what differs is changed, so
+    unrelated rules keep their counters and established flows are never
+    disturbed. Whatever the other backend left behind, live or saved for
+    boot, is removed, so switching backends does not leave its DROP
+    policies in force. Returns the list of changes, which is empty when
+    the firewall was already current; with dry_run nothing is applied.
+    """
+    wan, lans = load_zones(session)
+
+    started = time.monotonic()
+    if FIREWALL_BACKEND == 'nftables':
+        ruleset, rules_path, changes = _apply_nftables(wan, lans, dry_run)
+        changes += _clear_iptables(dry_run)
+    elif FIREWALL_BACKEND == 'iptables':
+        ruleset, rules_path, changes = _apply_iptables(wan, lans, dry_run)
+        changes += _clear_nftables(dry_run)
+    else:
+        raise FirewallError(f"Unknown firewall backend {FIREWALL_BACKEND!r}")
+    elapsed = (time.monotonic() - started) * 1000
+    if dry_run:
+        return changes
+
+    try:
+        write_file(rules_path, ruleset)
+        enable_forwarding()
+    except OSError as e:
+        raise FirewallError(f"Could not persist firewall settings: {e}") from e
+
+    if changes:
+        summary = ', '.join(
+            f"{change['table']}/{change.get('chain') or change.get('set') or '*'} ({change['action']})"
+            for change in changes
+        )
+        print(f"Firewall updated in {elapsed:.1f} ms: {summary}")
+    else:
+        print(f"Firewall already up to date (checked in {elapsed:.1f} ms)")
+    return changes
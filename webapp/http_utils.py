@@ -0,0 +1,29 @@
+# http_utils.py
+
+import hashlib
+import json
+
+from flask import current_app, request
+
+
+def _serialize(payload):
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+
+def payload_etag(payload):
+    """Content hash of a JSON-serializable payload, usable as an ETag"""
+    return hashlib.sha1(_serialize(payload).encode()).hexdigest()
+
+
+def conditional_jsonify(payload, status=200):
+    """JSON response with a content-hash ETag, honouring If-None-Match
+
+    Returns 304 Not Modified with an empty body when the client already
+    has the current representation.
+    """
+    body = _serialize(payload)
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode()).hexdigest())
+    # Let clients cache the body but always revalidate it
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -0,0 +1,123 @@
+# interface_cache.py
+
+import os
+import threading
+import time
+
+from discovery import backend_client, discover_interface, discover_interfaces, netlink_monitor
+
+# Seconds a discovered snapshot stays valid. Netlink link/address events
+# invalidate the snapshot immediately, so this is only a safety net.
+INTERFACE_CACHE_TTL = float(os.environ.get('INTERFACE_CACHE_TTL', '10'))
+
+
+class InterfaceCache:
+    """Shared snapshot of live interface state
+
+    Concurrent callers that find the snapshot stale are coalesced into a
+    single in-flight refresh; the others wait for its result instead of
+    running their own discovery.
+    """
+
+    def __init__(self, loader, lookup, ttl):
+        self._loader = loader
+        self._lookup = lookup
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._by_name = {}
+        self._expires = 0.0
+        self._generation = 0
+        self._inflight = None
+        self._error = None
+        self._watching = False
+        self._listeners = []
+
+    def _ensure_watching(self):
+        if self._watching:
+            return
+        with self._lock:
+            if not self._watching:
+                self._watching = True
+                netlink_monitor.add_listener(self.invalidate)
+                if not netlink_monitor.start():
+                    # No netlink here; rely on the backend daemon's events
+                    backend_client.add_listener(self.invalidate)
+
+    def add_listener(self, callback):
+        """Call callback() whenever the snapshot is invalidated"""
+        self._ensure_watching()
+        self._listeners.append(callback)
+
+    def invalidate(self):
+        """Mark the snapshot stale so the next read rediscovers"""
+        with self._lock:
+            self._generation += 1
+            self._expires = 0.0
+        for callback in list(self._listeners):
+            callback()
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._expires:
+            return snapshot
+        return self._refresh()
+
+    def _refresh(self):
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() < self._expires:
+                return self._snapshot
+            leader = self._inflight is None
+            if leader:
+                self._inflight = threading.Event()
+            inflight = self._inflight
+            generation = self._generation
+
+        if not leader:
+            inflight.wait()
+            if self._error is not None:
+                raise self._error
+            return self._snapshot
+
+        try:
+            snapshot = self._loader()
+            error = None
+        except Exception as e:
+            snapshot = None
+            error = e
+
+        with self._lock:
+            self._error = error
+            if error is None:
+                self._snapshot = snapshot
+                self._by_name = {iface['name']: iface for iface in snapshot}
+                # If a change arrived while we were discovering, the result
+                # may already be stale, so let the next reader refresh again
+                if generation == self._generation:
+                    self._expires = time.monotonic() + self.ttl
+            self._inflight = None
+        inflight.set()
+
+        if error is not None:
+            raise error
+        return snapshot
+
+    def get_all(self):
+        """Return a copy of every interface in the snapshot"""
+        self._ensure_watching()
+        return [dict(iface) for iface in self._current()]
+
+    def get(self, name):
+        """Return a copy of one interface, or None
+
+        Served from the snapshot while it is fresh; otherwise only the named
+        interface is looked up rather than rediscovering every link.
+        """
+        self._ensure_watching()
+        if self._snapshot is not None and time.monotonic() < self._expires:
+            iface = self._by_name.get(name)
+            return dict(iface) if iface else None
+        return self._lookup(name)
+
+
+interface_cache = InterfaceCache(discover_interfaces, discover_interface, ttl=INTERFACE_CACHE_TTL)
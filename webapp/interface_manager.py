@@ -1,37 +1,50 @@
 # interface_manager.py
 
-from flask import Blueprint, jsonify, request, render_template, url_for, send_from_directory
-from sqlalchemy import create_engine, Column, String, Integer, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import subprocess
-import json
+from flask import Blueprint, Response, jsonify, request, render_template, url_for, send_from_directory
+from sqlalchemy.dialects.sqlite import insert
+from database import Session, NetworkInterface
+from discovery import DiscoveryError
+from interface_cache import interface_cache
+from http_utils import conditional_jsonify
+from events import snapshot_publisher
+from firewall import FirewallError, apply_firewall
+from network_config import NetworkConfigError, apply_network
+from jobs import job_runner
+from static_leases import lease_rows
+from dns_settings import load_settings, settings_dict
 import os
 
-DATABASE_URL = 'sqlite:///alpine.db'
-
-Base = declarative_base()
-
 # Create static directory if it doesn't exist
 os.makedirs(os.path.join(os.path.dirname(__file__), 'static/css'), exist_ok=True)
 os.makedirs(os.path.join(os.path.dirname(__file__), 'static/js'), exist_ok=True)
 
-class NetworkInterface(Base):
-    __tablename__ = 'network_interfaces'
+def load_interface_config(session, names):
+    """Return {name: NetworkInterface} for the given names, creating missing rows
 
-    id = Column(Integer, primary_key=True)
-    name = Column(String, unique=True, nullable=False)
-    label = Column(String, nullable=False, default='LAN')
-    is_wan = Column(Boolean, default=False)
-    dhcp_enabled = Column(Boolean, default=True)
-    static_ip = Column(String)
-    static_netmask = Column(String, default='255.255.255.0')
-    static_gateway = Column(String)
-    dns_servers = Column(String)
+    Uses one bulk SELECT keyed by name and, for interfaces not yet in the
+    database, one batched INSERT ... ON CONFLICT DO NOTHING, all committed
+    in a single transaction.
+    """
+    rows = {
+        row.name: row
+        for row in session.query(NetworkInterface).filter(NetworkInterface.name.in_(names))
+    }
 
-# Initialize database
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
+    missing = [name for name in names if name not in rows]
+    if missing:
+        # Insert interfaces with default settings; a concurrent request
+        # may already have inserted some of them, which is fine
+        session.execute(
+            insert(NetworkInterface).on_conflict_do_nothing(index_elements=['name']),
+            [{'name': name} for name in missing]
+        )
+        rows.update(
+            (row.name, row)
+            for row in session.query(NetworkInterface).filter(NetworkInterface.name.in_(missing))
+        )
+        session.commit()
+
+    return rows
 
 interface_manager = Blueprint('interface_manager', __name__, 
                              static_folder='static',
@@ -51,32 +64,16 @@ def list_interfaces():
     """Get all network interfaces with their configuration"""
     session = Session()
 
-    # Run the hardware discovery to get current interfaces
-    result = subprocess.run(
-        ["../backend/target/debug/hardware_discovery"],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode != 0:
+    # Current interfaces from the shared snapshot cache
+    try:
+        interfaces = interface_cache.get_all()
+    except DiscoveryError:
         return jsonify({"error": "Hardware discovery failed"}), 500
 
-    interfaces = json.loads(result.stdout)
-
     # Merge with database configuration
+    db_ifaces = load_interface_config(session, [iface['name'] for iface in interfaces])
     for iface in interfaces:
-        db_iface = session.query(NetworkInterface).filter_by(name=iface['name']).first()
-        if not db_iface:
-            # Insert interface into DB with default settings
-            db_iface = NetworkInterface(
-                name=iface['name'],
-                label='LAN',
-                is_wan=False,
-                dhcp_enabled=True
-            )
-            session.add(db_iface)
-            session.commit()
-            db_iface = session.query(NetworkInterface).filter_by(name=iface['name']).first()
+        db_iface = db_ifaces[iface['name']]
 
         # Add configuration from database
         iface['label'] = db_iface.label
@@ -87,7 +84,7 @@ def list_interfaces():
         iface['static_gateway'] = db_iface.static_gateway
         iface['dns_servers'] = db_iface.dns_servers
 
-    return jsonify(interfaces)
+    return conditional_jsonify(interfaces)
 
 @interface_manager.route('/interfaces/<name>', methods=['GET'])
 def get_interface(name):
@@ -99,18 +96,11 @@ def get_interface(name):
         return jsonify({"error": "Interface not found"}), 404
 
     # Get live interface data
-    result = subprocess.run(
-        ["../backend/target/debug/hardware_discovery"],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode != 0:
+    try:
+        live_iface = interface_cache.get(name)
+    except DiscoveryError:
         return jsonify({"error": "Hardware discovery failed"}), 500
 
-    interfaces = json.loads(result.stdout)
-    live_iface = next((i for i in interfaces if i['name'] == name), None)
-
     if not live_iface:
         return jsonify({"error": "Interface not found in hardware"}), 404
 
@@ -130,7 +120,7 @@ def get_interface(name):
         'status': live_iface.get('status')
     }
 
-    return jsonify(interface_data)
+    return conditional_jsonify(interface_data)
 
 @interface_manager.route('/interfaces/<name>', methods=['PUT'])
 def update_interface(name):
@@ -177,6 +167,9 @@ def update_interface(name):
 
         session.commit()
 
+        # Labels and roles are part of the pushed snapshot
+        snapshot_publisher.notify()
+
         # Skip applying network config during the setup wizard
         # We'll apply everything at the end with apply-config
 
@@ -185,113 +178,90 @@ def update_interface(name):
         session.rollback()
         return jsonify({"error": str(e)}), 500
 
+def _firewall_report(changes):
+    return [{key: value for key, value in change.items() if key != 'rewrite'} for change in changes]
+
+def apply_configuration(job):
+    """Apply all network and firewall configuration as a background job
+
+    Only what differs from the running system is changed.
+    """
+    session = Session()
+    try:
+        with job.step('Load configuration'):
+            interfaces = session.query(NetworkInterface).all()
+            if not interfaces:
+                raise RuntimeError("No interfaces configured")
+
+        # Write every changed interface file, then reload networking once
+        with job.step('Network configuration'):
+            network_changes = apply_network(interfaces, lease_rows(session),
+                                            settings_dict(load_settings(session)))
+
+        with job.step('Firewall'):
+            firewall_changes = apply_firewall(session)
+
+        return {
+            "network_changes": network_changes,
+            "firewall_changes": _firewall_report(firewall_changes)
+        }
+    finally:
+        # Runs on the job worker thread, outside any request
+        Session.remove()
+
 @interface_manager.route('/apply-config', methods=['POST'])
 def apply_system_config():
-    """Apply all network and firewall configurations"""
-    session = Session()
+    """Queue an apply of all network and firewall configuration
+
+    Returns 202 with the job to follow at /jobs/<id>. With ?dry_run=1
+    nothing is applied and the plan is returned directly.
+    """
+    if request.args.get('dry_run', '').lower() not in ('1', 'true', 'yes'):
+        job = job_runner.submit('apply-config', apply_configuration)
+        status_url = url_for('interface_manager.job_status', job_id=job.id)
+        return jsonify({
+            "status": job.status,
+            "job_id": job.id,
+            "status_url": status_url,
+            "events_url": url_for('interface_manager.job_events', job_id=job.id)
+        }), 202, {'Location': status_url}
 
-    # Get all interfaces
+    session = Session()
     interfaces = session.query(NetworkInterface).all()
-
     if not interfaces:
         return jsonify({"error": "No interfaces configured"}), 500
 
-    # Apply network configuration for each interface
-    for iface in interfaces:
-        success = apply_network_config(iface)
-        if not success:
-            return jsonify({"error": f"Failed to configure interface {iface.name}"}), 500
-
-    # Set up firewall
-    success = setup_firewall()
-    if not success:
-        return jsonify({"error": "Failed to configure firewall"}), 500
+    try:
+        network_changes = apply_network(interfaces, lease_rows(session),
+                                        settings_dict(load_settings(session)), dry_run=True)
+        firewall_changes = apply_firewall(session, dry_run=True)
+    except (NetworkConfigError, FirewallError) as e:
+        print(f"Error planning configuration: {e}")
+        return jsonify({"error": str(e)}), 500
 
     return jsonify({
-        "status": "success",
-        "message": "System configuration applied successfully"
+        "status": "planned",
+        "message": "Configuration plan computed",
+        "network_changes": network_changes,
+        "firewall_changes": _firewall_report(firewall_changes)
     })
 
-def apply_network_config(interface):
-    """Apply network configuration to the system"""
-    # Get absolute path to the script
-    script_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts/apply_network_config.sh'))
-    
-    # Build command to run the network configuration script without sudo
-    # (assuming sudoers is configured properly)
-    cmd = [
-        script_path,
-        interface.name,
-        str(interface.is_wan),
-        str(interface.dhcp_enabled),
-        interface.static_ip or "192.168.1.1",  # Default for LAN
-        interface.static_netmask or "255.255.255.0",
-        interface.static_gateway or "",
-        interface.dns_servers or "8.8.8.8,1.1.1.1"  # Default DNS servers
-    ]
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print(f"Network configuration applied for {interface.name}:")
-        print(result.stdout)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error applying network configuration for {interface.name}:")
-        print(f"Error: {e}")
-        print(f"Output: {e.stdout}")
-        print(f"Error output: {e.stderr}")
-        return False
-
-
-def setup_firewall():
-    """Set up firewall with NAT for routing between interfaces"""
-    session = Session()
-
-    # Get WAN interface
-    wan_iface = session.query(NetworkInterface).filter_by(is_wan=True).first()
-
-    if not wan_iface:
-        print("Error: No WAN interface configured")
-        return False
-
-    # Get LAN interfaces
-    lan_ifaces = session.query(NetworkInterface).filter_by(is_wan=False).all()
-
-    if not lan_ifaces:
-        print("Error: No LAN interfaces configured")
-        return False
-
-    # Build comma-separated list of LAN interface names
-    lan_names = ",".join([iface.name for iface in lan_ifaces])
-
-    # Get absolute path to the script
-    script_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts/setup_firewall.sh'))
-    
-    # Run firewall setup script
-    cmd = [
-        script_path,
-        wan_iface.name,
-        lan_names
-    ]
-
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print("Firewall configured successfully:")
-        print(result.stdout)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error configuring firewall:")
-        print(f"Error: {e}")
-        print(f"Output: {e.stdout}")
-        print(f"Error output: {e.stderr}")
-        return False
\ No newline at end of file
+@interface_manager.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Get the status, steps and result of a background job"""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
+
+@interface_manager.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream a background job's progress as Server-Sent Events"""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return Response(
+        job_runner.stream(job),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,155 @@
+# jobs.py
+
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from events import KEEPALIVE_INTERVAL, format_sse
+
+# Finished jobs kept around for status queries
+JOB_HISTORY = 50
+
+
+class Job:
+    """One unit of background work, with per-step progress and timings"""
+
+    def __init__(self, job_id, kind, func):
+        self.id = job_id
+        self.kind = kind
+        self.func = func
+        self.status = 'queued'
+        self.steps = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Bumped on every change so streams can wait for the next one
+        self.version = 0
+        self._changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed')
+
+    def _touch(self):
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    @contextmanager
+    def step(self, name):
+        """Record a named step, its duration and whether it failed"""
+        step = {'name': name, 'status': 'running', 'duration_ms': None, 'detail': None}
+        self.steps.append(step)
+        self._touch()
+        started = time.monotonic()
+        try:
+            yield step
+            step['status'] = 'succeeded'
+        except Exception as e:
+            step['status'] = 'failed'
+            step['detail'] = str(e)
+            raise
+        finally:
+            step['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+            self._touch()
+
+    def wait(self, version, timeout):
+        """Block until the job changes past version, or timeout expires"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def to_dict(self):
+        duration = None
+        if self.started is not None:
+            duration = round(((self.finished or time.time()) - self.started) * 1000, 1)
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'steps': [dict(step) for step in self.steps],
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'duration_ms': duration,
+        }
+
+
+class JobRunner:
+    """Runs jobs one at a time on a single background worker
+
+    Jobs therefore never interleave. Submitting a kind of job that is
+    already queued and not yet started returns the queued job instead of
+    adding another, since it will pick up the same state when it runs.
+    """
+
+    def __init__(self, history=JOB_HISTORY):
+        self.history = history
+        self._jobs = OrderedDict()
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, kind, func):
+        """Queue func(job) as a job of the given kind and return the Job"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.kind == kind and job.status == 'queued':
+                    return job
+
+            job = Job(f'{kind}-{next(self._ids)}', kind, func)
+            self._jobs[job.id] = job
+            self._prune()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='job-runner', daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job.status = 'running'
+            job.started = time.time()
+            job._touch()
+            try:
+                job.result = job.func(job)
+                job.status = 'succeeded'
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = 'failed'
+            job.finished = time.time()
+            job._touch()
+
+    def stream(self, job):
+        """Generate Server-Sent Events with the job's state until it is done"""
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                yield format_sse('job', job.to_dict())
+                if job.done:
+                    return
+            elif job.wait(version, KEEPALIVE_INTERVAL) == version:
+                yield ': keepalive\n\n'
+
+
+job_runner = JobRunner()
@@ -0,0 +1,210 @@
+# lease_watcher.py
+
+import ctypes
+import ctypes.util
+import ipaddress
+import os
+import struct
+import threading
+
+LEASES_FILE = os.environ.get('DNSMASQ_LEASES_FILE', '/var/lib/misc/dnsmasq.leases')
+
+# Largest page /dhcp/leases will return
+MAX_PAGE_SIZE = 500
+
+# inotify(7) constants
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+# dnsmasq rewrites the file in place, or it may be replaced or removed
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def parse_leases(text):
+    """Parse a dnsmasq leases file into a list of lease dicts
+
+    Lines are "<expiry> <mac> <ip> <hostname|*> <client-id|*>"; an expiry of
+    0 means the lease never expires. DHCPv6 entries are skipped.
+    """
+    leases = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 4 or fields[0] == 'duid':
+            continue
+        try:
+            ip = ipaddress.IPv4Address(fields[2])
+            expires = int(fields[0])
+        except ValueError:
+            continue
+        leases.append({
+            'mac': fields[1].lower(),
+            'ip': str(ip),
+            'hostname': None if fields[3] == '*' else fields[3],
+            'expires': expires or None,
+            '_ip_int': int(ip),
+        })
+    leases.sort(key=lambda lease: lease['_ip_int'])
+    return leases
+
+
+class LeaseIndex:
+    """Active leases, ordered by address, with exact-match indexes"""
+
+    def __init__(self, leases):
+        self.leases = leases
+        self.by_mac = {lease['mac']: lease for lease in leases}
+        self.by_ip = {lease['ip']: lease for lease in leases}
+        self.by_hostname = {}
+        for lease in leases:
+            if lease['hostname']:
+                self.by_hostname.setdefault(lease['hostname'].lower(), []).append(lease)
+
+
+def _public(lease):
+    return {key: value for key, value in lease.items() if not key.startswith('_')}
+
+
+class LeaseWatcher:
+    """In-memory view of the dnsmasq leases file, kept current with inotify
+
+    The file is only re-read when inotify reports a change to it. Without
+    inotify, queries stat the file instead and re-read it only if its
+    mtime, size or inode changed. Either way an unchanged file costs no
+    parsing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._index = LeaseIndex([])
+        self._signature = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start watching; returns False if inotify is unavailable"""
+        with self._lock:
+            if self._thread is not None:
+                return True
+            fd = self._inotify_watch(os.path.dirname(self.path))
+            if fd is None:
+                return False
+            self._thread = threading.Thread(target=self._run, args=(fd,),
+                                            name='lease-watcher', daemon=True)
+            self._thread.start()
+        self.refresh()
+        return True
+
+    @staticmethod
+    def _inotify_watch(directory):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            # Usually the directory does not exist (dnsmasq not installed)
+            os.close(fd)
+            return None
+        return fd
+
+    def _run(self, fd):
+        name = os.fsencode(os.path.basename(self.path))
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:
+                return
+
+            # Only react to events for the leases file itself
+            changed = False
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                if data[offset:offset + length].rstrip(b'\0') == name:
+                    changed = True
+                offset += length
+
+            if changed:
+                self.refresh()
+
+    def refresh(self):
+        """Re-read the leases file if it changed since the last read"""
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            signature = None
+
+        with self._lock:
+            if signature == self._signature:
+                return
+            try:
+                with open(self.path) as f:
+                    leases = parse_leases(f.read())
+            except FileNotFoundError:
+                leases = []
+            except OSError as e:
+                print(f"Error reading DHCP leases: {e}")
+                return
+            self._index = LeaseIndex(leases)
+            self._signature = signature
+
+    def _current(self):
+        if self._thread is None:
+            self.refresh()
+        return self._index
+
+    def query(self, mac=None, ip=None, hostname=None, search=None, page=1, per_page=50):
+        """Return one page of active leases, ordered by IP address
+
+        mac, ip and hostname are exact matches, and every one given must
+        match; search is a case-insensitive substring match on any of them.
+        """
+        index = self._current()
+        mac = mac.lower() if mac else None
+        hostname = hostname.lower() if hostname else None
+
+        # Look up the most selective key given, then check the others
+        if mac:
+            leases = [index.by_mac[mac]] if mac in index.by_mac else []
+        elif ip:
+            leases = [index.by_ip[ip]] if ip in index.by_ip else []
+        elif hostname:
+            leases = index.by_hostname.get(hostname, [])
+        else:
+            leases = index.leases
+        if mac or ip or hostname:
+            leases = [
+                lease for lease in leases
+                if (not mac or lease['mac'] == mac) and (not ip or lease['ip'] == ip)
+                and (not hostname or (lease['hostname'] or '').lower() == hostname)
+            ]
+
+        if search:
+            search = search.lower()
+            leases = [
+                lease for lease in leases
+                if search in lease['mac'] or search in lease['ip']
+                or search in (lease['hostname'] or '').lower()
+            ]
+
+        per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+        page = max(1, page)
+        start = (page - 1) * per_page
+        return {
+            'total': len(leases),
+            'page': page,
+            'per_page': per_page,
+            'leases': [_public(lease) for lease in leases[start:start + per_page]],
+        }
+
+
+lease_watcher = LeaseWatcher(LEASES_FILE)
@@ -0,0 +1,145 @@
+# metrics.py
+
+import collections
+import os
+import platform
+import threading
+import time
+
+import psutil
+
+from tsdb import TieredSeries, open_buffer
+
+# Seconds between system metric samples
+METRICS_INTERVAL = float(os.environ.get('METRICS_INTERVAL', '5'))
+
+# Number of samples kept in memory (one hour at the default interval)
+METRICS_HISTORY = int(os.environ.get('METRICS_HISTORY', '720'))
+
+# Persisted history: (tier, seconds per slot, slots kept)
+HISTORY_COLUMNS = ('cpu_percent', 'memory_percent', 'disk_percent')
+HISTORY_TIERS = (
+    ('1m', 60, 1440),     # last 24 hours
+    ('15m', 900, 2880),   # last 30 days
+)
+
+
+class MetricsSampler:
+    """Samples CPU, memory and disk usage on a fixed tick into a ring buffer
+
+    Readers get the most recent sample without blocking; CPU usage is
+    measured over the interval between ticks instead of sleeping per request.
+    """
+
+    def __init__(self, interval, history, persistent=True):
+        self.interval = interval
+        self._samples = collections.deque(maxlen=history)
+        self._history = None
+        self._persistent = persistent
+        self._lock = threading.Lock()
+        self._thread = None
+        self._listeners = []
+        # Static facts never change while we are running
+        self._static = {
+            'cores': psutil.cpu_count(),
+            'architecture': platform.machine()
+        }
+
+    def add_listener(self, callback):
+        """Call callback(sample) after every new sample"""
+        self._listeners.append(callback)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Prime psutil's CPU counters so the first tick has a baseline
+            psutil.cpu_percent(interval=None, percpu=True)
+            if self._persistent:
+                self._history = TieredSeries(
+                    self.interval, HISTORY_TIERS, (len(HISTORY_COLUMNS),),
+                    lambda name, capacity: open_buffer(f'system-{name}', capacity, (len(HISTORY_COLUMNS),))
+                )
+            self._thread = threading.Thread(target=self._run, name='metrics-sampler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.sample()
+
+    def sample(self):
+        """Take one sample and append it to the ring buffer"""
+        per_core = psutil.cpu_percent(interval=None, percpu=True)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+
+        sample = {
+            'timestamp': time.time(),
+            'cpu': {
+                'cores': self._static['cores'],
+                'usage_percent': round(sum(per_core) / len(per_core), 1) if per_core else 0.0,
+                'per_core_percent': per_core,
+                'architecture': self._static['architecture']
+            },
+            'memory': {
+                'total': memory.total,
+                'used': memory.used,
+                'available': memory.available,
+                'percent': memory.percent
+            },
+            'disk': {
+                'total': disk.total,
+                'used': disk.used,
+                'free': disk.free,
+                'percent': disk.percent
+            }
+        }
+
+        with self._lock:
+            self._samples.append(sample)
+            if self._history is not None:
+                self._history.append(sample['timestamp'], [
+                    sample['cpu']['usage_percent'],
+                    sample['memory']['percent'],
+                    sample['disk']['percent']
+                ])
+        for callback in list(self._listeners):
+            callback(sample)
+        return sample
+
+    def latest(self):
+        """Return the most recent sample, sampling once if none exists yet"""
+        with self._lock:
+            if self._samples:
+                return self._samples[-1]
+        return self.sample()
+
+    def history(self):
+        """Return every sample in the ring buffer, oldest first"""
+        with self._lock:
+            return list(self._samples)
+
+    def stored_history(self, tier, n):
+        """Return (timestamps, values) from the persisted history
+
+        values has one column per entry in HISTORY_COLUMNS.
+        """
+        with self._lock:
+            if self._history is None:
+                return [], []
+            timestamps, values = self._history.latest(tier, n)
+            return timestamps.copy(), values.copy()
+
+
+metrics_sampler = MetricsSampler(METRICS_INTERVAL, METRICS_HISTORY)
+
+
+def get_additional_hardware_info():
+    """Latest CPU, RAM and disk information for the /hardware route"""
+    sample = metrics_sampler.latest()
+    return {
+        'cpu': sample['cpu'],
+        'memory': sample['memory'],
+        'disk': sample['disk']
+    }
@@ -0,0 +1,250 @@
+# network_config.py
+
+import hashlib
+import ipaddress
+import os
+import shutil
+
+import dnsmasq
+from dns_prober import dns_prober
+from system import CommandError, ensure_installed, run, write_file
+
+INTERFACES_DIR = '/etc/network/interfaces.d'
+RESOLV_CONF = '/etc/resolv.conf'
+
+# Addressing used for LAN interfaces without a static address configured
+DEFAULT_LAN_ADDRESS = '192.168.1.1'
+DEFAULT_LAN_NETMASK = '255.255.255.0'
+DEFAULT_DNS_SERVERS = '8.8.8.8,1.1.1.1'
+
+
+class NetworkConfigError(RuntimeError):
+    """Raised when the network configuration cannot be applied"""
+
+
+def interface_path(name):
+    return os.path.join(INTERFACES_DIR, name)
+
+
+def legacy_dnsmasq_path(name):
+    """Per-interface dnsmasq config written by earlier versions"""
+    return os.path.join(dnsmasq.DNSMASQ_CONF_DIR, f'{name}.conf')
+
+
+def lan_address(iface):
+    """Return the IPv4Interface (address and subnet) of a LAN"""
+    address = iface.static_ip or DEFAULT_LAN_ADDRESS
+    netmask = iface.static_netmask or DEFAULT_LAN_NETMASK
+    try:
+        return ipaddress.IPv4Interface(f'{address}/{netmask}')
+    except ValueError as e:
+        raise NetworkConfigError(f"Invalid address for {iface.name}: {e}") from e
+
+
+def render_interface(iface):
+    """Return the /etc/network/interfaces.d stanza for an interface"""
+    if iface.is_wan and iface.dhcp_enabled:
+        return f"auto {iface.name}\niface {iface.name} inet dhcp\n"
+
+    if iface.is_wan:
+        address = iface.static_ip
+        netmask = iface.static_netmask
+    else:
+        address = iface.static_ip or DEFAULT_LAN_ADDRESS
+        netmask = iface.static_netmask or DEFAULT_LAN_NETMASK
+
+    lines = [
+        f"auto {iface.name}",
+        f"iface {iface.name} inet static",
+        f"    address {address}",
+        f"    netmask {netmask}",
+    ]
+    if iface.is_wan and iface.static_gateway:
+        lines.append(f"    gateway {iface.static_gateway}")
+    return '\n'.join(lines) + '\n'
+
+
+def upstream_servers(interfaces):
+    """Return the upstream DNS servers, or None to use the ones from DHCP
+
+    A WAN's own DNS servers win; a static WAN without any falls back to
+    DEFAULT_DNS_SERVERS, and so does a router without a WAN.
+    """
+    servers = DEFAULT_DNS_SERVERS
+    for iface in interfaces:
+        if iface.is_wan:
+            if iface.dhcp_enabled and not iface.dns_servers:
+                return None
+            servers = iface.dns_servers or DEFAULT_DNS_SERVERS
+            break
+    return [server.strip() for server in servers.split(',') if server.strip()]
+
+
+def resolv_conf_servers():
+    """Return the non-local nameservers in resolv.conf, as DHCP set them"""
+    try:
+        with open(RESOLV_CONF) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    servers = []
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 2 or fields[0] != 'nameserver':
+            continue
+        try:
+            if not ipaddress.ip_address(fields[1]).is_loopback:
+                servers.append(fields[1])
+        except ValueError:
+            continue
+    return servers
+
+
+def render_resolv_conf(interfaces):
+    """Return resolv.conf for a static WAN, or None to leave it to DHCP
+
+    The router resolves through its own dnsmasq cache, which forwards to
+    the upstream servers.
+    """
+    for iface in interfaces:
+        if iface.is_wan and not iface.dhcp_enabled:
+            return "nameserver 127.0.0.1\n"
+    return None
+
+
+def render_files(interfaces, leases, dns):
+    """Render every configuration file as {path: content}
+
+    leases are the static DHCP leases as (mac, ip, hostname) tuples and dns
+    the DNS settings dict (see dns_settings.FIELDS).
+
+    Files that should not exist have None as their content.
+    """
+    files = {}
+    for iface in interfaces:
+        files[interface_path(iface.name)] = render_interface(iface)
+        files[legacy_dnsmasq_path(iface.name)] = None
+
+    lans = [(iface.name, lan_address(iface), iface.dhcp_enabled)
+            for iface in interfaces if not iface.is_wan]
+    servers = upstream_servers(interfaces)
+    files[dnsmasq.DNSMASQ_CONF] = dnsmasq.render_config(lans, dns, servers)
+    files[dnsmasq.DHCP_HOSTS_FILE] = dnsmasq.render_hosts(leases)
+    files[dnsmasq.LEGACY_HOSTS_FILE] = None
+    # Ordered (or pruned) by measured latency if upstream selection is on
+    files[dnsmasq.DNS_SERVERS_FILE] = (dnsmasq.render_servers(dns_prober.select(servers))
+                                       if servers is not None else None)
+
+    resolv_conf = render_resolv_conf(interfaces)
+    if resolv_conf is not None:
+        files[RESOLV_CONF] = resolv_conf
+    return files
+
+
+def reload_links(names):
+    """Bounce only the given links, or restart networking without ifupdown"""
+    if not shutil.which('ifup'):
+        run(['rc-service', 'networking', 'restart'])
+        return
+
+    try:
+        run(['ifdown', *names])
+    except CommandError:
+        # Links that were never up cannot be taken down; ifup still applies
+        pass
+    run(['ifup', *names])
+
+
+def _digest(content):
+    return hashlib.sha256(content.encode()).hexdigest() if content is not None else None
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def plan_network(interfaces, leases, dns):
+    """Compare the rendered configuration with what is on disk
+
+    Returns (plan, files). plan lists only what would change:
+        {"files": [{"path", "action", "old_hash", "new_hash"}],
+         "links": [names to bounce], "restart_dnsmasq": bool,
+         "reload_dnsmasq": bool}
+    where action is 'create', 'update' or 'delete'. files maps each path
+    to its new content, or None for files to delete.
+    """
+    files = render_files(interfaces, leases, dns)
+
+    changes = []
+    old_hosts = None
+    for path, content in files.items():
+        old = _read(path)
+        if path == dnsmasq.DHCP_HOSTS_FILE:
+            old_hosts = old
+        old_hash = _digest(old)
+        new_hash = _digest(content)
+        if old_hash == new_hash:
+            continue
+        action = 'delete' if content is None else 'create' if old_hash is None else 'update'
+        changes.append({'path': path, 'action': action, 'old_hash': old_hash, 'new_hash': new_hash})
+
+    changed = {change['path'] for change in changes}
+    # Anything in dnsmasq's configuration directory needs a restart, and a
+    # new servers file or dropped static hosts a SIGHUP; both clear its DNS
+    # cache. Added static hosts are picked up through inotify.
+    restart_dnsmasq = any(path.startswith(dnsmasq.DNSMASQ_CONF_DIR + os.sep) for path in changed)
+    reload_dnsmasq = dnsmasq.DNS_SERVERS_FILE in changed or (
+        dnsmasq.DHCP_HOSTS_FILE in changed
+        and dnsmasq.hosts_dropped(old_hosts, files[dnsmasq.DHCP_HOSTS_FILE]))
+    plan = {
+        'files': changes,
+        'links': [iface.name for iface in interfaces if interface_path(iface.name) in changed],
+        'restart_dnsmasq': restart_dnsmasq,
+        'reload_dnsmasq': not restart_dnsmasq and reload_dnsmasq,
+    }
+    return plan, {path: files[path] for path in changed}
+
+
+def apply_network(interfaces, leases, dns, dry_run=False):
+    """Bring the interface configuration on disk in line with the database
+
+    Every file is rendered and compared by content hash first; only files
+    that differ are written (or removed), only links whose stanza changed
+    are taken down and brought up again, all in one ifdown/ifup call, and
+    dnsmasq is restarted at most once, or just sent SIGHUP if only its
+    servers file changed or static hosts were dropped; either clears its
+    DNS cache, so neither happens unless it has to. Re-applying an unchanged
+    configuration touches nothing. Returns the plan (see plan_network);
+    with dry_run it is only computed.
+    """
+    plan, files = plan_network(interfaces, leases, dns)
+    if dry_run or not files:
+        return plan
+
+    try:
+        if dnsmasq.DNSMASQ_CONF in files:
+            ensure_installed('dnsmasq', ('dnsmasq',))
+
+        for path, content in files.items():
+            if content is None:
+                os.remove(path)
+            else:
+                write_file(path, content)
+
+        if plan['links']:
+            reload_links(plan['links'])
+
+        if plan['restart_dnsmasq']:
+            dnsmasq.restart()
+        elif plan['reload_dnsmasq']:
+            dnsmasq.reload()
+    except (OSError, CommandError) as e:
+        raise NetworkConfigError(str(e)) from e
+
+    print(f"Network configuration applied ({len(files)} files changed, "
+          f"links reloaded: {', '.join(plan['links']) or 'none'})")
+    return plan
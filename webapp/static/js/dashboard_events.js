@@ -0,0 +1,65 @@
+// dashboard_events.js
+//
+// Consumes the /events Server-Sent Events stream and feeds it into the
+// Dash hardware-data-store, so the dashboard updates as soon as
+// interface state or metrics change instead of waiting for the next poll.
+
+(function() {
+    if (!window.EventSource) {
+        // The refresh interval keeps working without push support
+        return;
+    }
+
+    let snapshot = null;
+    let etag = null;
+
+    function pushToDash() {
+        const clientside = window.dash_clientside;
+        if (!clientside || !clientside.set_props || !document.getElementById('hardware-data-store')) {
+            // Dash is not ready yet; try again shortly
+            setTimeout(pushToDash, 250);
+            return;
+        }
+        clientside.set_props('hardware-data-store', { data: snapshot });
+        clientside.set_props('hardware-etag', { data: etag });
+    }
+
+    function applyPatch(patch) {
+        const interfaces = new Map(snapshot.interfaces.map(iface => [iface.name, iface]));
+
+        Object.entries(patch.interfaces || {}).forEach(([name, fields]) => {
+            interfaces.set(name, Object.assign({}, interfaces.get(name), fields));
+        });
+        (patch.removed || []).forEach(name => interfaces.delete(name));
+
+        const hardwareInfo = Object.assign({}, snapshot.hardware_info);
+        Object.entries(patch.hardware_info || {}).forEach(([section, fields]) => {
+            hardwareInfo[section] = Object.assign({}, hardwareInfo[section], fields);
+        });
+
+        snapshot = {
+            interfaces: Array.from(interfaces.values()),
+            hardware_info: hardwareInfo
+        };
+    }
+
+    const source = new EventSource('/events');
+
+    // Sent on connect (and reconnect) and whenever we fell behind
+    source.addEventListener('snapshot', event => {
+        const message = JSON.parse(event.data);
+        snapshot = message.data;
+        etag = message.etag;
+        pushToDash();
+    });
+
+    source.addEventListener('patch', event => {
+        if (snapshot === null) {
+            return;
+        }
+        const message = JSON.parse(event.data);
+        applyPatch(message.data);
+        etag = message.etag;
+        pushToDash();
+    });
+})();
@@ -32,6 +32,7 @@
         let interfaces = [];
         let selectedWanInterface = null;
         let selectedLanInterfaces = [];
+        let interfacesEtag = null;
         
         // Initialize event listeners
         initEventListeners();
@@ -55,15 +56,29 @@
             // Show loading
             interfacesContainer.innerHTML = '<div class="loading">Loading interfaces...</div>';
             
-            fetch('/interfaces')
+            // Conditional request: the server answers 304 if nothing changed
+            const headers = interfacesEtag ? { 'If-None-Match': interfacesEtag } : {};
+            
+            fetch('/interfaces', { headers: headers, cache: 'no-store' })
                 .then(response => {
+                    if (response.status === 304) {
+                        return null;
+                    }
                     if (!response.ok) {
                         throw new Error('Network response was not ok');
                     }
+                    interfacesEtag = response.headers.get('ETag');
                     return response.json();
                 })
                 .then(data => {
+                    if (data === null) {
+                        // Unchanged since the last fetch
+                        renderInterfaceCards();
+                        return;
+                    }
                     interfaces = data;
+                    selectedWanInterface = null;
+                    selectedLanInterfaces = [];
                     // First load - initialize selections from database config
                     interfaces.forEach(iface => {
                         if (iface.is_wan) {
@@ -442,6 +457,7 @@
         }
         
         async function applySystemConfiguration() {
+            nextBtn.disabled = true;
             return fetch('/apply-config', {
                 method: 'POST',
                 headers: {
@@ -452,6 +468,85 @@
                     throw new Error('Failed to apply configuration');
                 }
                 return response.json();
+            }).then(job => waitForJob(job.status_url))
+              .finally(() => {
+                  nextBtn.disabled = false;
+              });
+        }
+        
+        function waitForJob(statusUrl) {
+            // The apply runs in the background; poll its status until it
+            // finishes. Networking restarts may drop a few requests, so
+            // transient failures are retried.
+            const pollInterval = 1000;
+            const maxFailures = 30;
+            let failures = 0;
+            
+            return new Promise((resolve, reject) => {
+                function poll() {
+                    fetch(statusUrl, { cache: 'no-store' })
+                        .then(response => {
+                            if (!response.ok) {
+                                throw new Error('Failed to get apply status');
+                            }
+                            return response.json();
+                        })
+                        .then(job => {
+                            failures = 0;
+                            renderJobProgress(job);
+                            if (job.status === 'succeeded') {
+                                resolve(job);
+                            } else if (job.status === 'failed') {
+                                reject(new Error(job.error || 'Apply failed'));
+                            } else {
+                                setTimeout(poll, pollInterval);
+                            }
+                        })
+                        .catch(error => {
+                            if (++failures >= maxFailures) {
+                                reject(error);
+                            } else {
+                                setTimeout(poll, pollInterval);
+                            }
+                        });
+                }
+                poll();
             });
         }
+        
+        function renderJobProgress(job) {
+            const progress = document.getElementById('apply-progress');
+            const list = document.getElementById('apply-steps');
+            progress.classList.remove('hidden');
+            
+            if (job.status === 'queued') {
+                list.innerHTML = '<li><i class="fas fa-clock"></i> Waiting for a previous apply to finish...</li>';
+                return;
+            }
+            
+            const icons = {
+                running: 'fas fa-spinner fa-spin',
+                succeeded: 'fas fa-check',
+                failed: 'fas fa-times'
+            };
+            // Step names and details come from the server, and details can
+            // quote command output, so they are set as text, never as HTML
+            list.replaceChildren(...job.steps.map(step => {
+                const item = document.createElement('li');
+                if (step.status === 'failed') {
+                    item.className = 'step-failed';
+                }
+                const icon = document.createElement('i');
+                icon.className = icons[step.status] || '';
+                let text = ` ${step.name}`;
+                if (step.duration_ms !== null) {
+                    text += ` (${Math.round(step.duration_ms)} ms)`;
+                }
+                if (step.detail) {
+                    text += `: ${step.detail}`;
+                }
+                item.append(icon, text);
+                return item;
+            }));
+        }
     });
\ No newline at end of file
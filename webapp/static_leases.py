@@ -0,0 +1,197 @@
+# static_leases.py
+
+import bisect
+import csv
+import io
+import ipaddress
+import re
+
+from sqlalchemy import delete, insert, select
+
+from database import DhcpStaticLease, NetworkInterface
+from network_config import NetworkConfigError, lan_address
+
+MAC_RE = re.compile(r'^[0-9a-f]{12}$')
+HOSTNAME_RE = re.compile(r'^[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?$')
+
+# Rows per IN (...) query when checking an import against the database
+QUERY_CHUNK = 500
+
+
+class LeaseImportError(ValueError):
+    """Raised when an import is rejected; errors lists [{row, error}]"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid leases")
+        self.errors = errors
+
+
+def normalize_mac(value):
+    """Return a MAC as aa:bb:cc:dd:ee:ff, or None if it is not one
+
+    Accepts colon, dash, dot (Cisco) or no separators, in any case.
+    """
+    digits = re.sub(r'[:\-.]', '', str(value or '').strip().lower())
+    if not MAC_RE.match(digits):
+        return None
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+class SubnetIndex:
+    """LAN subnets as sorted address intervals
+
+    find() locates the LAN containing an address with a binary search, so
+    validating n leases against m subnets costs O(n log m).
+    """
+
+    def __init__(self, lans):
+        # (first address, last address, name, router address)
+        self._intervals = sorted(
+            (int(address.network.network_address), int(address.network.broadcast_address),
+             name, int(address.ip))
+            for name, address in lans
+        )
+        self._starts = [interval[0] for interval in self._intervals]
+
+    def find(self, ip):
+        """Return (first, last, name, router) for the subnet holding ip, or None"""
+        i = bisect.bisect_right(self._starts, ip) - 1
+        if i >= 0 and ip <= self._intervals[i][1]:
+            return self._intervals[i]
+        return None
+
+
+def lan_index(session):
+    """Build a SubnetIndex of the configured LANs"""
+    lans = []
+    for iface in session.query(NetworkInterface).filter_by(is_wan=False):
+        try:
+            lans.append((iface.name, lan_address(iface)))
+        except NetworkConfigError as e:
+            print(f"Skipping {iface.name} for lease validation: {e}")
+    return SubnetIndex(lans)
+
+
+def parse_csv(text):
+    """Parse mac,ip[,hostname] rows; a header row is optional"""
+    rows = []
+    reader = csv.reader(io.StringIO(text))
+    for record in reader:
+        if not record or not any(field.strip() for field in record):
+            continue
+        if not rows and record[0].strip().lower() == 'mac':
+            continue
+        fields = [field.strip() for field in record] + ['', '', '']
+        rows.append({'mac': fields[0], 'ip': fields[1], 'hostname': fields[2]})
+    return rows
+
+
+def _existing(session, column, values):
+    """Return the subset of values already present in a unique column"""
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), QUERY_CHUNK):
+        chunk = values[start:start + QUERY_CHUNK]
+        found.update(session.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def validate(session, rows, replace=False):
+    """Validate lease rows and return them ready for insertion
+
+    Duplicates within the import are caught with dictionaries, clashes with
+    stored leases through the unique mac and ip_int indexes (unless replace
+    is set, in which case the stored leases are about to go), and each
+    address is located in its LAN with SubnetIndex. Raises
+    LeaseImportError listing every invalid row.
+    """
+    subnets = lan_index(session)
+    leases = []
+    errors = []
+    seen_macs = {}
+    seen_ips = {}
+
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'error': "Expected an object with mac and ip"})
+            continue
+
+        mac = normalize_mac(row.get('mac'))
+        if mac is None:
+            errors.append({'row': number, 'error': f"Invalid MAC address {row.get('mac')!r}"})
+            continue
+
+        try:
+            ip = int(ipaddress.IPv4Address(str(row.get('ip', '')).strip()))
+        except ValueError:
+            errors.append({'row': number, 'error': f"Invalid IPv4 address {row.get('ip')!r}"})
+            continue
+
+        subnet = subnets.find(ip)
+        if subnet is None:
+            errors.append({'row': number, 'error': f"{row['ip']} is not in any LAN subnet"})
+            continue
+        first, last, name, router = subnet
+        if ip in (first, last, router):
+            errors.append({'row': number, 'error': f"{row['ip']} is reserved on {name}"})
+            continue
+
+        hostname = row.get('hostname')
+        if hostname is not None and not isinstance(hostname, str):
+            errors.append({'row': number, 'error': f"Invalid hostname {hostname!r}"})
+            continue
+        hostname = (hostname or '').strip() or None
+        if hostname is not None and not HOSTNAME_RE.match(hostname):
+            errors.append({'row': number, 'error': f"Invalid hostname {hostname!r}"})
+            continue
+
+        if mac in seen_macs:
+            errors.append({'row': number, 'error': f"MAC {mac} already used in row {seen_macs[mac]}"})
+            continue
+        if ip in seen_ips:
+            errors.append({'row': number, 'error': f"Address {row['ip']} already used in row {seen_ips[ip]}"})
+            continue
+        seen_macs[mac] = number
+        seen_ips[ip] = number
+
+        leases.append({'mac': mac, 'ip': str(ipaddress.IPv4Address(ip)), 'ip_int': ip, 'hostname': hostname})
+
+    if not replace and leases:
+        taken_macs = _existing(session, DhcpStaticLease.mac, seen_macs)
+        taken_ips = _existing(session, DhcpStaticLease.ip_int, seen_ips)
+        for lease in leases:
+            if lease['mac'] in taken_macs:
+                errors.append({'row': seen_macs[lease['mac']], 'error': f"MAC {lease['mac']} already has a lease"})
+            elif lease['ip_int'] in taken_ips:
+                errors.append({'row': seen_ips[lease['ip_int']], 'error': f"Address {lease['ip']} is already reserved"})
+
+    if errors:
+        raise LeaseImportError(sorted(errors, key=lambda error: error['row']))
+    return leases
+
+
+def import_leases(session, rows, replace=False):
+    """Validate and store leases in one transaction; all or nothing
+
+    With replace, the stored leases are replaced by the imported ones.
+    Returns the number of leases stored.
+    """
+    try:
+        leases = validate(session, rows, replace=replace)
+        if replace:
+            session.execute(delete(DhcpStaticLease))
+        if leases:
+            session.execute(insert(DhcpStaticLease), leases)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return len(leases)
+
+
+def lease_rows(session):
+    """Return every lease as a (mac, ip, hostname) tuple, ordered by address"""
+    return session.execute(
+        select(DhcpStaticLease.mac, DhcpStaticLease.ip, DhcpStaticLease.hostname)
+        .order_by(DhcpStaticLease.ip_int)
+    ).all()
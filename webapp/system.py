@@ -0,0 +1,56 @@
+# system.py
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+
+class CommandError(RuntimeError):
+    """Raised when a system command cannot be run or fails"""
+
+
+def run(cmd, input=None):
+    """Run a command and return its stdout, raising CommandError on failure"""
+    try:
+        result = subprocess.run(cmd, input=input, capture_output=True, text=True, check=True)
+    except OSError as e:
+        raise CommandError(f"Could not run {cmd[0]}: {e}") from e
+    except subprocess.CalledProcessError as e:
+        raise CommandError(f"{cmd[0]} failed: {e.stderr.strip()}") from e
+    return result.stdout
+
+
+def ensure_installed(binary, packages):
+    """Install packages with apk, but only if binary is not already present"""
+    if shutil.which(binary):
+        return
+    print(f"{binary} not found, installing {' '.join(packages)}")
+    run(['apk', 'add', *packages])
+
+
+def write_file(path, content):
+    """Write a file atomically, skipping the write if it is unchanged
+
+    Each writer gets its own temporary file, so concurrent writers never
+    interleave; the last rename wins. Returns True if the file was written.
+    """
+    try:
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
@@ -0,0 +1,75 @@
+# test_conntrack.py
+
+import pytest
+
+from conntrack import TopK, aggregate
+
+ENTRIES = [
+    'ipv4     2 tcp      6 431999 ESTABLISHED src=192.168.1.10 dst=1.1.1.1 sport=50000 dport=443 '
+    'packets=10 bytes=5000 src=1.1.1.1 dst=203.0.113.2 sport=443 dport=50000 packets=20 bytes=90000 '
+    '[ASSURED] mark=0 use=1',
+    'ipv4     2 udp      17 29 src=192.168.1.11 dst=8.8.8.8 sport=40000 dport=53 '
+    'packets=1 bytes=60 src=8.8.8.8 dst=203.0.113.2 sport=53 dport=40000 packets=1 bytes=120 mark=0 use=1',
+    'ipv4     2 tcp      6 100 TIME_WAIT src=192.168.1.11 dst=9.9.9.9 sport=50001 dport=80 '
+    'packets=3 bytes=300 src=9.9.9.9 dst=203.0.113.2 sport=80 dport=50001 packets=3 bytes=700 mark=0 use=1',
+    'ipv4     2 icmp     1 29 src=192.168.1.12 dst=1.1.1.1 type=8 code=0 id=1 '
+    'packets=1 bytes=84 src=1.1.1.1 dst=203.0.113.2 type=0 code=0 id=1 packets=1 bytes=84 mark=0 use=1',
+    'garbage line',
+]
+
+
+def write_table(tmp_path, lines):
+    path = tmp_path / 'nf_conntrack'
+    path.write_text(''.join(line + '\n' for line in lines))
+    return str(path)
+
+
+def test_aggregate_sums_both_directions(tmp_path):
+    result = aggregate(write_table(tmp_path, ENTRIES), k=10)
+    flows = result['all']['flows']
+    assert flows[0] == {'src_ip': '192.168.1.10', 'dst_ip': '1.1.1.1', 'protocol': 'TCP',
+                        'dst_port': 443, 'bytes': 95000, 'packets': 30}
+    assert [flow['bytes'] for flow in flows] == [95000, 1000, 180, 168]
+    assert flows[-1]['dst_port'] is None
+
+
+def test_aggregate_filters_by_protocol(tmp_path):
+    result = aggregate(write_table(tmp_path, ENTRIES), k=10)
+    assert [flow['dst_ip'] for flow in result['tcp']['flows']] == ['1.1.1.1', '9.9.9.9']
+    assert [flow['dst_ip'] for flow in result['udp']['flows']] == ['8.8.8.8']
+    assert result['udp']['clients'] == [{'ip': '192.168.1.11', 'bytes': 180, 'packets': 2}]
+
+
+def test_aggregate_keeps_top_k(tmp_path):
+    lines = [
+        f'ipv4 2 tcp 6 100 ESTABLISHED src=10.0.0.{i} dst=1.1.1.1 sport=1 dport=443 packets=1 bytes={i * 100}'
+        for i in range(1, 51)
+    ]
+    result = aggregate(write_table(tmp_path, lines), k=5)
+    assert [flow['bytes'] for flow in result['all']['flows']] == [5000, 4900, 4800, 4700, 4600]
+    assert [client['ip'] for client in result['all']['clients']] == [f'10.0.0.{i}' for i in range(50, 45, -1)]
+
+
+def test_aggregate_without_conntrack(tmp_path):
+    result = aggregate(str(tmp_path / 'missing'))
+    assert result['all'] == {'flows': [], 'clients': []}
+
+
+def test_topk_accumulates_repeated_keys():
+    top = TopK(2)
+    for key, bytes_ in [('a', 10), ('b', 5), ('a', 10), ('c', 1), ('b', 20)]:
+        top.add(key, bytes_, 1)
+    assert top.top() == [('b', 25, 2), ('a', 20, 2)]
+
+
+@pytest.mark.parametrize('error', [PermissionError(13, 'Permission denied'), OSError(5, 'I/O error')])
+def test_aggregate_unreadable_table(tmp_path, monkeypatch, error):
+    path = write_table(tmp_path, ENTRIES)
+
+    def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr('builtins.open', fail)
+    result = aggregate(path)
+    assert result['all'] == {'flows': [], 'clients': []}
+    assert result['tcp'] == {'flows': [], 'clients': []}
@@ -0,0 +1,39 @@
+# test_discovery.py
+
+import sys
+
+import pytest
+
+from discovery import BackendClient, DiscoveryError
+
+# Answers every request after printing a line that is not JSON
+DAEMON = '''\
+import json, sys
+for line in sys.stdin:
+    print('not json', flush=True)
+    print('[1, 2]', flush=True)
+    print(json.dumps({"type": "pong"}), flush=True)
+'''
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    path = tmp_path / 'hardware_discovery'
+    path.write_text(f'#!{sys.executable}\n{DAEMON}')
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_malformed_lines_are_skipped(daemon):
+    client = BackendClient(daemon, timeout=5)
+    try:
+        assert client.request({'cmd': 'ping'}) == {'type': 'pong'}
+        assert client.request({'cmd': 'ping'}) == {'type': 'pong'}
+    finally:
+        client._stop()
+
+
+def test_missing_daemon_raises(tmp_path):
+    client = BackendClient(str(tmp_path / 'missing'))
+    with pytest.raises(DiscoveryError):
+        client.request({'cmd': 'ping'})
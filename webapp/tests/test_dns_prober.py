@@ -0,0 +1,85 @@
+# test_dns_prober.py
+
+import pytest
+
+import dnsmasq
+from dns_prober import MIN_SAMPLES, DnsProber
+
+SERVERS = ['1.1.1.1', '8.8.8.8', '9.9.9.9']
+
+
+def make_prober(mode, latencies_ms, monkeypatch):
+    """A prober whose probes return fixed latencies; None means a timeout"""
+    prober = DnsProber(interval=60, timeout=1, names=['example.com'], window=100, mode=mode)
+
+    def probe(server):
+        latency = latencies_ms[server]
+        return [('timeout', None) if latency is None else ('ok', latency / 1000)]
+
+    monkeypatch.setattr(prober, 'probe', probe)
+    return prober
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    calls = []
+    monkeypatch.setattr(dnsmasq, 'apply_servers', lambda servers: calls.append(list(servers)))
+    return calls
+
+
+def run_rounds(prober, rounds=MIN_SAMPLES):
+    for _ in range(rounds):
+        prober.probe_round(SERVERS)
+
+
+def test_select_waits_for_samples(monkeypatch, applied):
+    prober = make_prober('reorder', {'1.1.1.1': 30, '8.8.8.8': 10, '9.9.9.9': 20}, monkeypatch)
+    run_rounds(prober, MIN_SAMPLES - 1)
+    assert prober.select(SERVERS) == SERVERS
+    assert applied == []
+
+
+def test_reorder_applies_once_per_leader(monkeypatch, applied):
+    latencies = {'1.1.1.1': 30, '8.8.8.8': 10, '9.9.9.9': 20}
+    prober = make_prober('reorder', latencies, monkeypatch)
+    run_rounds(prober)
+    run_rounds(prober, 5)
+    assert applied == [['8.8.8.8', '9.9.9.9', '1.1.1.1']]
+
+
+def test_select_is_pure(monkeypatch, applied):
+    prober = make_prober('reorder', {'1.1.1.1': 30, '8.8.8.8': 10, '9.9.9.9': 11}, monkeypatch)
+    run_rounds(prober)
+    prober._leader = '9.9.9.9'
+    assert prober.select(SERVERS)[0] == '9.9.9.9'
+    assert prober.select(['1.1.1.1', '8.8.8.8']) == ['8.8.8.8', '1.1.1.1']
+    assert prober._leader == '9.9.9.9'
+
+
+def test_leader_keeps_place_within_margin(monkeypatch, applied):
+    latencies = {'1.1.1.1': 30, '8.8.8.8': 10, '9.9.9.9': 20}
+    prober = make_prober('reorder', latencies, monkeypatch)
+    run_rounds(prober)
+    latencies['9.9.9.9'] = 9
+    run_rounds(prober, 100)
+    assert prober.select(SERVERS)[0] == '8.8.8.8'
+    assert len(applied) == 1
+
+
+def test_prune_drops_failing_and_slow_servers(monkeypatch, applied):
+    prober = make_prober('prune', {'1.1.1.1': 100, '8.8.8.8': 10, '9.9.9.9': None}, monkeypatch)
+    run_rounds(prober)
+    assert prober.select(SERVERS) == ['8.8.8.8']
+
+
+def test_prune_keeps_everything_when_all_fail(monkeypatch, applied):
+    prober = make_prober('prune', dict.fromkeys(SERVERS), monkeypatch)
+    run_rounds(prober)
+    assert sorted(prober.select(SERVERS)) == sorted(SERVERS)
+
+
+def test_off_never_applies(monkeypatch, applied):
+    prober = make_prober('off', {'1.1.1.1': 30, '8.8.8.8': 10, '9.9.9.9': 20}, monkeypatch)
+    run_rounds(prober)
+    assert prober.select(SERVERS) == SERVERS
+    assert applied == []
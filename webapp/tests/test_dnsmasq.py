@@ -0,0 +1,136 @@
+# test_dnsmasq.py
+
+import ipaddress
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+
+import pytest
+
+import dnsmasq
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    conf = tmp_path / 'alpine-router.conf'
+    conf.write_text('')
+    monkeypatch.setattr(dnsmasq, 'DNSMASQ_CONF', str(conf))
+    monkeypatch.setattr(dnsmasq, 'DHCP_HOSTS_FILE', str(tmp_path / 'dhcp-hosts'))
+    monkeypatch.setattr(dnsmasq, 'DNSMASQ_RELOAD_DELAY', 0.05)
+    reloaded = []
+    done = threading.Event()
+    monkeypatch.setattr(dnsmasq, 'reload', lambda: (reloaded.append(1), done.set()))
+    return reloaded, done
+
+
+NAS = ('aa:bb:cc:dd:ee:01', '192.168.1.10', 'nas')
+PRINTER = ('aa:bb:cc:dd:ee:02', '192.168.1.11', None)
+
+
+def test_added_hosts_need_no_reload(files):
+    reloaded, done = files
+    assert dnsmasq.apply_hosts([NAS])
+    assert dnsmasq.apply_hosts([NAS, PRINTER])
+    assert not done.wait(0.2)
+    assert reloaded == []
+
+
+def test_dropped_hosts_share_one_reload(files):
+    reloaded, done = files
+    assert dnsmasq.apply_hosts([NAS, PRINTER])
+    assert dnsmasq.apply_hosts([PRINTER])
+    assert dnsmasq.apply_hosts([('aa:bb:cc:dd:ee:02', '192.168.1.12', None)])
+    assert done.wait(2)
+    assert reloaded == [1]
+
+
+def test_apply_hosts_skips_unchanged_file(files):
+    reloaded, _ = files
+    assert dnsmasq.apply_hosts([NAS])
+    assert not dnsmasq.apply_hosts([NAS])
+
+
+@pytest.mark.parametrize('old, new, dropped', [
+    (None, [NAS], False),
+    ([NAS], [NAS, PRINTER], False),
+    ([NAS, PRINTER], [NAS], True),
+    ([NAS], [('aa:bb:cc:dd:ee:01', '192.168.1.10', 'files')], True),
+])
+def test_hosts_dropped(old, new, dropped):
+    old = None if old is None else dnsmasq.render_hosts(old)
+    assert dnsmasq.hosts_dropped(old, dnsmasq.render_hosts(new)) is dropped
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """Record restarts and signals; returns (pidfile, restarts, signals)"""
+    pidfile = tmp_path / 'dnsmasq.pid'
+    monkeypatch.setattr(dnsmasq, 'DNSMASQ_PIDFILE', str(pidfile))
+    restarts, signals = [], []
+    monkeypatch.setattr(dnsmasq, 'restart', lambda: restarts.append(1))
+    monkeypatch.setattr(dnsmasq.os, 'kill', lambda pid, sig: signals.append((pid, sig)))
+    return pidfile, restarts, signals
+
+
+def test_reload_ignores_stale_pidfile(service):
+    pidfile, restarts, signals = service
+    # This test's own process, which is not dnsmasq
+    pidfile.write_text(f'{os.getpid()}\n')
+    dnsmasq.reload()
+    assert signals == []
+    assert restarts == [1]
+
+
+def test_reload_signals_dnsmasq(service, tmp_path):
+    pidfile, restarts, signals = service
+    binary = tmp_path / 'dnsmasq'
+    binary.symlink_to(shutil.which('sleep'))
+    # os.kill is patched out, so let it exit by itself
+    process = subprocess.Popen([str(binary), '0.5'])
+    try:
+        # Wait for the exec, before which comm is still the parent's
+        deadline = time.monotonic() + 2
+        while open(f'/proc/{process.pid}/comm').read().strip() != 'dnsmasq' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pidfile.write_text(f'{process.pid}\n')
+        dnsmasq.reload()
+    finally:
+        process.wait()
+    assert signals == [(process.pid, signal.SIGHUP)]
+    assert restarts == []
+
+
+def test_config_uses_hosts_dir():
+    config = dnsmasq.render_config(
+        [('eth1', ipaddress.IPv4Interface('192.168.1.1/24'), True)], {
+            'cache_size': 150, 'negative_cache': True, 'min_cache_ttl': 0,
+            'max_cache_ttl': 0, 'upstream_policy': 'default'})
+    assert f'dhcp-hostsdir={dnsmasq.DHCP_HOSTS_DIR}\n' in config
+    assert 'dhcp-hostsfile' not in config
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('192.168.1.1/24', ('192.168.1.100', '192.168.1.200')),
+    ('192.168.1.150/24', ('192.168.1.100', '192.168.1.149')),
+    ('192.168.1.120/24', ('192.168.1.121', '192.168.1.200')),
+    ('10.0.0.1/16', ('10.0.100.0', '10.0.200.0')),
+    ('10.0.0.1/30', ('10.0.0.2', '10.0.0.2')),
+    ('10.0.0.2/30', ('10.0.0.1', '10.0.0.1')),
+    ('10.0.0.0/31', None),
+    ('10.0.0.1/32', None),
+])
+def test_dhcp_range(address, expected):
+    pool = dnsmasq.dhcp_range(ipaddress.IPv4Interface(address))
+    assert pool == (expected and tuple(ipaddress.IPv4Address(ip) for ip in expected))
+
+
+@pytest.mark.parametrize('prefix', [24, 28, 29, 30])
+def test_dhcp_range_never_contains_router(prefix):
+    network = ipaddress.IPv4Network(f"192.168.1.0/{prefix}")
+    for router in network.hosts():
+        first, last = dnsmasq.dhcp_range(ipaddress.IPv4Interface(f"{router}/{prefix}"))
+        assert network.network_address < first <= last < network.broadcast_address
+        assert not first <= router <= last
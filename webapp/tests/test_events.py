@@ -0,0 +1,45 @@
+# test_events.py
+
+from events import diff_snapshot
+
+SNAPSHOT = {
+    'interfaces': [
+        {'name': 'eth0', 'status': 'UP', 'ips': ['203.0.113.2/24'], 'label': 'WAN'},
+        {'name': 'eth1', 'status': 'UP', 'ips': ['192.168.1.1/24'], 'label': 'LAN'},
+    ],
+    'hardware_info': {
+        'cpu': {'cores': 4, 'usage_percent': 10.0},
+        'memory': {'total': 1024, 'percent': 50.0},
+    },
+}
+
+
+def test_identical_snapshots_have_no_patch():
+    assert diff_snapshot(SNAPSHOT, SNAPSHOT) is None
+
+
+def test_patch_has_only_changed_fields():
+    new = {
+        'interfaces': [
+            {'name': 'eth0', 'status': 'DOWN', 'ips': [], 'label': 'WAN'},
+            {'name': 'eth2', 'status': 'UP', 'ips': [], 'label': None},
+        ],
+        'hardware_info': {
+            'cpu': {'cores': 4, 'usage_percent': 12.5},
+            'memory': {'total': 1024, 'percent': 50.0},
+        },
+    }
+    assert diff_snapshot(SNAPSHOT, new) == {
+        'interfaces': {
+            'eth0': {'status': 'DOWN', 'ips': []},
+            'eth2': {'name': 'eth2', 'status': 'UP', 'ips': [], 'label': None},
+        },
+        'removed': ['eth1'],
+        'hardware_info': {'cpu': {'usage_percent': 12.5}},
+    }
+
+
+def test_first_snapshot_is_a_full_patch():
+    patch = diff_snapshot({}, SNAPSHOT)
+    assert set(patch['interfaces']) == {'eth0', 'eth1'}
+    assert patch['hardware_info'] == SNAPSHOT['hardware_info']
@@ -0,0 +1,188 @@
+# test_firewall.py
+
+import json
+
+import pytest
+
+import firewall
+from firewall import (IPTABLES_RESET, collapse_subnets, compile_changes, compile_iptables,
+                      compile_nft_changes, diff_nft_elements, diff_rulesets, nft_elements,
+                      parse_ruleset)
+
+LANS = [('eth1', '192.168.1.0/24'), ('eth2', '10.0.0.0/16')]
+
+
+def test_unchanged_ruleset_has_no_changes():
+    desired = parse_ruleset(compile_iptables('eth0', LANS))
+    assert diff_rulesets(desired, desired) == []
+    assert compile_changes([], desired) == ''
+
+
+def test_new_lan_only_rewrites_its_chains():
+    live = parse_ruleset(compile_iptables('eth0', LANS[:1]))
+    desired = parse_ruleset(compile_iptables('eth0', LANS))
+    changes = diff_rulesets(live, desired)
+    assert {(change['table'], change['chain']) for change in changes} == {
+        ('filter', 'INPUT'), ('filter', 'FORWARD'), ('nat', 'POSTROUTING')}
+    assert all(change['action'] == 'update' and change['policy'] is None for change in changes)
+
+    script = compile_changes(changes, desired)
+    assert '-F OUTPUT' not in script
+    assert '-A POSTROUTING -s 10.0.0.0/16 -o eth0 -j MASQUERADE' in script
+
+
+def test_policy_change_and_stale_user_chain():
+    live = parse_ruleset('*filter\n:INPUT ACCEPT [0:0]\n:FORWARD DROP [0:0]\n:OUTPUT ACCEPT [0:0]\n'
+                         ':stale - [0:0]\n-A stale -j DROP\nCOMMIT\n')
+    desired = parse_ruleset(compile_iptables('eth0', LANS))
+    changes = {change['chain']: change for change in diff_rulesets(live, desired) if change['table'] == 'filter'}
+    assert changes['INPUT']['policy'] == 'DROP'
+    assert changes['stale']['action'] == 'delete'
+
+    script = compile_changes(list(changes.values()), {'filter': desired['filter']})
+    assert ':INPUT DROP [0:0]' in script
+    assert '-X stale' in script
+
+
+@pytest.mark.parametrize('subnets, expected', [
+    (['192.168.0.0/24', '192.168.1.0/24'], ['192.168.0.0/23']),
+    (['10.0.0.0/16', '10.0.5.0/24'], ['10.0.0.0/16']),
+    (['10.0.0.1', '192.168.1.0-192.168.1.255'], ['10.0.0.1/32', '192.168.1.0/24']),
+])
+def test_collapse_subnets(subnets, expected):
+    assert collapse_subnets(subnets) == expected
+
+
+def test_overlapping_lans_converge():
+    lans = [('eth1', '192.168.0.0/24'), ('eth2', '192.168.1.0/24'), ('eth3', '192.168.0.0/24')]
+    desired = nft_elements('eth0', lans)
+    assert desired['lan_subnets'] == ['192.168.0.0/23']
+
+    # nft lists the merged interval as one prefix; read back it diffs clean
+    live = dict(desired, lan_subnets=collapse_subnets(['192.168.0.0/23']))
+    assert diff_nft_elements(live, desired) == []
+
+
+def test_nft_changes_delete_before_add():
+    live = nft_elements('eth0', LANS[:1])
+    desired = nft_elements('eth0', [('eth3', '192.168.1.0/24')])
+    script = compile_nft_changes(diff_nft_elements(live, desired))
+    lines = script.splitlines()
+    assert lines[0].startswith('delete element inet alpine_router input_zones')
+    assert any(line.startswith('add element inet alpine_router forward_zones') for line in lines)
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    """Record firewall commands; outputs maps a command prefix to its output or error"""
+    calls = []
+    outputs = {}
+
+    def run(cmd, input=None):
+        calls.append((cmd, input))
+        for prefix, output in outputs.items():
+            if tuple(cmd[:len(prefix)]) == prefix:
+                if isinstance(output, Exception):
+                    raise output
+                return output
+        return ''
+
+    monkeypatch.setattr(firewall, '_run', run)
+    return calls, outputs
+
+
+def test_switching_to_nftables_resets_iptables(commands, tmp_path, monkeypatch):
+    calls, outputs = commands
+    saved = tmp_path / 'rules.v4'
+    saved.write_text('')
+    monkeypatch.setattr(firewall, 'RULES_PATH', str(saved))
+    outputs[('iptables-save',)] = compile_iptables('eth0', LANS)
+
+    changes = firewall._clear_iptables(dry_run=False)
+    assert changes
+    assert (['iptables-restore'], IPTABLES_RESET) in calls
+    assert not saved.exists()
+
+
+def test_nothing_to_clear_without_iptables(commands):
+    calls, outputs = commands
+    outputs[('iptables-save',)] = firewall.FirewallError('not installed')
+    assert firewall._clear_iptables(dry_run=True) == []
+    assert [cmd for cmd, _ in calls] == [['iptables-save']]
+
+
+def test_switching_to_iptables_deletes_nft_table(commands, tmp_path, monkeypatch):
+    calls, _ = commands
+    monkeypatch.setattr(firewall, 'NFT_RULES_PATH', str(tmp_path / 'missing.nft'))
+    assert firewall._clear_nftables(dry_run=False)[0]['action'] == 'delete'
+    assert calls[-1][0] == ['nft', 'delete', 'table', 'inet', 'alpine_router']
+
+
+def nft_json(wan, lans, layout=None, comment=None):
+    """What nft -j list table prints for a table built for wan and lans"""
+    table = {'family': 'inet', 'name': 'alpine_router', 'handle': 1}
+    if comment is not None:
+        table['comment'] = comment
+
+    def prefix(subnet):
+        addr, length = subnet.split('/')
+        return {'prefix': {'addr': addr, 'len': int(length)}}
+
+    def service(protocol, port):
+        first, _, last = port.partition(':')
+        return {'concat': [protocol, {'range': [int(first), int(last)]} if last else int(first)]}
+
+    sets = {
+        'layout': ('mark', [firewall.NFT_LAYOUT if layout is None else layout]),
+        'wan_ifaces': ('ifname', [wan]),
+        'lan_subnets': ('ipv4_addr', [prefix(subnet) for _, subnet in lans]),
+        'lan_services': (['inet_proto', 'inet_service'],
+                         [service(protocol, port) for protocol, port in firewall.LAN_SERVICES]),
+    }
+    maps = {
+        'input_zones': ('ifname', [['lo', {'accept': None}]]
+                        + [[lan, {'jump': {'target': 'lan_input'}}] for lan, _ in lans]),
+        'forward_zones': (['ifname', 'ifname'],
+                          [[{'concat': [lan, wan]}, {'accept': None}] for lan, _ in lans]),
+    }
+    items = [{'table': table}]
+    items += [{'set': {'family': 'inet', 'table': 'alpine_router', 'name': name, 'type': key_type, 'elem': elem}}
+              for name, (key_type, elem) in sets.items()]
+    items += [{'map': {'family': 'inet', 'table': 'alpine_router', 'name': name, 'type': key_type,
+                       'map': 'verdict', 'elem': elem}}
+              for name, (key_type, elem) in maps.items()]
+    return json.dumps({'nftables': items})
+
+
+def test_table_without_comment_is_diffed(commands):
+    _, outputs = commands
+    outputs[('nft', '-j', 'list')] = nft_json('eth0', LANS)
+    live = firewall.read_nft_elements()
+    assert live is not None
+    assert diff_nft_elements(live, nft_elements('eth0', LANS)) == []
+
+    changes = diff_nft_elements(live, nft_elements('eth0', LANS[:1]))
+    assert {change['set'] for change in changes} == {'lan_subnets', 'input_zones', 'forward_zones'}
+
+
+def test_stale_layout_replaces_table(commands):
+    _, outputs = commands
+    outputs[('nft', '-j', 'list')] = nft_json('eth0', LANS, layout=firewall.NFT_LAYOUT ^ 1,
+                                              comment=f'alpine-router {firewall.NFT_LAYOUT}')
+    assert firewall.read_nft_elements() is None
+
+
+def test_table_without_layout_set_is_replaced(commands):
+    _, outputs = commands
+    tables = json.loads(nft_json('eth0', LANS))
+    tables['nftables'] = [item for item in tables['nftables'] if item.get('set', {}).get('name') != 'layout']
+    outputs[('nft', '-j', 'list')] = json.dumps(tables)
+    assert firewall.read_nft_elements() is None
+
+
+def test_apply_patches_current_table(commands):
+    calls, outputs = commands
+    outputs[('nft', '-j', 'list')] = nft_json('eth0', LANS[:1])
+    _, _, changes = firewall._apply_nftables('eth0', LANS, dry_run=True)
+    assert all(change['action'] == 'update' for change in changes)
+    assert not any(cmd[:2] == ['nft', '-f'] for cmd, _ in calls)
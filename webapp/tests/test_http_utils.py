@@ -0,0 +1,39 @@
+# test_http_utils.py
+
+import pytest
+from flask import Flask
+
+from http_utils import conditional_jsonify, payload_etag
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+
+    @app.route('/data')
+    def data():
+        return conditional_jsonify({'b': [1, 2], 'a': 'x'})
+
+    return app.test_client()
+
+
+def test_payload_etag_ignores_key_order():
+    assert payload_etag({'a': 1, 'b': 2}) == payload_etag({'b': 2, 'a': 1})
+    assert payload_etag({'a': 1}) != payload_etag({'a': 2})
+
+
+def test_response_carries_payload_etag(client):
+    response = client.get('/data')
+    assert response.status_code == 200
+    assert response.get_json() == {'a': 'x', 'b': [1, 2]}
+    assert response.headers['ETag'] == f'"{payload_etag({"a": "x", "b": [1, 2]})}"'
+    assert 'no-cache' in response.headers['Cache-Control']
+
+
+def test_matching_if_none_match_gets_304(client):
+    etag = client.get('/data').headers['ETag']
+    response = client.get('/data', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    assert client.get('/data', headers={'If-None-Match': '"stale"'}).status_code == 200
@@ -0,0 +1,103 @@
+# test_lease_watcher.py
+
+import os
+import time
+
+import pytest
+
+import lease_watcher
+from lease_watcher import LeaseWatcher, parse_leases
+
+LEASES = """\
+1700000000 AA:BB:CC:DD:EE:02 192.168.1.20 laptop 01:aa:bb:cc:dd:ee:02
+0 aa:bb:cc:dd:ee:01 192.168.1.10 nas *
+1700000500 aa:bb:cc:dd:ee:03 192.168.1.5 * *
+1700000900 aa:bb:cc:dd:ee:04 192.168.1.30 Laptop *
+duid 00:01:00:01:2c:1f:aa:bb:cc:dd:ee:ff
+1700000000 1234 fd00::5 phone 00:01
+garbage
+"""
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    path = tmp_path / 'dnsmasq.leases'
+    path.write_text(LEASES)
+    return LeaseWatcher(str(path))
+
+
+def test_parse_leases():
+    leases = parse_leases(LEASES)
+    assert [lease['ip'] for lease in leases] == ['192.168.1.5', '192.168.1.10', '192.168.1.20', '192.168.1.30']
+    assert leases[0]['hostname'] is None
+    assert leases[1]['expires'] is None
+    assert leases[2]['mac'] == 'aa:bb:cc:dd:ee:02'
+    assert leases[2]['expires'] == 1700000000
+
+
+def test_query_hides_private_fields(watcher):
+    lease = watcher.query(ip='192.168.1.10')['leases'][0]
+    assert lease == {'mac': 'aa:bb:cc:dd:ee:01', 'ip': '192.168.1.10', 'hostname': 'nas', 'expires': None}
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'mac': 'AA:BB:CC:DD:EE:02'}, ['192.168.1.20']),
+    ({'ip': '192.168.1.5'}, ['192.168.1.5']),
+    ({'hostname': 'LAPTOP'}, ['192.168.1.20', '192.168.1.30']),
+    ({'mac': 'aa:bb:cc:dd:ee:02', 'ip': '192.168.1.20'}, ['192.168.1.20']),
+    ({'mac': 'aa:bb:cc:dd:ee:02', 'ip': '192.168.1.10'}, []),
+    ({'ip': '192.168.1.30', 'hostname': 'laptop'}, ['192.168.1.30']),
+    ({'ip': '192.168.1.10', 'hostname': 'laptop'}, []),
+    ({'mac': 'aa:bb:cc:dd:ee:04', 'hostname': 'laptop', 'ip': '192.168.1.30'}, ['192.168.1.30']),
+    ({'hostname': 'laptop', 'search': '1.30'}, ['192.168.1.30']),
+    ({'search': 'ee:0'}, ['192.168.1.5', '192.168.1.10', '192.168.1.20', '192.168.1.30']),
+    ({'mac': 'ff:ff:ff:ff:ff:ff'}, []),
+])
+def test_query_filters_combine(watcher, filters, expected):
+    result = watcher.query(**filters)
+    assert [lease['ip'] for lease in result['leases']] == expected
+    assert result['total'] == len(expected)
+
+
+def test_query_pages(watcher):
+    first = watcher.query(per_page=3)
+    assert (first['total'], first['page'], len(first['leases'])) == (4, 1, 3)
+    assert [lease['ip'] for lease in watcher.query(page=2, per_page=3)['leases']] == ['192.168.1.30']
+    assert watcher.query(page=5, per_page=3)['leases'] == []
+    assert watcher.query(page=0, per_page=0)['per_page'] == 1
+    assert watcher.query(per_page=10 ** 6)['per_page'] == lease_watcher.MAX_PAGE_SIZE
+
+
+def test_refresh_rereads_a_changed_file(watcher):
+    assert watcher.query()['total'] == 4
+    with open(watcher.path, 'a') as f:
+        f.write('0 aa:bb:cc:dd:ee:05 192.168.1.40 tv *\n')
+    assert watcher.query(hostname='tv')['total'] == 1
+
+    os.remove(watcher.path)
+    assert watcher.query()['total'] == 0
+
+
+def test_refresh_skips_an_unchanged_file(watcher, monkeypatch):
+    watcher.refresh()
+    calls = []
+    monkeypatch.setattr(lease_watcher, 'parse_leases', lambda text: calls.append(text) or [])
+    watcher.refresh()
+    watcher.query()
+    assert calls == []
+
+
+def test_inotify_picks_up_changes(watcher):
+    if not watcher.start():
+        pytest.skip("inotify is not available")
+    assert watcher.query()['total'] == 4
+
+    # Replace the file the way a rewrite would, then wait for the event
+    tmp_path = watcher.path + '.new'
+    with open(tmp_path, 'w') as f:
+        f.write('0 aa:bb:cc:dd:ee:05 192.168.1.40 tv *\n')
+    os.replace(tmp_path, watcher.path)
+    deadline = time.monotonic() + 2
+    while watcher.query()['total'] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert watcher.query(hostname='tv')['total'] == 1
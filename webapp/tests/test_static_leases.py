@@ -0,0 +1,105 @@
+# test_static_leases.py
+
+import pytest
+
+from database import NetworkInterface
+from static_leases import (LeaseImportError, import_leases, lease_rows, normalize_mac,
+                           parse_csv, validate)
+
+
+@pytest.fixture
+def lans(session):
+    session.add_all([
+        NetworkInterface(name='eth0', is_wan=True),
+        NetworkInterface(name='eth1', static_ip='192.168.1.1', static_netmask='255.255.255.0'),
+        NetworkInterface(name='eth2', static_ip='10.0.0.1', static_netmask='255.255.0.0'),
+    ])
+    session.commit()
+    return session
+
+
+def errors_of(session, rows, replace=False):
+    with pytest.raises(LeaseImportError) as info:
+        validate(session, rows, replace=replace)
+    return info.value.errors
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('AA:BB:CC:DD:EE:FF', 'aa:bb:cc:dd:ee:ff'),
+    ('aa-bb-cc-dd-ee-ff', 'aa:bb:cc:dd:ee:ff'),
+    ('aabb.ccdd.eeff', 'aa:bb:cc:dd:ee:ff'),
+    ('aabbccddeeff', 'aa:bb:cc:dd:ee:ff'),
+    ('aa:bb:cc:dd:ee', None),
+    ('not a mac', None),
+    (None, None),
+])
+def test_normalize_mac(value, expected):
+    assert normalize_mac(value) == expected
+
+
+def test_parse_csv_skips_header_and_blank_lines():
+    rows = parse_csv("mac,ip,hostname\n\naa:bb:cc:dd:ee:01,192.168.1.10,nas\naa:bb:cc:dd:ee:02, 192.168.1.11\n")
+    assert rows == [
+        {'mac': 'aa:bb:cc:dd:ee:01', 'ip': '192.168.1.10', 'hostname': 'nas'},
+        {'mac': 'aa:bb:cc:dd:ee:02', 'ip': '192.168.1.11', 'hostname': ''},
+    ]
+
+
+def test_validate_accepts_leases_in_any_lan(lans):
+    leases = validate(lans, [
+        {'mac': 'AA-BB-CC-DD-EE-01', 'ip': '192.168.1.10', 'hostname': 'nas'},
+        {'mac': 'aa:bb:cc:dd:ee:02', 'ip': '10.0.200.5'},
+    ])
+    assert [(lease['mac'], lease['ip'], lease['hostname']) for lease in leases] == [
+        ('aa:bb:cc:dd:ee:01', '192.168.1.10', 'nas'),
+        ('aa:bb:cc:dd:ee:02', '10.0.200.5', None),
+    ]
+
+
+def test_validate_reports_every_bad_row(lans):
+    errors = errors_of(lans, [
+        'not an object',
+        {'mac': 'bogus', 'ip': '192.168.1.10'},
+        {'mac': 'aa:bb:cc:dd:ee:03', 'ip': '999.1.1.1'},
+        {'mac': 'aa:bb:cc:dd:ee:04', 'ip': '172.16.0.5'},
+        {'mac': 'aa:bb:cc:dd:ee:05', 'ip': '192.168.1.1'},
+        {'mac': 'aa:bb:cc:dd:ee:06', 'ip': '192.168.1.255'},
+        {'mac': 'aa:bb:cc:dd:ee:07', 'ip': '192.168.1.20', 'hostname': 'bad_name'},
+    ])
+    assert [error['row'] for error in errors] == [1, 2, 3, 4, 5, 6, 7]
+
+
+@pytest.mark.parametrize('hostname', [5, ['nas'], {'name': 'nas'}, True])
+def test_validate_rejects_non_string_hostname(lans, hostname):
+    errors = errors_of(lans, [
+        {'mac': 'aa:bb:cc:dd:ee:01', 'ip': '192.168.1.10'},
+        {'mac': 'aa:bb:cc:dd:ee:02', 'ip': '192.168.1.11', 'hostname': hostname},
+    ])
+    assert errors == [{'row': 2, 'error': f"Invalid hostname {hostname!r}"}]
+
+
+def test_validate_catches_duplicates_within_import(lans):
+    errors = errors_of(lans, [
+        {'mac': 'aa:bb:cc:dd:ee:01', 'ip': '192.168.1.10'},
+        {'mac': 'AA:BB:CC:DD:EE:01', 'ip': '192.168.1.11'},
+        {'mac': 'aa:bb:cc:dd:ee:02', 'ip': '192.168.1.10'},
+    ])
+    assert [error['row'] for error in errors] == [2, 3]
+
+
+def test_import_checks_stored_leases_unless_replacing(lans):
+    assert import_leases(lans, [{'mac': 'aa:bb:cc:dd:ee:01', 'ip': '192.168.1.10'}]) == 1
+
+    errors = errors_of(lans, [{'mac': 'aa:bb:cc:dd:ee:01', 'ip': '192.168.1.20'},
+                              {'mac': 'aa:bb:cc:dd:ee:02', 'ip': '192.168.1.10'}])
+    assert len(errors) == 2
+
+    assert import_leases(lans, [{'mac': 'aa:bb:cc:dd:ee:02', 'ip': '192.168.1.10'}], replace=True) == 1
+    assert [tuple(row) for row in lease_rows(lans)] == [('aa:bb:cc:dd:ee:02', '192.168.1.10', None)]
+
+
+def test_import_is_all_or_nothing(lans):
+    with pytest.raises(LeaseImportError):
+        import_leases(lans, [{'mac': 'aa:bb:cc:dd:ee:01', 'ip': '192.168.1.10'},
+                             {'mac': 'bogus', 'ip': '192.168.1.11'}])
+    assert lease_rows(lans) == []
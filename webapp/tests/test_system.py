@@ -0,0 +1,28 @@
+# test_system.py
+
+import os
+import threading
+
+from system import write_file
+
+
+def test_write_file_skips_unchanged(tmp_path):
+    path = str(tmp_path / 'sub' / 'file.conf')
+    assert write_file(path, 'a\n')
+    assert not write_file(path, 'a\n')
+    assert write_file(path, 'b\n')
+    assert open(path).read() == 'b\n'
+    assert os.stat(path).st_mode & 0o777 == 0o644
+    assert os.listdir(tmp_path / 'sub') == ['file.conf']
+
+
+def test_concurrent_writers_leave_one_whole_file(tmp_path):
+    path = str(tmp_path / 'file.conf')
+    contents = [f'{i}\n' * 10000 for i in range(8)]
+    threads = [threading.Thread(target=write_file, args=(path, content)) for content in contents]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert open(path).read() in contents
+    assert os.listdir(tmp_path) == ['file.conf']
@@ -0,0 +1,74 @@
+# test_tsdb.py
+
+import numpy as np
+import pytest
+
+from tsdb import MappedRingBuffer, RingBuffer, TieredSeries, open_buffer
+
+
+def test_ring_buffer_latest_wraps():
+    buffer = RingBuffer(4, (2,))
+    for t in range(6):
+        buffer.append(t, [t, -t])
+    timestamps, values = buffer.latest(10)
+    assert timestamps.tolist() == [2, 3, 4, 5]
+    assert values[:, 0].tolist() == [2, 3, 4, 5]
+    assert buffer.latest(2)[0].tolist() == [4, 5]
+
+
+def test_ring_buffer_latest_without_wrap_is_a_view():
+    buffer = RingBuffer(4, (1,))
+    buffer.append(1, [1])
+    buffer.append(2, [2])
+    timestamps, _ = buffer.latest(2)
+    assert np.shares_memory(timestamps, buffer.timestamps)
+
+
+def test_mapped_buffer_survives_reopen(tmp_path):
+    path = str(tmp_path / 'series.ts')
+    buffer = MappedRingBuffer(path, 3, (2,), max_labels=2)
+    buffer.set_labels(['eth0', 'eth1'])
+    for t in range(4):
+        buffer.append(t, [t, t * 10])
+    buffer.close()
+
+    reopened = MappedRingBuffer(path, 3, (2,), max_labels=2)
+    timestamps, values = reopened.latest(3)
+    assert timestamps.tolist() == [1, 2, 3]
+    assert values[:, 1].tolist() == [10, 20, 30]
+    assert reopened.labels == ['eth0', 'eth1']
+    reopened.close()
+
+
+def test_mapped_buffer_is_recreated_when_shape_changes(tmp_path):
+    path = str(tmp_path / 'series.ts')
+    buffer = MappedRingBuffer(path, 3, (2,))
+    buffer.append(1, [1, 1])
+    buffer.close()
+
+    resized = MappedRingBuffer(path, 5, (2,))
+    assert resized.count == 0
+    resized.close()
+
+
+def test_open_buffer_falls_back_to_memory_when_locked(tmp_path):
+    first = open_buffer('series', 3, (1,), directory=str(tmp_path))
+    second = open_buffer('series', 3, (1,), directory=str(tmp_path))
+    assert isinstance(first, MappedRingBuffer)
+    assert type(second) is RingBuffer
+
+    first.close()
+    third = open_buffer('series', 3, (1,), directory=str(tmp_path))
+    assert isinstance(third, MappedRingBuffer)
+    third.close()
+
+
+def test_tiered_series_rolls_up_means():
+    series = TieredSeries(1, (('1s', 1, 10), ('5s', 5, 10)), (1,),
+                          lambda name, capacity: RingBuffer(capacity, (1,)))
+    for t in range(10):
+        series.append(t, np.array([float(t)]))
+    timestamps, values = series.latest('5s', 10)
+    assert timestamps.tolist() == [4, 9]
+    assert values[:, 0].tolist() == pytest.approx([2.0, 7.0])
+    assert series.latest('1s', 3)[1][:, 0].tolist() == [7, 8, 9]
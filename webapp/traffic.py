@@ -0,0 +1,197 @@
+# traffic.py
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from tsdb import RingBuffer, TieredSeries, open_buffer
+
+PROC_NET_DEV = '/proc/net/dev'
+
+# Counters kept per interface, and their column in /proc/net/dev
+COUNTERS = ('rx_bytes', 'rx_packets', 'tx_bytes', 'tx_packets')
+PROC_COLUMNS = [0, 1, 8, 9]
+
+# Upper bound on tracked interfaces (VLANs, bridges, tunnels included);
+# fixes the width of every ring buffer
+TRAFFIC_MAX_INTERFACES = int(os.environ.get('TRAFFIC_MAX_INTERFACES', '64'))
+
+# Resolution tiers: (name, seconds per slot, slots kept). Each tier is
+# rolled up from the one before it. The 1s tier stays in memory; the
+# coarser ones are persisted so history survives restarts without
+# wearing out flash storage.
+TIERS = (
+    ('1s', 1, 3600),      # last hour
+    ('1m', 60, 1440),     # last 24 hours
+    ('15m', 900, 672),    # last week
+)
+PERSISTENT_TIERS = ('1m', '15m')
+
+# Seconds between explicit flushes of the persistent tiers
+FLUSH_INTERVAL = 300
+
+TIER_STEPS = {name: step for name, step, _ in TIERS}
+
+# Timeframe -> (tier, number of slots)
+TIMEFRAMES = {
+    '1h': ('1s', 3600),
+    '6h': ('1m', 360),
+    '24h': ('1m', 1440),
+    '1w': ('15m', 672),
+}
+
+
+def read_proc_net_dev(path=PROC_NET_DEV):
+    """Return (names, counters) where counters is an (n, 4) float64 array"""
+    with open(path) as f:
+        lines = f.read().splitlines()[2:]
+
+    names = []
+    fields = []
+    for line in lines:
+        name, _, values = line.partition(':')
+        names.append(name.strip())
+        fields.append(values)
+
+    if not names:
+        return names, np.zeros((0, len(COUNTERS)))
+
+    # Parse every interface's counters in one go
+    table = np.array(' '.join(fields).split(), dtype=np.float64).reshape(len(names), -1)
+    return names, table[:, PROC_COLUMNS]
+
+
+class TrafficCollector:
+    """Per-interface rx/tx byte and packet rates at several resolutions
+
+    Every tick reads /proc/net/dev once and computes the rates of all
+    interfaces as a single array operation. Rates land in the 1s ring
+    buffer and are averaged into the 1m and 15m tiers as each slot
+    completes, so any timeframe is a slice of a precomputed array.
+    """
+
+    def __init__(self, max_interfaces, persistent=True):
+        self.max_interfaces = max_interfaces
+        self._persistent = persistent
+        self._previous_present = None
+        self._previous_time = None
+        self._lock = threading.Lock()
+        self._thread = None
+        # In memory until start() opens the persistent tiers
+        self._open_tiers(persistent=False)
+
+    def _open_tiers(self, persistent):
+        shape = (self.max_interfaces, len(COUNTERS))
+
+        def make_buffer(name, capacity):
+            if persistent and name in PERSISTENT_TIERS:
+                return open_buffer(f'traffic-{name}', capacity, shape, max_labels=self.max_interfaces)
+            return RingBuffer(capacity, shape)
+
+        self.tiers = TieredSeries(TIER_STEPS['1s'], TIERS, shape, make_buffer)
+
+        # Interface -> column mapping, restored from the persisted tiers
+        self.names = list(max((buffer.labels for buffer in self.tiers.buffers.values()), key=len))
+        self._columns = {name: i for i, name in enumerate(self.names)}
+        self._last_names = None
+        self._last_index = None
+        self._previous = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self._persistent:
+                self._open_tiers(persistent=True)
+            self._thread = threading.Thread(target=self._run, name='traffic-collector', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        step = TIER_STEPS['1s']
+        next_tick = time.monotonic()
+        next_flush = next_tick + FLUSH_INTERVAL
+        while True:
+            try:
+                self.sample()
+            except OSError as e:
+                print(f"Error reading traffic counters: {e}")
+            if time.monotonic() >= next_flush:
+                with self._lock:
+                    self.tiers.flush()
+                next_flush += FLUSH_INTERVAL
+            # Stay on a fixed tick regardless of how long sampling took
+            next_tick += step
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+
+    def _index(self, names):
+        """Map interface names to ring-buffer columns, reusing the last mapping"""
+        if names == self._last_names:
+            return self._last_index
+
+        added = False
+        for name in names:
+            if name not in self._columns and len(self._columns) < self.max_interfaces:
+                self._columns[name] = len(self._columns)
+                self.names.append(name)
+                added = True
+        if added:
+            self.tiers.set_labels(self.names)
+
+        known = [i for i, name in enumerate(names) if name in self._columns]
+        self._last_names = names
+        self._last_index = (np.array(known, dtype=np.intp),
+                            np.array([self._columns[names[i]] for i in known], dtype=np.intp))
+        return self._last_index
+
+    def sample(self, now=None):
+        """Read the counters once and append rates to every due tier"""
+        now = time.time() if now is None else now
+        names, counters = read_proc_net_dev()
+
+        with self._lock:
+            rows, columns = self._index(names)
+            current = np.zeros((self.max_interfaces, len(COUNTERS)))
+            current[columns] = counters[rows]
+            present = np.zeros(self.max_interfaces, dtype=bool)
+            present[columns] = True
+
+            previous, previous_present, previous_time = \
+                self._previous, self._previous_present, self._previous_time
+            self._previous, self._previous_present, self._previous_time = current, present, now
+            if previous is None or now <= previous_time:
+                return
+
+            # Counters going backwards mean the interface was recreated, and
+            # interfaces that just (re)appeared have no baseline yet
+            delta = current - previous
+            delta[(delta < 0).any(axis=1) | ~(present & previous_present)] = 0.0
+            rates = delta / (now - previous_time)
+
+            self.tiers.append(now, rates)
+
+    def series(self, timeframe):
+        """Return (timestamps, names, rates) for a timeframe
+
+        rates has shape (slots, interfaces, 4) in COUNTERS order, in units
+        per second.
+        """
+        tier, slots = TIMEFRAMES[timeframe]
+        with self._lock:
+            timestamps, values = self.tiers.latest(tier, slots)
+            names = list(self.names)
+            return timestamps.copy(), names, values[:, :len(names)].copy()
+
+    def totals(self, timeframe):
+        """Return {name: {counter: total}} accumulated over a timeframe"""
+        tier, _ = TIMEFRAMES[timeframe]
+        _, names, rates = self.series(timeframe)
+        sums = rates.sum(axis=0, dtype=np.float64) * TIER_STEPS[tier]
+        return {
+            name: dict(zip(COUNTERS, sums[i].tolist()))
+            for i, name in enumerate(names)
+        }
+
+
+traffic_collector = TrafficCollector(TRAFFIC_MAX_INTERFACES)
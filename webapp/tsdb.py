@@ -0,0 +1,229 @@
+# tsdb.py
+
+import fcntl
+import os
+import struct
+
+import numpy as np
+
+# Directory for persistent time-series files
+TSDB_DIR = os.environ.get('ALPINE_ROUTER_DATA_DIR', '/var/lib/alpine-router/tsdb')
+
+# On-disk layout of a MappedRingBuffer file:
+#   header  magic, version, capacity, width, head, count, label count
+#   labels  fixed 32-byte, NUL-padded series labels (e.g. interface names)
+#   padding up to a page boundary
+#   data    capacity float64 timestamps, then capacity * width float32 values
+# Only head/count change after creation, so a reopened file is usable as is.
+MAGIC = b'ARTS'
+VERSION = 1
+HEADER = struct.Struct('<4sIQIQQI')
+LABEL_SIZE = 32
+PAGE_SIZE = 4096
+
+
+class RingBuffer:
+    """Fixed-size ring of (timestamp, values) rows backed by NumPy arrays"""
+
+    def __init__(self, capacity, shape):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity,) + shape, dtype=np.float32)
+        self.labels = []
+        self.head = 0
+        self.count = 0
+
+    def set_labels(self, labels):
+        self.labels = list(labels)
+
+    def append(self, timestamp, row):
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest(self, n):
+        """Return (timestamps, values) for the last n rows, oldest first
+
+        Unless the range wraps around the end of the ring, these are views
+        into the buffer rather than copies.
+        """
+        n = min(n, self.count)
+        start = self.head - n
+        if start >= 0:
+            return self.timestamps[start:self.head], self.values[start:self.head]
+        # Wrapped: stitch the tail of the buffer to its head
+        return (np.concatenate((self.timestamps[start:], self.timestamps[:self.head])),
+                np.concatenate((self.values[start:], self.values[:self.head])))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MappedRingBuffer(RingBuffer):
+    """RingBuffer stored in a fixed-size memory-mapped file
+
+    Disk usage is fixed when the file is created. Appends write in place
+    through the mapping, and a restart simply reopens the file. An
+    exclusive lock on path + '.lock' is held while the buffer is open, so
+    a second process (the Werkzeug reloader, another worker) gets
+    BlockingIOError instead of writing over the same file.
+    """
+
+    def __init__(self, path, capacity, shape, max_labels=0):
+        self.path = path
+        self.capacity = capacity
+        width = int(np.prod(shape))
+        header_size = -(-(HEADER.size + LABEL_SIZE * max_labels) // PAGE_SIZE) * PAGE_SIZE
+        data_size = capacity * 8 + capacity * width * 4
+
+        self._lock_file = open(path + '.lock', 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if not self._compatible(path, capacity, width, max_labels, header_size + data_size):
+                self._create(path, capacity, width, max_labels, header_size + data_size)
+        except OSError:
+            self._lock_file.close()
+            raise
+
+        self._map = np.memmap(path, dtype=np.uint8, mode='r+')
+        self._max_labels = max_labels
+        self._header_size = header_size
+        self.timestamps = np.ndarray((capacity,), dtype=np.float64,
+                                     buffer=self._map, offset=header_size)
+        self.values = np.ndarray((capacity,) + shape, dtype=np.float32,
+                                 buffer=self._map, offset=header_size + capacity * 8)
+
+        _, _, _, _, head, count, label_count = HEADER.unpack_from(self._map, 0)
+        self._head = head
+        self._count = count
+        self.labels = [
+            bytes(self._map[HEADER.size + i * LABEL_SIZE:HEADER.size + (i + 1) * LABEL_SIZE])
+            .rstrip(b'\0').decode()
+            for i in range(label_count)
+        ]
+
+    @staticmethod
+    def _compatible(path, capacity, width, max_labels, size):
+        try:
+            if os.path.getsize(path) != size:
+                return False
+            with open(path, 'rb') as f:
+                magic, version, file_capacity, file_width, _, _, _ = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return (magic, version, file_capacity, file_width) == (MAGIC, VERSION, capacity, width)
+
+    @staticmethod
+    def _create(path, capacity, width, max_labels, size):
+        # Build the file under a temporary name so a crash never leaves a
+        # half-initialised series behind
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, capacity, width, 0, 0, 0))
+            f.truncate(size)
+        os.replace(tmp_path, path)
+
+    def _write_header(self):
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.capacity,
+                         self.values[0].size, self._head, self._count, len(self.labels))
+
+    @property
+    def head(self):
+        return self._head
+
+    @head.setter
+    def head(self, value):
+        self._head = value
+        self._write_header()
+
+    @property
+    def count(self):
+        return self._count
+
+    @count.setter
+    def count(self, value):
+        self._count = value
+        self._write_header()
+
+    def set_labels(self, labels):
+        labels = list(labels)[:self._max_labels]
+        for i, label in enumerate(labels):
+            encoded = label.encode()[:LABEL_SIZE].ljust(LABEL_SIZE, b'\0')
+            start = HEADER.size + i * LABEL_SIZE
+            self._map[start:start + LABEL_SIZE] = np.frombuffer(encoded, dtype=np.uint8)
+        self.labels = labels
+        self._write_header()
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        """Flush the file and release it for other processes"""
+        self._map.flush()
+        self._lock_file.close()
+
+
+def open_buffer(name, capacity, shape, max_labels=0, directory=None):
+    """Open a persistent ring buffer, or an in-memory one if that fails
+
+    That includes another process holding the file open.
+    """
+    directory = directory or TSDB_DIR
+    try:
+        os.makedirs(directory, exist_ok=True)
+        return MappedRingBuffer(os.path.join(directory, f'{name}.ts'), capacity, shape, max_labels)
+    except BlockingIOError:
+        print(f"Time-series file for {name} is in use by another process; keeping {name} in memory only")
+        return RingBuffer(capacity, shape)
+    except OSError as e:
+        print(f"Time-series store unavailable ({e}); keeping {name} in memory only")
+        return RingBuffer(capacity, shape)
+
+
+class TieredSeries:
+    """Rows at a fixed input step, rolled up into coarser retention tiers
+
+    tiers is a sequence of (name, seconds per slot, slots kept), finest
+    first. Each tier's slot is the mean of the rows (or finer slots) that
+    fall in it. make_buffer(name, capacity) returns the RingBuffer for a
+    tier, so some tiers can live in memory and others on disk.
+    """
+
+    def __init__(self, input_step, tiers, shape, make_buffer):
+        self.input_step = input_step
+        self.steps = {name: step for name, step, _ in tiers}
+        self.buffers = {name: make_buffer(name, capacity) for name, _, capacity in tiers}
+        self._chain = [(name, step) for name, step, _ in tiers]
+        # Running sums for the slot currently being built in each tier
+        self._pending = {name: (np.zeros(shape), 0) for name, _, _ in tiers}
+
+    def append(self, timestamp, row):
+        finished = row
+        source_step = self.input_step
+        for name, step in self._chain:
+            total, count = self._pending[name]
+            total += finished
+            count += 1
+            if count < max(1, step // source_step):
+                self._pending[name] = (total, count)
+                return
+
+            finished = total / count
+            self.buffers[name].append(timestamp, finished)
+            self._pending[name] = (np.zeros_like(total), 0)
+            source_step = step
+
+    def latest(self, tier, n):
+        return self.buffers[tier].latest(n)
+
+    def set_labels(self, labels):
+        for buffer in self.buffers.values():
+            buffer.set_labels(labels)
+
+    def flush(self):
+        for buffer in self.buffers.values():
+            buffer.flush()